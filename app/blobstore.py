@@ -0,0 +1,347 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
+
+from app import models, extraction, metrics, retrieval, textstore
+from app.db import get_engine
+
+# Content-addressed store: uploads/blobs/ab/abcdef...<suffix>
+BLOB_DIR = Path(os.getenv("BLOB_DIR", "./uploads/blobs"))
+# How long a simulation waits for evidence uploaded moments before it
+EXTRACTION_WAIT = float(os.getenv("EXTRACTION_WAIT_SECONDS", "120"))
+EXTRACTION_POLL = 0.25
+# Files younger than this are never swept; an upload may be mid-adopt
+GC_GRACE = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+
+def blob_path(sha256: str, suffix: str) -> Path:
+    return BLOB_DIR / sha256[:2] / f"{sha256}{suffix.lower()}"
+
+
+# -------------------------------
+# Reference counting
+# -------------------------------
+def adopt(sess: Session, tmp_path: Path, sha256: str, size: int, suffix: str) -> Tuple[models.Blob, bool]:
+    """Take ownership of a freshly written upload and add a reference.
+
+    Returns ``(blob, created)``. When the content is already stored the
+    temp file is discarded and the existing blob's refcount is bumped, so
+    its extracted text is shared instead of being recomputed.
+
+    The row is committed before the file is moved into the store, so the
+    garbage collector never sees a stored file that has no row yet.
+    """
+    while True:
+        if _add_ref(sess, sha256):
+            Path(tmp_path).unlink(missing_ok=True)
+            return sess.get(models.Blob, sha256), False
+
+        dest = blob_path(sha256, suffix)
+        blob = models.Blob(sha256=sha256, size=size, stored_path=str(dest), refcount=1)
+        sess.add(blob)
+        try:
+            sess.commit()
+        except IntegrityError:
+            # Another upload of the same content won the race; share its row
+            sess.rollback()
+            continue
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, dest)
+        except OSError:
+            sess.delete(blob)
+            sess.commit()
+            raise
+        sess.refresh(blob)
+        return blob, True
+
+
+def _add_ref(sess: Session, sha256: str) -> bool:
+    """Bump the refcount of an existing blob; False if there is no row (or GC just took it)."""
+    bumped = sess.execute(
+        update(models.Blob)
+        .where(models.Blob.sha256 == sha256)
+        .values(refcount=models.Blob.refcount + 1)
+    ).rowcount
+    sess.commit()
+    return bool(bumped)
+
+
+def release(sess: Session, sha256: str):
+    sess.execute(
+        update(models.Blob)
+        .where(models.Blob.sha256 == sha256)
+        .values(refcount=models.Blob.refcount - 1)
+    )
+
+
+def collect_garbage(sess: Session, grace: float = GC_GRACE) -> Dict[str, int]:
+    """Delete unreferenced blobs and any stray files without a row.
+
+    Each delete re-checks ``refcount <= 0`` so a blob re-referenced by an
+    upload since the scan survives, and files are unlinked only after the
+    rows are committed. Files touched within ``grace`` seconds are left
+    alone: they may belong to an upload that is adopting the same content.
+    """
+    orphans = sess.exec(
+        select(models.Blob.sha256, models.Blob.stored_path).where(models.Blob.refcount <= 0)
+    ).all()
+    doomed = []
+    for sha256, stored_path in orphans:
+        gone = sess.execute(
+            delete(models.Blob)
+            .where(models.Blob.sha256 == sha256)
+            .where(models.Blob.refcount <= 0)
+        ).rowcount
+        if not gone:
+            continue
+        sess.execute(delete(models.BlobPage).where(models.BlobPage.blob_sha256 == sha256))
+        sess.execute(delete(models.BlobText).where(models.BlobText.blob_sha256 == sha256))
+        sess.execute(delete(models.BlobChunk).where(models.BlobChunk.blob_sha256 == sha256))
+        doomed.append(Path(stored_path))
+    sess.commit()
+
+    cutoff = time.time() - grace
+    candidates = list(BLOB_DIR.glob("*/*")) if BLOB_DIR.exists() else []
+    # Read the live rows after listing: a file is only moved in once its row is committed
+    known = set(sess.exec(select(models.Blob.stored_path)).all())
+    removed_files = 0
+    for path in set(doomed) | set(candidates):
+        if str(path) in known:
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        path.unlink(missing_ok=True)
+        if path not in doomed:
+            removed_files += 1
+    return {"blobs": len(doomed), "stray_files": removed_files}
+
+
+# -------------------------------
+# One extraction per unique blob
+# -------------------------------
+async def extract_blob(sha256: str):
+    with Session(get_engine()) as sess:
+        blob = sess.get(models.Blob, sha256)
+        if blob is None:
+            return
+        path = Path(blob.stored_path)
+
+    start = time.perf_counter()
+    try:
+        if extraction.is_pdf(path):
+            pages = await extraction.extract_pdf_pages_async(path)
+        else:
+            pages = [await extraction.extract_text(path)]
+        status = "ready"
+    except Exception:
+        pages, status = [], "failed"
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="extraction")
+    text = extraction.PAGE_BREAK.join(pages)
+    start = time.perf_counter()
+    chunks = await asyncio.to_thread(retrieval.chunk_document, text)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="chunking")
+    start = time.perf_counter()
+    packed = await asyncio.to_thread(textstore.pack_pages, pages, extraction.PAGE_BREAK)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="compress")
+
+    with Session(get_engine()) as sess:
+        blob = sess.get(models.Blob, sha256)
+        if blob is None:
+            return
+        blob.extracted_text = ""
+        blob.page_count = len(pages)
+        blob.status = status
+        blob.extracted_at = datetime.utcnow()
+        sess.add(blob)
+        store_text(sess, sha256, pages, packed)
+        sess.execute(delete(models.BlobChunk).where(models.BlobChunk.blob_sha256 == sha256))
+        sess.add_all(
+            models.BlobChunk(
+                blob_sha256=sha256, ord=c.ord, page_no=c.page,
+                start=c.start, stop=c.stop, terms=json.dumps(c.terms),
+            )
+            for c in chunks
+        )
+        sess.execute(
+            update(models.Evidence)
+            .where(models.Evidence.blob_sha256 == sha256)
+            .values(status=status)
+        )
+        sess.commit()
+
+
+_tasks = set()
+
+
+def schedule_extraction(sha256: str):
+    task = asyncio.create_task(extract_blob(sha256))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def resume_pending():
+    """Restart extractions interrupted by a previous process."""
+    with Session(get_engine()) as sess:
+        pending = sess.exec(
+            select(models.Blob.sha256).where(models.Blob.status == "extracting")
+        ).all()
+    for sha256 in pending:
+        schedule_extraction(sha256)
+
+
+def _extracting(shas: List[str]) -> List[str]:
+    with Session(get_engine()) as sess:
+        return sess.exec(
+            select(models.Blob.sha256)
+            .where(models.Blob.sha256.in_(shas))
+            .where(models.Blob.status == "extracting")
+        ).all()
+
+
+async def wait_for_extraction(shas: Iterable[str], timeout: float = EXTRACTION_WAIT) -> bool:
+    """Poll until none of ``shas`` is still extracting (in this or another
+    process); False if some still are after ``timeout`` seconds."""
+    pending = list(shas)
+    deadline = time.monotonic() + timeout
+    while pending:
+        pending = await asyncio.to_thread(_extracting, pending)
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(EXTRACTION_POLL)
+    return True
+
+
+# -------------------------------
+# Compressed text
+# -------------------------------
+def store_text(sess: Session, sha256: str, pages: List[str], packed: Optional[tuple] = None):
+    """Replace the blob's stored text with ``pages``, packed one frame per page
+    (``packed`` is textstore.pack_pages output when already computed)."""
+    data, index, length = packed or textstore.pack_pages(pages, extraction.PAGE_BREAK)
+    sess.execute(delete(models.BlobPage).where(models.BlobPage.blob_sha256 == sha256))
+    sess.execute(delete(models.BlobText).where(models.BlobText.blob_sha256 == sha256))
+    sess.add(models.BlobText(
+        blob_sha256=sha256, length=length, pages=json.dumps(index), data=data,
+        raw_size=sum(len(p.encode("utf-8")) for p in pages) + len(extraction.PAGE_BREAK) * max(0, len(pages) - 1),
+    ))
+
+
+def _frames(sess: Session, sha256: str, first: int, last: Optional[int], index: List[List[int]]) -> List[str]:
+    """Inflate pages ``first``..``last-1``, fetching only their bytes."""
+    entries = index[first:last]
+    if not entries:
+        return []
+    start, stop = entries[0][1], entries[-1][2]
+    data = sess.exec(
+        select(func.substr(models.BlobText.data, start + 1, stop - start))
+        .where(models.BlobText.blob_sha256 == sha256)
+    ).first()
+    return textstore.unpack_pages(data or b"", entries)
+
+
+def _index(sess: Session, sha256: str) -> Optional[Tuple[List[List[int]], int]]:
+    row = sess.exec(
+        select(models.BlobText.pages, models.BlobText.length).where(models.BlobText.blob_sha256 == sha256)
+    ).first()
+    if row is None:
+        return None
+    return json.loads(row[0]), row[1]
+
+
+def texts_for(sess: Session, rows: Iterable[models.Evidence]) -> Dict[str, str]:
+    """Map blob sha256 → extracted text for the blobs behind ``rows``."""
+    return texts_by_sha(sess, {row.blob_sha256 for row in rows if row.blob_sha256})
+
+
+def texts_by_sha(sess: Session, shas: Iterable[str]) -> Dict[str, str]:
+    shas = set(shas)
+    if not shas:
+        return {}
+    texts = {}
+    for sha, index, data in sess.exec(
+        select(models.BlobText.blob_sha256, models.BlobText.pages, models.BlobText.data)
+        .where(models.BlobText.blob_sha256.in_(shas))
+    ).all():
+        texts[sha] = extraction.PAGE_BREAK.join(textstore.unpack_pages(data, json.loads(index)))
+    legacy = shas - set(texts)
+    if legacy:
+        rows = sess.exec(
+            select(models.Blob.sha256, models.Blob.extracted_text).where(models.Blob.sha256.in_(legacy))
+        ).all()
+        texts.update({sha: text or "" for sha, text in rows})
+    return texts
+
+
+def chunks_for(sess: Session, texts: Dict[str, str]) -> Dict[str, List[retrieval.Chunk]]:
+    """Chunks precomputed at upload time for each blob in ``texts``."""
+    if not texts:
+        return {}
+    rows = sess.exec(
+        select(models.BlobChunk)
+        .where(models.BlobChunk.blob_sha256.in_(list(texts)))
+        .order_by(models.BlobChunk.blob_sha256, models.BlobChunk.ord)
+    ).all()
+    chunks: Dict[str, List[retrieval.Chunk]] = {}
+    for row in rows:
+        text = texts[row.blob_sha256]
+        chunks.setdefault(row.blob_sha256, []).append(retrieval.Chunk(
+            ord=row.ord, page=row.page_no, start=row.start, stop=row.stop,
+            terms=json.loads(row.terms), text=text[row.start:row.stop].strip(),
+        ))
+    return chunks
+
+
+def page_slice(sess: Session, sha256: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    """Stored text of pages ``start``..``stop-1`` without touching the file."""
+    stored = _index(sess, sha256)
+    if stored is not None:
+        return _frames(sess, sha256, start, stop, stored[0])
+
+    query = select(models.BlobPage).where(
+        (models.BlobPage.blob_sha256 == sha256) & (models.BlobPage.page_no >= start)
+    )
+    if stop is not None:
+        query = query.where(models.BlobPage.page_no < stop)
+    return [p.text for p in sess.exec(query.order_by(models.BlobPage.page_no)).all()]
+
+
+def text_slice(sess: Session, row: models.Evidence, offset: int = 0, length: int = 20000) -> Tuple[str, int]:
+    """``(text[offset:offset+length], total_length)``; only the page frames
+    the range overlaps are read and inflated."""
+    stored = _index(sess, row.blob_sha256) if row.blob_sha256 else None
+    if stored is not None:
+        index, total = stored
+        if offset >= total or not index:
+            return "", total
+        # Reach one separator further so a range ending in a page break also
+        # reads the next page and the join reproduces that break
+        first, last = textstore.pages_for_range(index, offset, offset + length + len(extraction.PAGE_BREAK))
+        text = extraction.PAGE_BREAK.join(_frames(sess, row.blob_sha256, first, last, index))
+        begin = offset - index[first][0]
+        return text[begin:begin + length], total
+
+    # Legacy rows: computed in the database, so only the slice crosses the wire
+    if row.blob_sha256:
+        column, where = models.Blob.extracted_text, models.Blob.sha256 == row.blob_sha256
+    else:
+        column, where = models.Evidence.extracted_text, models.Evidence.id == row.id
+    result = sess.exec(
+        select(func.substr(column, offset + 1, length), func.length(column)).where(where)
+    ).first()
+    if result is None:
+        return "", 0
+    return result[0] or "", result[1] or 0
@@ -0,0 +1,50 @@
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+# Imported first by app.main, so this marks the start of the app's imports
+IMPORT_STARTED = time.perf_counter()
+
+log = logging.getLogger(__name__)
+
+stats: Dict[str, Optional[float]] = {
+    "interpreter_s": None,      # process start → app.main import began
+    "import_s": None,           # app.main import
+    "first_response_s": None,   # process start → first response sent
+    "first_path": None,
+}
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (after the parenthesised command name) is the start time in clock ticks
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def imports_done():
+    now = time.perf_counter()
+    stats["import_s"] = round(now - IMPORT_STARTED, 4)
+    age = process_age()
+    if age is not None:
+        stats["interpreter_s"] = round(max(0.0, age - (now - IMPORT_STARTED)), 4)
+
+
+def first_response(path: str):
+    """Record time to the first response; later calls are ignored."""
+    if stats["first_response_s"] is not None:
+        return
+    age = process_age()
+    if age is None:
+        # Without /proc, count from the start of the app imports
+        age = time.perf_counter() - IMPORT_STARTED
+    stats["first_response_s"] = round(age, 4)
+    stats["first_path"] = path
+    log.info("cold start: first response (%s) after %.3fs, imports %.3fs", path, age, stats["import_s"] or 0.0)
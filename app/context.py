@@ -0,0 +1,179 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from . import retrieval
+from .prompts import PromptTemplate
+from .tokens import estimate_tokens
+
+# Per-call prompt budget (input tokens, estimated client-side)
+INPUT_BUDGET = int(os.getenv("LLM_INPUT_BUDGET", "6000"))
+# Extra evidence re-ranked for each turn, on top of the shared prefix
+TURN_EVIDENCE_BUDGET = int(os.getenv("TURN_EVIDENCE_TOKEN_BUDGET", "800"))
+# Length of the rolling summary kept for each turn once it is no longer recent
+SUMMARY_TOKENS = int(os.getenv("TURN_SUMMARY_TOKENS", "80"))
+# Mark the shared prefix with cache_control for providers that need explicit breakpoints
+CACHE_CONTROL = os.getenv("LLM_CACHE_CONTROL", "0") in ("1", "true", "True")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def summarize(text: str, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Extractive summary: leading sentences up to ``max_tokens``."""
+    flat = " ".join(text.split())
+    out = ""
+    for sentence in _SENTENCE_RE.split(flat):
+        candidate = f"{out} {sentence}".strip()
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        out = candidate
+    if not out:
+        out = flat[: max_tokens * 4]
+    return out if len(out) == len(flat) else out + " …"
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[: max(0, max_tokens) * 4] + " …"
+
+
+class ContextManager:
+    """Builds per-call messages for one simulation run within a token budget.
+
+    Every call starts with the same system prefix (case block plus the core
+    evidence for the claim), so providers with prompt caching can reuse it.
+    The prefix is assembled once per run and each role's system message is
+    built once and reused, so turns never copy it. What varies per call comes
+    after: the role instructions, evidence re-ranked for the turn, testimony,
+    and the turn prompt. Earlier turns are kept as rolling summaries; only the
+    latest round is carried in full. Turn lines are rendered once, when the
+    turn is added, into an append-only buffer the final transcript reads from.
+    """
+
+    def __init__(self, case_block: str, index: retrieval.ChunkIndex, claim: str, input_budget: int = INPUT_BUDGET):
+        self.index = index
+        self.input_budget = input_budget
+        core = index.search(claim)
+        self.core_keys = {h.key for h in core}
+        self.prefix = (
+            "CASE FILE:\n" + case_block + "\n\nCORE EVIDENCES:\n"
+            + (retrieval.format_hits(core) if core else "No evidence provided.")
+        )
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self._systems: Dict[str, Tuple[Dict, int]] = {}  # role → (system message, tokens)
+        self.testimony: List[str] = []
+        # Append-only: {"round", "line", "line_tokens", "summary_line", "summary_tokens"}
+        self.turns: List[Dict] = []
+        self.calls: List[Dict] = []
+
+    # ---- state ----
+    def add_turn(self, agent: str, round_no: Optional[int], content: str):
+        label = f"{agent.upper()} (Round {round_no}): "
+        line, summary_line = label + content, label + summarize(content)
+        self.turns.append({
+            "round": round_no,
+            "line": line, "line_tokens": estimate_tokens(line),
+            "summary_line": summary_line, "summary_tokens": estimate_tokens(summary_line),
+        })
+
+    def add_testimony(self, round_no: int, text: str):
+        self.testimony.append(f"USER INPUT (Round {round_no}): {text}")
+
+    # ---- prompt assembly ----
+    def system(self, role: str) -> Tuple[Dict, int]:
+        """The system message for ``role`` and its token estimate, built once per run.
+
+        Callers share the returned message, so it must not be modified."""
+        if role not in self._systems:
+            if CACHE_CONTROL:
+                content = [
+                    {"type": "text", "text": self.prefix, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": role},
+                ]
+            else:
+                content = self.prefix + "\n\n" + role
+            self._systems[role] = ({"role": "system", "content": content}, self.prefix_tokens + estimate_tokens(role))
+        return self._systems[role]
+
+    def context(self, query: str, budget: int) -> str:
+        """Turn-specific context: re-ranked evidence plus testimony, within ``budget``."""
+        testimony = "\n\n".join(self.testimony)
+        testimony = truncate(testimony, budget // 2) if testimony else ""
+        ev_budget = min(TURN_EVIDENCE_BUDGET, max(0, budget - estimate_tokens(testimony)))
+        hits = self.index.search(query, token_budget=ev_budget, exclude=self.core_keys) if ev_budget else []
+        parts = ["See CASE FILE and CORE EVIDENCES above."]
+        if hits:
+            parts.append("ADDITIONAL EVIDENCES:\n" + retrieval.format_hits(hits))
+        if testimony:
+            parts.append(testimony)
+        return "\n\n".join(parts)
+
+    def history(self, budget: int) -> str:
+        """Transcript for the final judge: latest round in full, earlier ones summarized."""
+        if not self.turns:
+            return ""
+        last_round = self.turns[-1]["round"]
+        lines: List[str] = []
+        used = 0
+        for t in reversed(self.turns):
+            full = t["round"] == last_round
+            line, cost = (t["line"], t["line_tokens"]) if full else (t["summary_line"], t["summary_tokens"])
+            if used + cost > budget:
+                if full:
+                    line = truncate(line, budget - used)
+                    cost = estimate_tokens(line)
+                else:
+                    lines.append(f"[{len(self.turns) - len(lines)} earlier turns omitted]")
+                    break
+            lines.append(line)
+            used += cost
+        return "\n\n".join(reversed(lines))
+
+    def messages(self, role: str, template: PromptTemplate, query: str, **fields) -> List[Dict]:
+        """Render ``template`` with ``context`` (and optionally ``transcript``) fitted
+        to the remaining input budget."""
+        system, system_tokens = self.system(role)
+        fixed = system_tokens + template.tokens + sum(estimate_tokens(v) for v in fields.values())
+        remaining = max(0, self.input_budget - fixed)
+        if "transcript" in template.fields:
+            fields["transcript"] = self.history(remaining * 2 // 3)
+            remaining -= estimate_tokens(fields["transcript"])
+        fields["context"] = self.context(query, remaining)
+        return [system, {"role": "user", "content": template.render(**fields)}]
+
+    # ---- accounting ----
+    def record(self, agent: str, round_no: Optional[int], messages: List[Dict], usage: Dict, cached: bool = False,
+               model: Optional[str] = None):
+        est = sum(estimate_tokens(_text(m["content"])) for m in messages)
+        self.calls.append({
+            "agent": agent,
+            "round": round_no,
+            "model": model,
+            "estimated_prompt_tokens": est,
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+            "cached_response": cached,
+        })
+
+    def usage_report(self) -> Dict:
+        def total(key):
+            return sum(c[key] or 0 for c in self.calls)
+
+        return {
+            "calls": self.calls,
+            "llm_calls": len(self.calls),
+            "cached_responses": sum(1 for c in self.calls if c["cached_response"]),
+            "prompt_tokens": total("prompt_tokens"),
+            "completion_tokens": total("completion_tokens"),
+            "cached_tokens": total("cached_tokens"),
+            "estimated_prompt_tokens": total("estimated_prompt_tokens"),
+            "input_budget": self.input_budget,
+        }
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
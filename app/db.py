@@ -0,0 +1,61 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.getenv("DB_URL")
+
+# -------------------------------
+# Engine / connection pool settings
+# -------------------------------
+# Serverless deployments (Vercel) get a fresh process per cold start and
+# should lean on Neon's pooler endpoint instead of holding connections.
+SERVERLESS = os.getenv("DB_SERVERLESS", "1" if os.getenv("VERCEL") else "0") in ("1", "true", "True")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Neon closes idle connections, so recycle before that and ping on checkout
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False")
+
+
+def engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    if SERVERLESS:
+        from sqlalchemy.pool import NullPool
+        return {"poolclass": NullPool, "pool_pre_ping": POOL_PRE_PING}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+# -------------------------------
+# Engine, created on first use (imports the DB driver, so keep it off the
+# cold-start path for requests that never touch the database)
+# -------------------------------
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlmodel import create_engine
+                _engine = create_engine(DB_URL, echo=False, **engine_options(DB_URL))
+    return _engine
+
+
+def __getattr__(name: str):
+    # ``from app.db import engine`` keeps working for existing scripts
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,312 @@
+"""Resilient LLM dispatch: retries, backoff, circuit breaking and model fallback.
+
+Every chat call goes through a chain of models (the primary, then
+LLM_FALLBACK_MODELS). For each model, transient failures (429, 408, 5xx,
+connection errors) are retried with full-jitter exponential backoff; a
+``Retry-After`` (or OpenRouter ``X-RateLimit-Reset``) header sets the
+minimum wait, and also pauses that model in the process-wide rate limiter so
+concurrent simulations back off together instead of each burning their own
+retries; other models (the fallbacks) are not held up.
+A per-model circuit breaker opens after consecutive failures, so later calls
+go straight to the next model until the cooldown has passed. When the whole
+chain fails, LLMUnavailable is raised; callers resume the trial from its
+checkpointed turns (see services.run_resumable).
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import llm, metrics
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # per model, after the first attempt
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+# A Retry-After longer than this moves on to the next model instead of waiting
+RETRY_AFTER_MAX = float(os.getenv("LLM_RETRY_AFTER_MAX", "60"))
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # consecutive failures
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Model gone, not allowed or out of credits: try the next model right away
+FALLBACK_STATUS = {402, 403, 404}
+
+
+class LLMUnavailable(RuntimeError):
+    """Every model in the chain failed or is circuit-broken."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StreamInterrupted(LLMUnavailable):
+    """A streamed reply failed after part of it was already yielded."""
+
+
+# -------------------------------
+# Circuit breaker (one per model, shared by the process)
+# -------------------------------
+class CircuitBreaker:
+    """closed → open after ``threshold`` consecutive failures; after
+    ``cooldown`` one trial call is let through (half-open)."""
+
+    def __init__(self, model: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.model = model
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> Optional[str]:
+        """``"closed"`` or ``"trial"`` (the one half-open call) if a call may
+        go ahead, None if not. The trial ends with success, failure or release."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return "closed"
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return "trial"
+            return None
+
+    def release(self):
+        """End a half-open trial that neither succeeded nor failed (e.g. a 400,
+        or a call cancelled midway)."""
+        with self._lock:
+            self._trial = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+        metrics.LLM_BREAKER_OPEN.set(0, model=self.model)
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+            is_open = self.opened_at is not None
+        if is_open:
+            metrics.LLM_BREAKER_OPEN.set(1, model=self.model)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+        return _breakers[model]
+
+
+def breaker_states() -> Dict[str, str]:
+    with _breakers_lock:
+        return {model: b.state for model, b in _breakers.items()}
+
+
+# -------------------------------
+# Failure classification
+# -------------------------------
+def retry_after(resp) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After or X-RateLimit-Reset."""
+    if resp is None:
+        return None
+    value = resp.headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = resp.headers.get("x-ratelimit-reset")  # OpenRouter: epoch milliseconds
+    if reset:
+        try:
+            return max(0.0, float(reset) / 1000 - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def classify(exc: Exception) -> str:
+    """``retry`` (same model again), ``fallback`` (next model) or ``fatal``."""
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status in RETRYABLE_STATUS:
+            return "retry"
+        if status in FALLBACK_STATUS:
+            return "fallback"
+        return "fatal"
+    if isinstance(exc, httpx.TransportError):
+        return "retry"
+    return "fatal"
+
+
+def backoff(attempt: int, floor: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's ``floor``."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, floor or 0.0)
+
+
+# -------------------------------
+# Dispatcher
+# -------------------------------
+class Dispatcher:
+    def __init__(self, models: Sequence[str], max_retries: int = MAX_RETRIES):
+        self.models = [m for m in dict.fromkeys(models) if m]
+        self.max_retries = max_retries
+
+    async def _failed(self, model: str, attempt: int, exc: Exception) -> bool:
+        """Record a failure; sleep and return True to retry ``model``, False to move on."""
+        kind = classify(exc)
+        if kind == "fatal":
+            breaker(model).release()
+            raise exc
+        breaker(model).failure()
+        resp = getattr(exc, "response", None)
+        wait = retry_after(resp) if resp is not None else None
+        if resp is not None and resp.status_code == 429 and wait:
+            # Everyone sharing this process (and key) backs off this model, not just this call
+            llm.pause(min(wait, RETRY_AFTER_MAX), model)
+        if kind == "fallback" or attempt >= self.max_retries or (wait or 0) > RETRY_AFTER_MAX:
+            return False
+        if breaker(model).state != "closed":
+            return False
+        metrics.LLM_RETRIES.inc(model=model, reason=_reason(exc))
+        await asyncio.sleep(backoff(attempt, wait))
+        return True
+
+    def _chain(self) -> Iterator[Tuple[str, bool]]:
+        """``(model, is_trial)`` to try, in order, skipping those whose breaker is open.
+
+        A caller given a half-open trial must end it: success/failure (via
+        ``_failed``), or ``release`` in a ``finally`` when the call never got
+        an outcome (cancelled, or the stream consumer stopped early).
+        """
+        tried = 0
+        for model in self.models:
+            allowed = breaker(model).allow()
+            if not allowed:
+                continue
+            if tried:
+                metrics.LLM_FALLBACKS.inc(model=model)
+            tried += 1
+            yield model, allowed == "trial"
+        if not tried:
+            raise LLMUnavailable(
+                f"All models are circuit-broken: {', '.join(self.models)}", retry_after=BREAKER_COOLDOWN
+            )
+
+    async def achat(self, messages: List[Dict], max_tokens: int = 800, temperature: float = 0.2,
+                    timeout: Optional[float] = None, response_format: Optional[Dict] = None) -> llm.ChatResult:
+        last: Optional[Exception] = None
+        for model, trial in self._chain():
+            settled = False
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        result = await llm.achat(messages, model, max_tokens, temperature, timeout, response_format)
+                    except Exception as e:
+                        last = e
+                        settled = True  # _failed records the outcome before it awaits
+                        if await self._failed(model, attempt, e):
+                            attempt += 1
+                            continue
+                        break
+                    breaker(model).success()
+                    settled = True
+                    return result
+            finally:
+                if trial and not settled:
+                    breaker(model).release()
+        raise LLMUnavailable(f"All models failed; last error: {_describe(last)}", retry_after=_wait_hint(last))
+
+    def astream_chat(self, messages: List[Dict], max_tokens: int = 800, temperature: float = 0.2,
+                     timeout: Optional[float] = None, stream: bool = True,
+                     response_format: Optional[Dict] = None) -> "DispatchStream":
+        return DispatchStream(self, messages, max_tokens, temperature, timeout, stream, response_format)
+
+
+class DispatchStream:
+    """llm.ChatStream with the dispatcher's retries and fallbacks. A failure
+    before the first delta is retried transparently; after it, the partial
+    reply cannot be taken back and StreamInterrupted is raised."""
+
+    def __init__(self, dispatcher: Dispatcher, messages, max_tokens, temperature, timeout, stream, response_format):
+        self.dispatcher = dispatcher
+        self.args = (messages, max_tokens, temperature, timeout, stream, response_format)
+        self.result: Optional[llm.ChatResult] = None
+
+    async def __aiter__(self):
+        messages, max_tokens, temperature, timeout, stream, response_format = self.args
+        last: Optional[Exception] = None
+        for model, trial in self.dispatcher._chain():
+            settled = False
+            try:
+                attempt = 0
+                while True:
+                    call = llm.astream_chat(messages, model, max_tokens, temperature, timeout, stream, response_format)
+                    yielded = False
+                    try:
+                        async for delta in call:
+                            yielded = True
+                            yield delta
+                    except Exception as e:
+                        last = e
+                        settled = True
+                        if yielded and classify(e) != "fatal":
+                            breaker(model).failure()
+                            raise StreamInterrupted(f"{model} stream failed midway: {_describe(e)}") from e
+                        if await self.dispatcher._failed(model, attempt, e):
+                            attempt += 1
+                            continue
+                        break
+                    breaker(model).success()
+                    settled = True
+                    self.result = call.result
+                    return
+            finally:
+                # Cancelled, or the consumer stopped iterating (GeneratorExit)
+                if trial and not settled:
+                    breaker(model).release()
+        raise LLMUnavailable(f"All models failed; last error: {_describe(last)}", retry_after=_wait_hint(last))
+
+
+def _reason(exc: Exception) -> str:
+    resp = getattr(exc, "response", None)
+    return str(resp.status_code) if resp is not None else type(exc).__name__
+
+
+def _describe(exc: Optional[Exception]) -> str:
+    if exc is None:
+        return "none"
+    resp = getattr(exc, "response", None)
+    if resp is not None:
+        return f"HTTP {resp.status_code} from {resp.request.url}"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _wait_hint(exc: Optional[Exception]) -> Optional[float]:
+    resp = getattr(exc, "response", None)
+    return retry_after(resp) if resp is not None else None
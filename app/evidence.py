@@ -0,0 +1,127 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from . import extraction, retrieval
+
+
+# -------------------------------
+# Evidence text providers
+# -------------------------------
+class EvidenceTextProvider:
+    """Resolves an evidence file reference to its extracted text."""
+
+    def get_text(self, path: str) -> str:
+        raise NotImplementedError
+
+    def get_chunks(self, path: str) -> List[retrieval.Chunk]:
+        return retrieval.chunk_document(self.get_text(path))
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CachedFileProvider(EvidenceTextProvider):
+    """Extracts text from files on disk, caching by content hash.
+
+    The same document listed twice (e.g. once per party) or reused across
+    runs is only parsed once. When ``cache_dir`` is given the extracted text
+    is also persisted there as ``<sha256>.txt``.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._by_digest: Dict[str, str] = {}
+        self._chunks: Dict[str, List[retrieval.Chunk]] = {}
+
+    def _load(self, path: str):
+        file_path = Path(path)
+        if not file_path.exists():
+            return None, ""
+        digest = file_digest(file_path)
+        if digest in self._by_digest:
+            return digest, self._by_digest[digest]
+
+        cached = self.cache_dir / f"{digest}.txt" if self.cache_dir else None
+        if cached and cached.exists():
+            text = cached.read_text(encoding="utf-8")
+        else:
+            text = extraction.extract_document(file_path)
+            if cached:
+                cached.write_text(text, encoding="utf-8")
+        self._by_digest[digest] = text
+        return digest, text
+
+    def get_text(self, path: str) -> str:
+        return self._load(path)[1]
+
+    def get_chunks(self, path: str) -> List[retrieval.Chunk]:
+        digest, text = self._load(path)
+        if digest is None:
+            return []
+        if digest not in self._chunks:
+            self._chunks[digest] = retrieval.chunk_document(text)
+        return self._chunks[digest]
+
+
+class StoredEvidenceProvider(EvidenceTextProvider):
+    """Serves text already saved on ``models.Evidence`` rows at upload time.
+
+    Files are never parsed here: rows still being extracted, whose extraction
+    failed, or that yielded no text are left out of the evidence and listed
+    in ``excluded`` (stored path → note) so the trial can say so. ``pending``
+    holds the blobs still being extracted, for callers that wait on them.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable,
+        blob_texts: Optional[Dict[str, str]] = None,
+        blob_chunks: Optional[Dict[str, List[retrieval.Chunk]]] = None,
+    ):
+        rows = list(rows)
+        blob_texts = blob_texts or {}
+        blob_chunks = blob_chunks or {}
+        self._by_path = {
+            row.stored_path: row.extracted_text or blob_texts.get(row.blob_sha256, "")
+            for row in rows
+        }
+        self._chunks_by_path = {
+            row.stored_path: blob_chunks[row.blob_sha256]
+            for row in rows if row.blob_sha256 in blob_chunks
+        }
+        self.pending = {row.blob_sha256 for row in rows if row.status == "extracting" and row.blob_sha256}
+        self.excluded = {
+            row.stored_path: f"{row.filename} ({row.party}): {_EXCLUDED.get(row.status, 'no text could be extracted')}"
+            for row in rows if not self._by_path[row.stored_path]
+        }
+
+    def get_text(self, path: str) -> str:
+        return self._by_path.get(path, "")
+
+    def get_chunks(self, path: str) -> List[retrieval.Chunk]:
+        if path in self._chunks_by_path:
+            return self._chunks_by_path[path]
+        if self._by_path.get(path):
+            return retrieval.chunk_document(self._by_path[path])
+        return []
+
+
+_EXCLUDED = {
+    "extracting": "text extraction has not finished",
+    "failed": "text extraction failed",
+}
+
+
+def stored_provider(sess, rows) -> StoredEvidenceProvider:
+    """Provider for Evidence rows, including text held on shared blobs."""
+    from . import blobstore
+    texts = blobstore.texts_for(sess, rows)
+    return StoredEvidenceProvider(rows, blob_texts=texts, blob_chunks=blobstore.chunks_for(sess, texts))
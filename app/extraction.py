@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional
+
+from . import ocr
+
+# CPU-heavy parsing (pdfminer / Tesseract) runs in worker processes so it
+# never blocks the event loop. The backends are imported on first use, so
+# importing this module (and app.main) stays cheap on cold starts.
+WORKERS = int(os.getenv("EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Same separator pdfminer puts between pages in extract_text output
+PAGE_BREAK = "\x0c"
+# Pages handed to one worker task for full-document PDF extraction
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+# -------------------------------
+# Utility: Extract text from files
+# -------------------------------
+def extract_text_from_file(path: Path) -> str:
+    suf = path.suffix.lower()
+    try:
+        if suf == ".pdf":
+            from pdfminer.high_level import extract_text as pdf_extract_text
+            return pdf_extract_text(str(path))
+        elif suf in ocr.IMAGE_SUFFIXES:
+            return ocr.ocr_image(path)
+        elif suf == ".txt":
+            return path.read_text(encoding="utf-8")
+        else:
+            return ""
+    except Exception:
+        return ""
+
+
+def new_pool(max_workers: int) -> ProcessPoolExecutor:
+    # The app has threads by the time a pool starts (LLM portal loop, anyio
+    # workers); forking then can hand a child a lock held forever, so workers
+    # come from a forkserver instead
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = new_pool(WORKERS)
+    return _pool
+
+
+async def extract_text(path: Path) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), extract_text_from_file, Path(path))
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# -------------------------------
+# Page-parallel PDF extraction
+# -------------------------------
+def is_pdf(path) -> bool:
+    return Path(path).suffix.lower() == ".pdf"
+
+
+def pdf_page_count(path) -> int:
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    with open(path, "rb") as f:
+        doc = PDFDocument(PDFParser(f))
+        return int(resolve1(doc.catalog["Pages"])["Count"])
+
+
+def extract_pdf_range(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages ``start``..``stop-1`` (0-based), one string per page."""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    pages = []
+    for layout in extract_pages(path, page_numbers=range(start, stop)):
+        pages.append("".join(el.get_text() for el in layout if isinstance(el, LTTextContainer)))
+    return pages
+
+
+def extract_pdf_pages(path, max_chars: Optional[int] = None, pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+    """Extract a PDF page by page across the process pool.
+
+    Without ``max_chars`` the document is split into ``PAGES_PER_TASK``
+    ranges that run concurrently. With ``max_chars`` pages are parsed in
+    order, a pool's worth at a time, and extraction stops as soon as the
+    leading pages hold enough text; only that prefix is returned.
+    Text-less (scanned) pages are then OCR'd, see app.ocr.
+    """
+    path = str(path)
+    pool = pool or get_pool()
+    n_pages = pdf_page_count(path)
+    step = 1 if max_chars is not None else PAGES_PER_TASK
+    ranges = iter([(s, min(s + step, n_pages)) for s in range(0, n_pages, step)])
+
+    pending = deque(
+        pool.submit(extract_pdf_range, path, start, stop)
+        for start, stop in islice(ranges, None if max_chars is None else WORKERS)
+    )
+    pages, chars = [], 0
+    while pending:
+        chunk = pending.popleft().result()
+        pages.extend(chunk)
+        if max_chars is None:
+            continue
+        chars += sum(len(p) for p in chunk)
+        if chars >= max_chars:
+            for fut in pending:
+                fut.cancel()
+            break
+        nxt = next(ranges, None)
+        if nxt:
+            pending.append(pool.submit(extract_pdf_range, path, *nxt))
+    return ocr.fill_textless_pages(path, pages)
+
+
+async def extract_pdf_pages_async(path, max_chars: Optional[int] = None) -> List[str]:
+    return await asyncio.to_thread(extract_pdf_pages, path, max_chars)
+
+
+def extract_document(path) -> str:
+    """Full text of any supported file, using the page-parallel engine for PDFs."""
+    if is_pdf(path):
+        try:
+            return PAGE_BREAK.join(extract_pdf_pages(path))
+        except Exception:
+            return ""
+    return extract_text_from_file(Path(path))
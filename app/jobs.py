@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy import case as sql_case
+from sqlmodel import Session, select, func
+
+from app import models, services, evidence, blobstore, llm_cache, metrics, persistence
+from app.db import get_engine
+
+log = logging.getLogger(__name__)
+
+# Bounded worker pool; jobs beyond MAX_PENDING are refused at submit time
+WORKERS = int(os.getenv("SIM_WORKERS", "4"))
+MAX_PENDING = int(os.getenv("SIM_MAX_PENDING", "100"))
+# Caps on one batch request; its trials run outside the queue but count against MAX_PENDING
+BATCH_MAX_VARIANTS = int(os.getenv("BATCH_MAX_VARIANTS", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Jobs are claimed atomically, so several processes can share one database.
+# A running job whose owner stops heartbeating for STALE seconds is taken over.
+OWNER = uuid.uuid4().hex
+HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+# -------------------------------
+# Evidence loading (shared with the synchronous /simulate endpoint)
+# -------------------------------
+def case_evidence(sess: Session, case_id: int) -> List[models.Evidence]:
+    """Defense evidence first, then opposition, matching /simulate.
+
+    One query served by the (case_id, party) index.
+    """
+    party_order = sql_case((models.Evidence.party == "Defense", 0), else_=1)
+    return sess.exec(
+        select(models.Evidence)
+        .where(models.Evidence.case_id == case_id)
+        .where(models.Evidence.party.in_(("Defense", "Opposition")))
+        .order_by(party_order, models.Evidence.id)
+    ).all()
+
+
+def _load_case(case_id: int, settings: tuple) -> Optional[tuple]:
+    with Session(get_engine()) as sess:
+        case = sess.get(models.Case, case_id)
+        if not case:
+            return None
+        rows = case_evidence(sess, case_id)
+        payloads = [services.build_case_payload(case, rows, s) for s in settings]
+        return payloads, evidence.stored_provider(sess, rows)
+
+
+async def load_case(case_id: int, *settings: Optional[dict]) -> Optional[tuple]:
+    """``(payloads, provider)`` for a case, one payload per ``settings`` (one
+    with the defaults when none are given), or None when the case does not
+    exist. The queries run in a worker thread, off the event loop.
+
+    Evidence still being extracted (e.g. uploaded just before) is waited for,
+    up to blobstore.EXTRACTION_WAIT; whatever is not ready by then is left
+    out of the trial and listed in the provider's ``excluded``."""
+    settings = settings or (None,)
+    loaded = await asyncio.to_thread(_load_case, case_id, settings)
+    if loaded and loaded[1].pending:
+        await blobstore.wait_for_extraction(loaded[1].pending)
+        loaded = await asyncio.to_thread(_load_case, case_id, settings)
+    return loaded
+
+
+# -------------------------------
+# Job queue
+# -------------------------------
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_queued = set()  # job ids on this process's queue or being run by it
+
+
+def _enqueue(job_id: str):
+    if job_id not in _queued:
+        _queued.add(job_id)
+        _queue.put_nowait(job_id)
+
+
+_batch_trials = 0
+_batch_lock = threading.Lock()
+
+
+def _pending(sess: Session) -> int:
+    """Queued and running jobs plus batch trials in flight in this process."""
+    return _batch_trials + sess.exec(
+        select(func.count()).select_from(models.SimulationJob).where(
+            models.SimulationJob.status.in_(ACTIVE_STATUSES)
+        )
+    ).one()
+
+
+def admit_batch(n: int):
+    """Reserve ``n`` batch trials against MAX_PENDING (QueueFull if there is
+    no room); give them back with ``release_batch``."""
+    global _batch_trials
+    with _batch_lock, Session(get_engine()) as sess:
+        pending = _pending(sess)
+        if pending + n > MAX_PENDING:
+            raise QueueFull(f"{pending} simulations already pending")
+        _batch_trials += n
+
+
+def release_batch(n: int):
+    global _batch_trials
+    with _batch_lock:
+        _batch_trials -= n
+
+
+def submit(case_id: int, settings: dict, cache_mode: Optional[str] = None) -> models.SimulationJob:
+    with Session(get_engine()) as sess:
+        pending = _pending(sess)
+        if pending >= MAX_PENDING:
+            raise QueueFull(f"{pending} simulations already pending")
+
+        job = models.SimulationJob(case_id=case_id, settings=json.dumps(settings), cache_mode=cache_mode)
+        sess.add(job)
+        sess.commit()
+        sess.refresh(job)
+
+    _enqueue(job.id)
+    return job
+
+
+def job_view(job: models.SimulationJob) -> dict:
+    return {
+        "job_id": job.id,
+        "case_id": job.case_id,
+        "status": job.status,
+        "run_id": job.run_id,
+        "transcript": json.loads(job.transcript or "[]"),
+        "judge": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _update(job_id: str, **fields):
+    with Session(get_engine()) as sess:
+        job = sess.get(models.SimulationJob, job_id)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        sess.add(job)
+        sess.commit()
+
+
+def _stale(now: datetime):
+    """Running jobs whose owner has stopped heartbeating (or never recorded one)."""
+    cutoff = now - timedelta(seconds=STALE_SECONDS)
+    return and_(
+        models.SimulationJob.status == "running",
+        or_(models.SimulationJob.heartbeat_at.is_(None), models.SimulationJob.heartbeat_at < cutoff),
+    )
+
+
+def _claim(job_id: str) -> Optional[models.SimulationJob]:
+    """Mark a queued (or abandoned running) job as ours; None if another worker has it."""
+    now = datetime.utcnow()
+    with Session(get_engine()) as sess:
+        claimed = sess.execute(
+            update(models.SimulationJob)
+            .where(models.SimulationJob.id == job_id)
+            .where(or_(models.SimulationJob.status == "queued", _stale(now)))
+            .values(status="running", owner=OWNER, heartbeat_at=now)
+        ).rowcount
+        sess.commit()
+        return sess.get(models.SimulationJob, job_id) if claimed else None
+
+
+def _touch(job_id: str):
+    with Session(get_engine()) as sess:
+        sess.execute(
+            update(models.SimulationJob)
+            .where(models.SimulationJob.id == job_id)
+            .where(models.SimulationJob.owner == OWNER)
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        sess.commit()
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            await asyncio.to_thread(_touch, job_id)
+        except Exception:
+            log.exception("Heartbeat for simulation job %s failed", job_id)
+
+
+async def _run(job_id: str):
+    job = await asyncio.to_thread(_claim, job_id)
+    if job is None:
+        return
+    beat = asyncio.create_task(_heartbeat(job_id))
+    # Everything after the claim runs under the try: a job whose setup fails (DB
+    # error, bad settings, unreadable evidence) is marked failed instead of staying running
+    writer = None
+    try:
+        metrics.QUEUE_SECONDS.observe((datetime.utcnow() - job.created_at).total_seconds(), queue="simulation_job")
+        loaded = await load_case(job.case_id, json.loads(job.settings or "{}"))
+        if loaded is None:
+            await asyncio.to_thread(_update, job_id, status="failed", error="Case not found", finished_at=datetime.utcnow())
+            return
+        (payload,), provider = loaded
+        case_id, cache_mode, prior_run = job.case_id, job.cache_mode, job.run_id
+
+        # A job taken over from a dead process continues its run (left "running")
+        # from the turns already written
+        writer = (
+            await asyncio.to_thread(persistence.RunWriter.reopen, prior_run, statuses=("failed", "running"))
+            if prior_run else None
+        )
+        if writer is None:
+            writer = persistence.RunWriter(case_id, payload["simulationSettings"], services.MODEL)
+            await writer.astart()
+        turns = writer.checkpoint()
+        await asyncio.to_thread(
+            _update, job_id, run_id=writer.run_id, transcript=json.dumps(turns), started_at=datetime.utcnow(),
+        )
+
+        async def on_turn(entry):
+            turns.append(entry)
+            await writer.aadd_turn(entry["agent"], entry["content"], entry["round"], entry["structured"])
+            await asyncio.to_thread(_update, job_id, transcript=json.dumps(turns))
+
+        with llm_cache.use_mode(cache_mode):
+            transcript, judge = await services.run_resumable(
+                payload, provider=provider, on_turn=on_turn, resume=writer.checkpoint(),
+                usage_calls=writer.usage_calls,
+            )
+        await writer.afinish(judge)
+        await asyncio.to_thread(
+            _update, job_id, status="succeeded", result=json.dumps(judge), finished_at=datetime.utcnow()
+        )
+    except Exception as e:
+        if writer is not None and writer.run_id:
+            try:
+                await writer.afail(str(e))
+            except Exception:
+                log.exception("Could not record failure of run %s", writer.run_id)
+        await asyncio.to_thread(_update, job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+    finally:
+        beat.cancel()
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run(job_id)
+        except Exception:
+            # _run already marks its job failed; this only fires when that update
+            # itself fails (e.g. the database is down). Keep the worker alive.
+            log.exception("Simulation job %s could not be run", job_id)
+        finally:
+            _queued.discard(job_id)
+            _queue.task_done()
+
+
+def recoverable() -> List[str]:
+    """Ids of jobs another worker may pick up: queued, or running with a stale heartbeat."""
+    with Session(get_engine()) as sess:
+        return sess.exec(
+            select(models.SimulationJob.id)
+            .where(or_(models.SimulationJob.status == "queued", _stale(datetime.utcnow())))
+            .order_by(models.SimulationJob.created_at)
+        ).all()
+
+
+async def _recover_loop():
+    """Periodically queue jobs abandoned by dead processes; claiming keeps them single-run."""
+    while True:
+        await asyncio.sleep(STALE_SECONDS)
+        try:
+            for job_id in await asyncio.to_thread(recoverable):
+                _enqueue(job_id)
+        except Exception:
+            log.exception("Could not scan for abandoned simulation jobs")
+
+
+def start(recover: bool = True):
+    """Start workers and, with ``recover``, queue jobs left unfinished by other processes.
+
+    Every process may queue the same job; only the worker that claims it runs it.
+    """
+    global _queue
+    _queue = asyncio.Queue()
+    _queued.clear()
+    if recover:
+        for job_id in recoverable():
+            _enqueue(job_id)
+        _workers.append(asyncio.create_task(_recover_loop()))
+    for _ in range(WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
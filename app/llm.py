@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from . import llm_cache, metrics
+
+if TYPE_CHECKING:
+    import httpx  # imported on first use; it is a noticeable share of cold-start time
+
+load_dotenv()
+
+# -------------------------------
+# Client settings (env overridable, or via configure() for tests/benchmarks)
+# -------------------------------
+settings = {
+    "base_url": os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1/chat/completions"),
+    "api_key": os.getenv("OPENROUTER_API_KEY"),
+    "pool_size": int(os.getenv("LLM_POOL_SIZE", "20")),
+    "http2": os.getenv("LLM_HTTP2", "1") not in ("0", "false", "False"),
+    "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+    "read_timeout": float(os.getenv("LLM_READ_TIMEOUT", "60")),
+    "keepalive_expiry": float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+    # Requests per second across the process (0 = unlimited); burst = requests allowed back to back
+    "rate_limit": float(os.getenv("LLM_RATE_LIMIT", "0")),
+    "rate_burst": int(os.getenv("LLM_RATE_BURST", "1")),
+}
+
+
+@dataclass
+class ChatResult:
+    content: str
+    model: str
+    usage: Dict = field(default_factory=dict)
+    elapsed: float = 0.0
+    ttfb: float = 0.0  # request sent → first response byte (headers)
+    cached: bool = False
+
+
+def configure(**overrides):
+    """Update client settings. Existing pools are dropped so the next call
+    picks up the new values (e.g. a local stub server's base_url)."""
+    unknown = set(overrides) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown LLM settings: {', '.join(sorted(unknown))}")
+    settings.update(overrides)
+    _clients.clear()
+    _limiter.reset()
+
+
+# -------------------------------
+# Shared connection pool (one AsyncClient per event loop)
+# -------------------------------
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _timeout(timeout: Optional[float] = None) -> "httpx.Timeout":
+    import httpx
+
+    return httpx.Timeout(
+        timeout if timeout is not None else settings["read_timeout"],
+        connect=settings["connect_timeout"],
+    )
+
+
+def get_client() -> "httpx.AsyncClient":
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        client = httpx.AsyncClient(
+            http2=settings["http2"],
+            timeout=_timeout(),
+            limits=httpx.Limits(
+                max_connections=settings["pool_size"],
+                max_keepalive_connections=settings["pool_size"],
+                keepalive_expiry=settings["keepalive_expiry"],
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    """Close the pool bound to the running loop (call on app shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _headers() -> Dict[str, str]:
+    api_key = settings["api_key"]
+    if not api_key:
+        raise RuntimeError("Set OPENROUTER_API_KEY env var in .env file or environment")
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+# -------------------------------
+# Request rate limit (shared by every loop and thread in the process)
+# -------------------------------
+class RateLimiter:
+    """Spaces requests ``1 / rate`` seconds apart after an initial burst
+    (GCRA: a single "theoretical arrival time" instead of a token count).
+    Pauses (a server's Retry-After) are per model: upstream limits are."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._paused_until: Dict[str, float] = {}
+
+    def reset(self):
+        with self._lock:
+            self._tat = 0.0
+            self._paused_until.clear()
+
+    def pause(self, seconds: float, model: str):
+        """Hold requests to ``model`` for ``seconds`` (e.g. the server's Retry-After)."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[model] = max(self._paused_until.get(model, 0.0), until)
+
+    def reserve(self, model: Optional[str] = None) -> float:
+        """Claim the next slot; returns how long to wait before using it.
+
+        A pause is a hard minimum on top of the GCRA delay: the burst
+        allowance must not let requests out before the server's Retry-After.
+        """
+        rate = settings["rate_limit"]
+        with self._lock:
+            now = time.monotonic()
+            paused = max(0.0, self._paused_until.get(model, 0.0) - now)
+            if rate <= 0:
+                return paused
+            interval = 1.0 / rate
+            tat = max(self._tat, now)
+            self._tat = tat + interval
+            return max(paused, tat - (max(1, settings["rate_burst"]) - 1) * interval - now)
+
+    async def acquire(self, model: Optional[str] = None):
+        delay = self.reserve(model)
+        if delay > 0:
+            metrics.QUEUE_SECONDS.observe(delay, queue="llm_rate_limit")
+            await asyncio.sleep(delay)
+
+
+_limiter = RateLimiter()
+
+
+def pause(seconds: float, model: str):
+    _limiter.pause(seconds, model)
+
+
+# -------------------------------
+# Response cache (mode comes from llm_cache.use_mode / LLM_CACHE_MODE)
+# -------------------------------
+async def _cache_lookup(messages, model, max_tokens, temperature, response_format=None):
+    """Return ``(key, hit)``; ``key`` is None when the cache is bypassed."""
+    mode = llm_cache.current_mode()
+    if mode == llm_cache.BYPASS:
+        return None, None
+    key = llm_cache.make_key(model, messages, max_tokens, temperature, response_format)
+    if mode in (llm_cache.READ_THROUGH, llm_cache.REPLAY):
+        hit = await asyncio.to_thread(llm_cache.get_cache().get, key)
+        if hit is not None:
+            return key, ChatResult(content=hit["content"], model=hit["model"], usage=hit.get("usage") or {}, cached=True)
+        if mode == llm_cache.REPLAY:
+            raise llm_cache.CacheMiss(f"No cached response for {model} request {key[:12]}")
+    return key, None
+
+
+async def _cache_store(key: Optional[str], result: ChatResult):
+    if key is not None:
+        value = {"content": result.content, "model": result.model, "usage": result.usage}
+        await asyncio.to_thread(llm_cache.get_cache().put, key, value)
+
+
+# -------------------------------
+# Chat completions
+# -------------------------------
+async def achat(
+    messages: List[Dict],
+    model: str,
+    max_tokens: int = 800,
+    temperature: float = 0.2,
+    timeout: Optional[float] = None,
+    response_format: Optional[Dict] = None,
+) -> ChatResult:
+    key, hit = await _cache_lookup(messages, model, max_tokens, temperature, response_format)
+    if hit is not None:
+        return hit
+    payload = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if response_format:
+        payload["response_format"] = response_format
+    await _limiter.acquire(model)
+    start = time.perf_counter()
+    async with get_client().stream(
+        "POST", settings["base_url"], headers=_headers(), json=payload, timeout=_timeout(timeout)
+    ) as resp:
+        ttfb = time.perf_counter() - start
+        resp.raise_for_status()
+        data = json.loads(await resp.aread())
+    result = ChatResult(
+        content=data["choices"][0]["message"]["content"].strip(),
+        model=data.get("model", model),
+        usage=data.get("usage") or {},
+        elapsed=time.perf_counter() - start,
+        ttfb=ttfb,
+    )
+    await _cache_store(key, result)
+    return result
+
+
+class ChatStream:
+    """Chat completion consumed as an async iterator of content deltas.
+
+    With ``stream=True`` the request uses OpenRouter's ``stream: true`` mode
+    and yields text as it arrives; otherwise it makes one regular call and
+    yields nothing. Either way ``result`` holds the ChatResult afterwards.
+    A cache hit is yielded as a single delta.
+    """
+
+    def __init__(self, messages, model, max_tokens=800, temperature=0.2, timeout=None, stream=True,
+                 response_format=None):
+        self.messages = messages
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.stream = stream
+        self.response_format = response_format
+        self.result: Optional[ChatResult] = None
+
+    async def __aiter__(self):
+        if not self.stream:
+            self.result = await achat(
+                self.messages, self.model, self.max_tokens, self.temperature, self.timeout, self.response_format
+            )
+            return
+
+        key, hit = await _cache_lookup(
+            self.messages, self.model, self.max_tokens, self.temperature, self.response_format
+        )
+        if hit is not None:
+            self.result = hit
+            if hit.content:
+                yield hit.content
+            return
+
+        payload = {
+            "model": self.model,
+            "messages": self.messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        if self.response_format:
+            payload["response_format"] = self.response_format
+        await _limiter.acquire(self.model)
+        start = time.perf_counter()
+        parts, usage, model = [], {}, self.model
+        async with get_client().stream(
+            "POST", settings["base_url"], headers=_headers(), json=payload, timeout=_timeout(self.timeout)
+        ) as resp:
+            ttfb = time.perf_counter() - start
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                # SSE: skip keep-alive comments and blank separators
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model", model)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        self.result = ChatResult(
+            content="".join(parts).strip(),
+            model=model,
+            usage=usage,
+            elapsed=time.perf_counter() - start,
+            ttfb=ttfb,
+        )
+        await _cache_store(key, self.result)
+
+
+def astream_chat(
+    messages: List[Dict],
+    model: str,
+    max_tokens: int = 800,
+    temperature: float = 0.2,
+    timeout: Optional[float] = None,
+    stream: bool = True,
+    response_format: Optional[Dict] = None,
+) -> ChatStream:
+    return ChatStream(messages, model, max_tokens, temperature, timeout, stream, response_format)
+
+
+# -------------------------------
+# Sync façade: a background loop owns the pool for blocking callers
+# -------------------------------
+_portal_loop: Optional[asyncio.AbstractEventLoop] = None
+_portal_lock = threading.Lock()
+
+
+def _portal() -> asyncio.AbstractEventLoop:
+    global _portal_loop
+    with _portal_lock:
+        if _portal_loop is None:
+            _portal_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_portal_loop.run_forever, name="llm-portal", daemon=True
+            ).start()
+    return _portal_loop
+
+
+async def _with_cache_mode(mode: str, coro):
+    with llm_cache.use_mode(mode):
+        return await coro
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared background loop and wait for it.
+
+    The caller's cache mode is carried over to the portal loop.
+    """
+    coro = _with_cache_mode(llm_cache.current_mode(), coro)
+    return asyncio.run_coroutine_threadsafe(coro, _portal()).result()
+
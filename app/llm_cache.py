@@ -0,0 +1,182 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# -------------------------------
+# Cache modes
+# -------------------------------
+BYPASS = "bypass"              # never read or write
+READ_THROUGH = "read-through"  # serve hits, call and store on miss
+RECORD = "record"              # always call, store the response
+REPLAY = "replay"              # serve hits only; a miss is an error (offline fixtures)
+MODES = (BYPASS, READ_THROUGH, RECORD, REPLAY)
+
+DEFAULT_MODE = os.getenv("LLM_CACHE_MODE", BYPASS)
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite")  # "" disables the disk tier
+TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+MAX_DISK_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def make_key(model: str, messages: List[Dict], max_tokens: int, temperature: float,
+             response_format: Optional[Dict] = None) -> str:
+    request = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+    # JSON-mode and plain replies differ; plain requests keep the keys they had before
+    if response_format:
+        request["response_format"] = response_format
+    blob = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Tiers
+# -------------------------------
+class MemoryLRU:
+    def __init__(self, max_entries: int = MEMORY_ENTRIES, ttl: float = TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Dict):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class SqliteTier:
+    """On-disk tier; evicts expired rows, then least recently used past ``max_bytes``."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = TTL, max_bytes: int = MAX_DISK_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, value: Dict):
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now, now, len(data)),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+
+class ResponseCache:
+    def __init__(self, memory: Optional[MemoryLRU] = None, disk: Optional[SqliteTier] = None):
+        self.memory = memory or MemoryLRU()
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        return value
+
+    def put(self, key: str, value: Dict):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(disk=SqliteTier(CACHE_PATH) if CACHE_PATH else None)
+    return _cache
+
+
+# -------------------------------
+# Per-request mode (inherited by tasks spawned inside the block)
+# -------------------------------
+_mode: contextvars.ContextVar[str] = contextvars.ContextVar("llm_cache_mode", default=DEFAULT_MODE)
+
+
+def current_mode() -> str:
+    return _mode.get()
+
+
+def validate_mode(mode: Optional[str]) -> str:
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(MODES)}")
+    return mode
+
+
+@contextlib.contextmanager
+def use_mode(mode: Optional[str]):
+    token = _mode.set(validate_mode(mode))
+    try:
+        yield
+    finally:
+        _mode.reset(token)
@@ -1,27 +1,40 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse, Response
-from sqlmodel import SQLModel, Session, create_engine, select
+from app import coldstart  # first, so its timer covers the imports below
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlmodel import SQLModel, Session, select
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
+import json
+import time
+import hashlib
 from pathlib import Path
+from typing import Optional
 import uuid
 import aiofiles
 from dotenv import load_dotenv
-from app import models, services
+from app import models, services, llm, llm_cache, jobs, extraction, blobstore, metrics, migrations, pagination, persistence, structured, ocr, dispatch
+from app.db import get_engine, SERVERLESS
 
 load_dotenv()
+coldstart.imports_done()
 
-DatabaseUrl = os.getenv("DB_URL")
-
-
-DB_URL = DatabaseUrl
-engine = create_engine(DB_URL, echo=False)
 app = FastAPI(title="AI Courtroom MVP")
 
 # Directory for uploaded files
 UPLOAD_DIR = Path("./uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Apply pending schema changes (new columns, indexes, foreign keys) on startup.
+# Serverless cold starts skip this and crash recovery; run
+# `python -m app.scripts.init_db` on deploy instead.
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "0" if SERVERLESS else "1") not in ("0", "false", "False")
+RECOVER_ON_STARTUP = os.getenv("RECOVER_ON_STARTUP", "0" if SERVERLESS else "1") not in ("0", "false", "False")
+
+# Uploads are streamed to disk in chunks and capped at this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
 # Enhanced CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -60,18 +73,59 @@ def preflight_handler(full_path: str):
         }
     )
 
+def cache_mode(cache: Optional[str]) -> str:
+    """Validate the ``cache`` query param (bypass | read-through | record | replay)"""
+    try:
+        return llm_cache.validate_mode(cache)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not the raw path, to keep cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - start, method=request.method, route=route, status=response.status_code
+    )
+    coldstart.first_response(request.url.path)
+    return response
+
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
+async def on_startup():
+    if AUTO_MIGRATE:
+        migrations.upgrade(get_engine())
+    elif not SERVERLESS:
+        SQLModel.metadata.create_all(get_engine())
+    if RECOVER_ON_STARTUP:
+        blobstore.resume_pending()
+    jobs.start(recover=RECOVER_ON_STARTUP)
+    await asyncio.to_thread(ocr.check)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await jobs.stop()
+    await llm.aclose()
+    extraction.shutdown()
+    ocr.shutdown()
+
+def fields_param(model, fields: Optional[str], default_exclude=()):
+    """Validate a ``fields=a,b`` projection against the model's columns"""
+    try:
+        return pagination.parse_fields(model, fields, default_exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ---- GET ALL CASES ----
 @app.get("/cases")
-def get_cases():
-    """Get all cases"""
+def get_cases(after: Optional[int] = None, limit: Optional[int] = None, fields: Optional[str] = None):
+    """Get cases, a page at a time (pass ``next_after`` back as ``after``)"""
+    columns = fields_param(models.Case, fields)
     try:
-        with Session(engine) as sess:
-            cases = sess.exec(select(models.Case)).all()
-            return {"cases": cases, "count": len(cases)}
+        with Session(get_engine()) as sess:
+            cases, next_after = pagination.keyset_page(sess, models.Case, columns, after=after, limit=limit)
+            return {"cases": cases, "count": len(cases), "next_after": next_after}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching cases: {str(e)}")
 
@@ -79,7 +133,7 @@ def get_cases():
 @app.get("/cases/{case_id}")
 def get_case(case_id: int):
     """Get a specific case by ID"""
-    with Session(engine) as sess:
+    with Session(get_engine()) as sess:
         case = sess.get(models.Case, case_id)
         if not case:
             raise HTTPException(status_code=404, detail="Case not found")
@@ -90,7 +144,7 @@ def get_case(case_id: int):
 def create_case(payload: models.CaseCreate):
     """Create a new case"""
     try:
-        with Session(engine) as sess:
+        with Session(get_engine()) as sess:
             case = models.Case.model_validate(payload)
             sess.add(case)
             sess.commit()
@@ -100,156 +154,420 @@ def create_case(payload: models.CaseCreate):
         raise HTTPException(status_code=500, detail=f"Error creating case: {str(e)}")
 
 # ---- EVIDENCE UPLOAD ----
+def _case_exists(case_id: int) -> bool:
+    with Session(get_engine()) as sess:
+        return sess.get(models.Case, case_id) is not None
+
+
+def _record_upload(case_id: int, party: str, filename: Optional[str], tmp: Path, sha256: str, size: int):
+    """Move the upload into the blob store and add its Evidence row; ``(evidence, created)``."""
+    with Session(get_engine()) as sess:
+        blob, created = blobstore.adopt(sess, tmp, sha256, size, Path(filename or "").suffix)
+        ev = models.Evidence(
+            case_id=case_id,
+            filename=filename,
+            stored_path=blob.stored_path,
+            extracted_text="",
+            party=party,
+            status=blob.status,
+            size=size,
+            blob_sha256=sha256,
+        )
+        sess.add(ev)
+        sess.commit()
+        sess.refresh(ev)
+        return ev, created
+
+
 @app.post("/cases/{case_id}/evidence")
 async def upload_evidence(
     case_id: int,
     file: UploadFile = File(...),
     party: str = Form(...)
 ):
-    """Upload evidence for a case"""
-    with Session(engine) as sess:
-        case = sess.get(models.Case, case_id)
-        if not case:
-            raise HTTPException(status_code=404, detail="Case not found")
+    """Upload evidence for a case; new content is extracted in the background.
 
-        filename = f"{uuid.uuid4().hex}_{file.filename}"
-        dest = UPLOAD_DIR / filename
+    No database connection is held while the body is streamed to disk.
+    """
+    if not await asyncio.to_thread(_case_exists, case_id):
+        raise HTTPException(status_code=404, detail="Case not found")
 
-        try:
-            async with aiofiles.open(dest, "wb") as out:
-                content = await file.read()
-                await out.write(content)
-
-            text = services.extract_text_from_file(dest)
-
-            ev = models.Evidence(
-                case_id=case_id,
-                filename=file.filename,
-                stored_path=str(dest),
-                extracted_text=text,
-                party=party,
+    # Written under a temp name, then moved into the content-addressed store
+    dest = UPLOAD_DIR / f"{uuid.uuid4().hex}.part"
+
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        async with aiofiles.open(dest, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    break
+                digest.update(chunk)
+                await out.write(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            dest.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit",
             )
-            sess.add(ev)
-            sess.commit()
-            sess.refresh(ev)
-            return ev
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error uploading evidence: {str(e)}")
+
+        sha256 = digest.hexdigest()
+        ev, created = await asyncio.to_thread(_record_upload, case_id, party, file.filename, dest, sha256, size)
+        if created:
+            blobstore.schedule_extraction(sha256)
+        return ev
+    except HTTPException:
+        raise
+    except Exception as e:
+        dest.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=f"Error uploading evidence: {str(e)}")
 
 # ---- GET CASE EVIDENCE ----
 @app.get("/cases/{case_id}/evidence")
-def get_evidence(case_id: int):
-    """Get all evidence for a case"""
-    with Session(engine) as sess:
+def get_evidence(case_id: int, after: Optional[int] = None, limit: Optional[int] = None, fields: Optional[str] = None):
+    """Get evidence for a case, a page at a time.
+
+    ``extracted_text`` is only included when listed in ``fields``; use the
+    ``/text`` endpoint to read large documents in slices.
+    """
+    columns = fields_param(models.Evidence, fields, default_exclude=("extracted_text",))
+    with_text = "extracted_text" in columns
+    query_columns = columns + (["blob_sha256"] if with_text and "blob_sha256" not in columns else [])
+    with Session(get_engine()) as sess:
         case = sess.get(models.Case, case_id)
         if not case:
             raise HTTPException(status_code=404, detail="Case not found")
-        
-        evidence = sess.exec(
-            select(models.Evidence).where(models.Evidence.case_id == case_id)
-        ).all()
-        
-        return {"evidence": evidence, "count": len(evidence)}
+
+        rows, next_after = pagination.keyset_page(
+            sess, models.Evidence, query_columns, models.Evidence.case_id == case_id,
+            after=after, limit=limit,
+        )
+        if with_text:
+            texts = blobstore.texts_by_sha(sess, [r["blob_sha256"] for r in rows if r["blob_sha256"]])
+            for r in rows:
+                if r["blob_sha256"]:
+                    r["extracted_text"] = texts.get(r["blob_sha256"], "")
+                if "blob_sha256" not in columns:
+                    del r["blob_sha256"]
+
+        return {"evidence": rows, "count": len(rows), "next_after": next_after}
+
+# ---- EVIDENCE TEXT SLICE ----
+@app.get("/cases/{case_id}/evidence/{evidence_id}/text")
+def get_evidence_text(
+    case_id: int,
+    evidence_id: int,
+    offset: int = 0,
+    length: int = 20000,
+    page_start: Optional[int] = None,
+    page_end: Optional[int] = None,
+):
+    """Read extracted text by character range, or by page range (0-based, end exclusive)"""
+    if offset < 0 or length < 1:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and length >= 1")
+    length = min(length, pagination.MAX_TEXT_SLICE)
+    with Session(get_engine()) as sess:
+        ev = sess.get(models.Evidence, evidence_id)
+        if not ev or ev.case_id != case_id:
+            raise HTTPException(status_code=404, detail="Evidence not found")
+
+        if page_start is not None or page_end is not None:
+            if not ev.blob_sha256:
+                raise HTTPException(status_code=400, detail="Page ranges are not available for this evidence")
+            start = page_start or 0
+            pages = blobstore.page_slice(sess, ev.blob_sha256, start, page_end)
+            return {"evidence_id": evidence_id, "status": ev.status, "page_start": start, "pages": pages}
+
+        text, total = blobstore.text_slice(sess, ev, offset, length)
+        end = offset + len(text)
+        return {
+            "evidence_id": evidence_id,
+            "status": ev.status,
+            "offset": offset,
+            "text": text,
+            "total_length": total,
+            "next_offset": end if end < total else None,
+        }
+
+# ---- DELETE EVIDENCE ----
+@app.delete("/cases/{case_id}/evidence/{evidence_id}")
+def delete_evidence(case_id: int, evidence_id: int):
+    """Remove evidence from a case and drop its reference to the stored blob"""
+    with Session(get_engine()) as sess:
+        ev = sess.get(models.Evidence, evidence_id)
+        if not ev or ev.case_id != case_id:
+            raise HTTPException(status_code=404, detail="Evidence not found")
+        if ev.blob_sha256:
+            blobstore.release(sess, ev.blob_sha256)
+        sess.delete(ev)
+        sess.commit()
+        return {"deleted": evidence_id}
 
 # ---- CASE SIMULATION ----
 @app.post("/cases/{case_id}/simulate")
-def simulate(case_id: int):
+async def simulate(case_id: int, cache: Optional[str] = None):
     """Run simulation for a case"""
-    with Session(engine) as sess:
-        case = sess.get(models.Case, case_id)
-        if not case:
-            raise HTTPException(status_code=404, detail="Case not found")
-
-        # Fetch evidence by party
-        defense_evidence = sess.exec(
-            select(models.Evidence).where(
-                (models.Evidence.case_id == case_id)
-                & (models.Evidence.party == "Defense")
-            )
-        ).all()
-
-        opposition_evidence = sess.exec(
-            select(models.Evidence).where(
-                (models.Evidence.case_id == case_id)
-                & (models.Evidence.party == "Opposition")
+    mode = cache_mode(cache)
+    # Defense evidence first, then opposition (loaded in a worker thread)
+    loaded = await jobs.load_case(case_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+    (payload,), provider = loaded
+
+    # Turns are written in batches as they are produced
+    writer = persistence.RunWriter(case_id, payload["simulationSettings"], services.MODEL)
+    await writer.astart()
+    return await record_simulation(writer, payload, provider, mode)
+
+async def record_simulation(writer: persistence.RunWriter, payload: dict, provider, mode: str):
+    """Run (or resume) a simulation into ``writer``'s run; shared by /simulate and run resume"""
+    try:
+        with llm_cache.use_mode(mode):
+            transcript, judge = await services.run_resumable(
+                payload, provider=provider, resume=writer.checkpoint(), usage_calls=writer.usage_calls,
+                on_turn=lambda t: writer.aadd_turn(t["agent"], t["content"], t["round"], t["structured"]),
             )
-        ).all()
-
-        # Build payload dict expected by services.run_simulation
-        payload = {
-            "caseInfo": {
-                "title": case.title,
-                "caseType": case.case_type,
-                "incidentDate": "Unknown",
-                "location": "Unknown",
-            },
-            "userClaim": {
-                "mainClaim": case.description,
-                "objective": "Win case",
-                "supportingStatement": "The defense has evidence to support its position.",
-            },
-            "evidence": {
-                "files": [ev.stored_path for ev in (defense_evidence + opposition_evidence)]
-            },
-            "opposition": {
-                "anticipatedArguments": "The opposition disagrees with the claim.",
-                "probableWeaknesses": "Insufficient proof.",
-            },
-            "simulationSettings": {
-                "trialDepth": "standard",   # later can be configurable
-                "tone": "formal",
-                "verdictOutput": "summary",
-            },
-        }
-
+        await writer.afinish(judge)
+
+        return {"run_id": writer.run_id, "transcript": transcript, "judge": judge, "usage": judge.get("usage")}
+    except llm_cache.CacheMiss as e:
+        await writer.afail(str(e))
+        raise HTTPException(status_code=409, detail=f"Replay cache miss: {str(e)}")
+    except structured.VerdictError as e:
+        await writer.afail(str(e))
+        raise HTTPException(status_code=502, detail=f"Error reading verdict: {str(e)}")
+    except dispatch.LLMUnavailable as e:
+        # Completed turns are kept; POST .../runs/{run_id}/resume continues from them
+        await writer.afail(str(e))
+        headers = {"Retry-After": str(int(e.retry_after or dispatch.BREAKER_COOLDOWN))}
+        raise HTTPException(
+            status_code=503, detail=f"Error running simulation: {str(e)} (resumable run {writer.run_id})", headers=headers
+        )
+    except Exception as e:
+        await writer.afail(str(e))
+        raise HTTPException(status_code=500, detail=f"Error running simulation: {str(e)}")
+
+# ---- BATCH "WHAT-IF" SIMULATION ----
+@app.post("/cases/{case_id}/simulate/batch")
+async def simulate_batch(case_id: int, batch: models.BatchSimulationRequest, cache: Optional[str] = None):
+    """Run several settings variants of a case concurrently and aggregate win probabilities"""
+    mode = cache_mode(cache)
+    if not batch.variants:
+        raise HTTPException(status_code=400, detail="At least one variant is required")
+    if len(batch.variants) > jobs.BATCH_MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {jobs.BATCH_MAX_VARIANTS} variants per batch")
+    if not 1 <= batch.concurrency <= jobs.BATCH_MAX_CONCURRENCY:
+        raise HTTPException(
+            status_code=400, detail=f"concurrency must be between 1 and {jobs.BATCH_MAX_CONCURRENCY}"
+        )
+
+    loaded = await jobs.load_case(case_id, *(v.model_dump() for v in batch.variants))
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+    payloads, provider = loaded
+
+    # Same admission control as queued simulations
+    try:
+        await asyncio.to_thread(jobs.admit_batch, len(payloads))
+    except jobs.QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Simulation queue is full: {str(e)}")
+    start = time.perf_counter()
+    try:
+        with llm_cache.use_mode(mode):
+            results = await services.run_batch(payloads, provider=provider, concurrency=batch.concurrency)
+    finally:
+        jobs.release_batch(len(payloads))
+    return {
+        "results": results,
+        "stats": services.batch_stats(results),
+        "elapsed": time.perf_counter() - start,
+    }
+
+# ---- STREAMED CASE SIMULATION (SSE) ----
+@app.get("/cases/{case_id}/simulate/stream")
+async def simulate_stream(case_id: int, tokens: bool = True, trialDepth: str = "standard", cache: Optional[str] = None):
+    """Run a simulation, streaming each turn (and token deltas) as Server-Sent Events.
+
+    ``delta`` events carry the text of the turn as it is generated: the
+    counsel's argument, the judge's assessment or the verdict justification,
+    decoded from the model's JSON reply. The structured fields arrive with
+    the ``turn`` and ``verdict`` events.
+    """
+    mode = cache_mode(cache)
+    loaded = await jobs.load_case(case_id, {"trialDepth": trialDepth})
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+    (payload,), provider = loaded
+
+    async def events():
+        writer = persistence.RunWriter(case_id, payload["simulationSettings"], services.MODEL)
+        await writer.astart()
+        done = False
         try:
-            transcript, judge = services.run_simulation(payload)
-
-            # Save transcript lines
-            for t in transcript:
-                entry = models.Transcript(
-                    case_id=case_id,
-                    agent=t["agent"],
-                    content=t["content"]
-                )
-                sess.add(entry)
-
-            # Save judge result
-            judge_row = models.JudgeResult(
-                case_id=case_id,
-                win_probability=judge["win_probability"],
-                breakdown=str(judge.get("breakdown", "")),
-                justification=judge.get("justification", ""),
-            )
-            sess.add(judge_row)
+            for attempt in range(services.RESUME_ATTEMPTS + 1):
+                try:
+                    with llm_cache.use_mode(mode):
+                        async for ev in services.iter_simulation(
+                            payload, provider=provider, stream_tokens=tokens, resume=writer.checkpoint(),
+                            usage_calls=writer.usage_calls,
+                        ):
+                            if ev.get("resumed"):
+                                continue  # already sent before the retry
+                            # Persist as we go so a dropped connection keeps completed turns
+                            if ev["event"] == "turn":
+                                await writer.aadd_turn(ev["agent"], ev["content"], ev["round"], ev["structured"])
+                            elif ev["event"] == "verdict":
+                                await writer.afinish(ev["judge"])
+                                done = True
+                                ev["run_id"] = writer.run_id
+                            yield f"event: {ev['event']}\ndata: {json.dumps(ev)}\n\n"
+                    break
+                except dispatch.LLMUnavailable as e:
+                    if attempt >= services.RESUME_ATTEMPTS:
+                        raise
+                    # Deltas of the interrupted turn are superseded by the retried one
+                    retry = {"event": "retry", "detail": str(e), "attempt": attempt + 1}
+                    yield f"event: retry\ndata: {json.dumps(retry)}\n\n"
+                    await asyncio.sleep(dispatch.backoff(attempt + 2, e.retry_after))
+        except Exception as e:
+            await writer.afail(str(e))
+            done = True
+            yield f"event: error\ndata: {json.dumps({'detail': f'Error running simulation: {str(e)}'})}\n\n"
+        finally:
+            if not done:
+                await writer.afail("Client disconnected")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            sess.commit()
+# ---- SUBMIT SIMULATION JOB ----
+@app.post("/cases/{case_id}/simulations", status_code=202)
+def submit_simulation(case_id: int, settings: Optional[models.SimulationRequest] = None, cache: Optional[str] = None):
+    """Queue a simulation for a case and return its job id"""
+    mode = cache_mode(cache)
+    with Session(get_engine()) as sess:
+        case = sess.get(models.Case, case_id)
+        if not case:
+            raise HTTPException(status_code=404, detail="Case not found")
 
-            return {"transcript": transcript, "judge": judge}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error running simulation: {str(e)}")
+    try:
+        job = jobs.submit(case_id, (settings or models.SimulationRequest()).model_dump(), mode)
+    except jobs.QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Simulation queue is full: {str(e)}")
+    return {"job_id": job.id, "status": job.status}
+
+# ---- SIMULATION JOB STATUS ----
+@app.get("/cases/{case_id}/simulations/{job_id}")
+def get_simulation(case_id: int, job_id: str):
+    """Get status and partial transcript of a simulation job"""
+    with Session(get_engine()) as sess:
+        job = sess.get(models.SimulationJob, job_id)
+        if not job or job.case_id != case_id:
+            raise HTTPException(status_code=404, detail="Simulation not found")
+        return jobs.job_view(job)
 
 # ---- CASE TRANSCRIPT ----
 @app.get("/cases/{case_id}/transcript")
 def get_transcript(case_id: int):
-    """Get transcript and judge result for a case"""
-    with Session(engine) as sess:
+    """Get transcript and judge result of the case's latest successful run"""
+    with Session(get_engine()) as sess:
         case = sess.get(models.Case, case_id)
         if not case:
             raise HTTPException(status_code=404, detail="Case not found")
 
+        if case.latest_run_id:
+            run = sess.get(models.SimulationRun, case.latest_run_id)
+            if run:
+                return {"case": case, **persistence.run_document(sess, run)}
+
+        # Cases simulated before runs were recorded
         trans = sess.exec(
-            select(models.Transcript).where(models.Transcript.case_id == case_id)
+            select(models.Transcript)
+            .where(models.Transcript.case_id == case_id)
+            .where(models.Transcript.run_id.is_(None))
+            .order_by(models.Transcript.turn, models.Transcript.id)
         ).all()
 
         judge = sess.exec(
-            select(models.JudgeResult).where(models.JudgeResult.case_id == case_id)
+            select(models.JudgeResult)
+            .where(models.JudgeResult.case_id == case_id)
+            .order_by(models.JudgeResult.id.desc())
         ).first()
 
-        return {"case": case, "transcript": trans, "judge": judge}
+        return {"case": case, "transcript": [{"id": t.id, **persistence.turn_row(t)} for t in trans], "judge": judge}
+
+# ---- SIMULATION RUNS ----
+@app.get("/cases/{case_id}/runs")
+def get_runs(case_id: int, limit: Optional[int] = None):
+    """List a case's simulation runs, newest first (without their documents)"""
+    columns = [c for c in pagination.columns_of(models.SimulationRun) if c not in ("document", "document_z")]
+    with Session(get_engine()) as sess:
+        case = sess.get(models.Case, case_id)
+        if not case:
+            raise HTTPException(status_code=404, detail="Case not found")
+
+        rows = sess.exec(
+            select(*[getattr(models.SimulationRun, c) for c in columns])
+            .where(models.SimulationRun.case_id == case_id)
+            .order_by(models.SimulationRun.created_at.desc())
+            .limit(pagination.clamp_limit(limit))
+        ).all()
+        runs = []
+        for r in rows:
+            run = dict(r._mapping)
+            for key in ("settings", "usage", "timings"):
+                run[key] = json.loads(run[key]) if run[key] else None
+            runs.append(run)
+        return {"runs": runs, "count": len(runs), "latest_run_id": case.latest_run_id}
+
+@app.get("/cases/{case_id}/runs/{run_id}")
+def get_run(case_id: int, run_id: str):
+    """Transcript, verdict, settings, usage and timings of one simulation run"""
+    with Session(get_engine()) as sess:
+        run = sess.get(models.SimulationRun, run_id)
+        if not run or run.case_id != case_id:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return persistence.run_document(sess, run)
+
+def _get_run(case_id: int, run_id: str) -> models.SimulationRun:
+    with Session(get_engine()) as sess:
+        run = sess.get(models.SimulationRun, run_id)
+        if not run or run.case_id != case_id:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return run
+
+@app.post("/cases/{case_id}/runs/{run_id}/resume")
+async def resume_run(case_id: int, run_id: str, cache: Optional[str] = None):
+    """Continue a failed run (model chain down, client disconnected, ...) from its completed turns"""
+    mode = cache_mode(cache)
+    run = await asyncio.to_thread(_get_run, case_id, run_id)
+    if run.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed runs can be resumed (run is {run.status})")
+    (payload,), provider = await jobs.load_case(case_id, json.loads(run.settings or "{}"))
+
+    writer = await asyncio.to_thread(persistence.RunWriter.reopen, run_id)
+    if writer is None:
+        raise HTTPException(status_code=409, detail="Run cannot be resumed")
+    return await record_simulation(writer, payload, provider, mode)
+
+# ---- METRICS ----
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text-format metrics for this process"""
+    for phase, value in coldstart.stats.items():
+        if isinstance(value, float):
+            metrics.COLD_START_SECONDS.set(value, phase=phase.removesuffix("_s"))
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # ---- HEALTH CHECK ----
 @app.get("/health")
 def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "AI Courtroom MVP API"}
\ No newline at end of file
+    """Health check endpoint; ``llm_breakers`` maps each model called so far to its circuit state"""
+    return {
+        "status": "healthy", "service": "AI Courtroom MVP API", "ocr": ocr.available(),
+        "llm_breakers": dispatch.breaker_states(), "cold_start": coldstart.stats,
+    }
\ No newline at end of file
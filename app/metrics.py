@@ -0,0 +1,210 @@
+import bisect
+import contextlib
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# -------------------------------
+# Minimal Prometheus-style registry (text exposition format, no dependency)
+# -------------------------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple("" if labels.get(n) is None else labels[n] for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List] = {}  # key → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in self._series.items():
+                running = 0
+                for bound, count in zip(self.buckets, series):
+                    running += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# -------------------------------
+# Application metrics
+# -------------------------------
+HTTP_SECONDS = Histogram(
+    "courtroom_http_request_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+STAGE_SECONDS = Histogram(
+    "courtroom_stage_seconds", "Simulation pipeline stage latency", ["stage", "agent", "round"]
+)
+LLM_SECONDS = Histogram(
+    "courtroom_llm_call_seconds", "LLM call latency, request to last token", ["agent", "model", "cached"]
+)
+LLM_TTFB_SECONDS = Histogram(
+    "courtroom_llm_ttfb_seconds", "LLM time to first byte", ["agent", "model"]
+)
+LLM_TOKENS = Counter(
+    "courtroom_llm_tokens_total", "Tokens reported by OpenRouter usage", ["agent", "kind"]
+)
+LLM_RETRIES = Counter(
+    "courtroom_llm_retries_total", "LLM calls retried on the same model", ["model", "reason"]
+)
+LLM_FALLBACKS = Counter(
+    "courtroom_llm_fallbacks_total", "LLM calls moved to a fallback model", ["model"]
+)
+LLM_BREAKER_OPEN = Gauge(
+    "courtroom_llm_breaker_open", "1 while a model's circuit breaker is open", ["model"]
+)
+QUEUE_SECONDS = Histogram(
+    "courtroom_queue_seconds", "Time waiting for a worker or concurrency slot", ["queue"]
+)
+SIMULATIONS = Counter(
+    "courtroom_simulations_total", "Finished simulation runs", ["status"]
+)
+SIMULATION_LLM_CALLS = Histogram(
+    "courtroom_simulation_llm_calls", "LLM calls per finished simulation", ["stop_reason"],
+    buckets=(2, 3, 5, 7, 9, 11, 13, 15, 20, 30),
+)
+OCR_PAGES = Counter(
+    "courtroom_ocr_pages_total", "Pages sent to OCR", ["result"]
+)
+COLD_START_SECONDS = Gauge(
+    "courtroom_cold_start_seconds", "Cold-start phases of this process", ["phase"]
+)
+
+
+# -------------------------------
+# Per-run timing breakdown
+# -------------------------------
+def _round_label(round_no: Optional[int]) -> str:
+    return "final" if round_no is None else str(round_no)
+
+
+class RunTimer:
+    """Collects stage timings for one simulation run and feeds the histograms."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    def add(self, stage: str, seconds: float, agent: Optional[str] = None, round_no: Optional[int] = None, **extra):
+        STAGE_SECONDS.observe(seconds, stage=stage, agent=agent, round=_round_label(round_no) if agent else None)
+        self.spans.append({"stage": stage, "agent": agent, "round": round_no, "seconds": round(seconds, 4), **extra})
+
+    @contextlib.contextmanager
+    def span(self, stage: str, agent: Optional[str] = None, round_no: Optional[int] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, agent, round_no)
+
+    def llm(self, agent: str, round_no: Optional[int], result):
+        """Record one ChatResult: latency, TTFB and token usage."""
+        cached = "1" if result.cached else "0"
+        LLM_SECONDS.observe(result.elapsed, agent=agent, model=result.model, cached=cached)
+        if not result.cached:
+            LLM_TTFB_SECONDS.observe(result.ttfb, agent=agent, model=result.model)
+            usage = result.usage or {}
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if usage.get(kind):
+                    LLM_TOKENS.inc(usage[kind], agent=agent, kind=kind.split("_")[0])
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+            if cached_tokens:
+                LLM_TOKENS.inc(cached_tokens, agent=agent, kind="cached")
+        self.add("llm", result.elapsed, agent, round_no, ttfb=round(result.ttfb, 4), cached=result.cached)
+
+    def breakdown(self) -> Dict:
+        by_stage: Dict[str, float] = {}
+        by_round: Dict[str, float] = {}
+        for s in self.spans:
+            by_stage[s["stage"]] = by_stage.get(s["stage"], 0.0) + s["seconds"]
+            if s["stage"] == "llm":
+                key = _round_label(s["round"])
+                by_round[key] = by_round.get(key, 0.0) + s["seconds"]
+        return {
+            "total": round(time.perf_counter() - self.started, 4),
+            "by_stage": {k: round(v, 4) for k, v in by_stage.items()},
+            "llm_by_round": {k: round(v, 4) for k, v in by_round.items()},
+            "spans": self.spans,
+        }
@@ -0,0 +1,74 @@
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+from app import models  # noqa: F401  (registers the tables)
+
+log = logging.getLogger(__name__)
+
+
+# -------------------------------
+# In-place upgrade for databases created by older versions
+# -------------------------------
+def _column_ddl(engine: Engine, column) -> str:
+    ddl = f"{engine.dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=engine.dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        literal = ("TRUE" if default else "FALSE") if isinstance(default, bool) else repr(default)
+        ddl += f" DEFAULT {literal}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Create missing tables, then add missing columns, indexes and foreign keys.
+
+    Safe to run repeatedly; returns the statements/objects it applied.
+    New columns get their model default so existing rows stay valid.
+    Foreign keys are only added on PostgreSQL, as ``NOT VALID`` so rows
+    written before the constraint existed don't block the upgrade.
+    """
+    applied: List[str] = []
+    SQLModel.metadata.create_all(engine)
+    insp = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    stmt = f"ALTER TABLE {quote(table.name)} ADD COLUMN {_column_ddl(engine, column)}"
+                    conn.execute(text(stmt))
+                    applied.append(stmt)
+
+            if engine.dialect.name == "postgresql":
+                have = {tuple(fk["constrained_columns"]) for fk in insp.get_foreign_keys(table.name)}
+                for fk in table.foreign_key_constraints:
+                    cols = tuple(c.name for c in fk.columns)
+                    if cols in have:
+                        continue
+                    name = f"fk_{table.name}_{'_'.join(cols)}"
+                    stmt = (
+                        f"ALTER TABLE {quote(table.name)} ADD CONSTRAINT {quote(name)} "
+                        f"FOREIGN KEY ({', '.join(quote(c) for c in cols)}) "
+                        f"REFERENCES {quote(fk.referred_table.name)} "
+                        f"({', '.join(quote(e.column.name) for e in fk.elements)}) NOT VALID"
+                    )
+                    conn.execute(text(stmt))
+                    applied.append(stmt)
+
+    for table in SQLModel.metadata.sorted_tables:
+        have = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in have:
+                index.create(engine, checkfirst=True)
+                applied.append(f"CREATE INDEX {index.name}")
+
+    for stmt in applied:
+        log.info("migration: %s", stmt)
+    return applied
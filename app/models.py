@@ -1,7 +1,10 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlalchemy import Column, Index, LargeBinary
+from sqlalchemy.orm import deferred
+from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+import uuid
 
 class Case(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -9,6 +12,7 @@ class Case(SQLModel, table=True):
     description: str
     case_type: Optional[str] = "general"
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    latest_run_id: Optional[str] = None  # last successful SimulationRun
 
 class CaseCreate(BaseModel):
     title: str
@@ -16,22 +20,122 @@ class CaseCreate(BaseModel):
     case_type: Optional[str] = "general"
 
 class Evidence(SQLModel, table=True):
+    __table_args__ = (Index("ix_evidence_case_id_party", "case_id", "party"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    case_id: int
+    case_id: int = Field(foreign_key="case.id", index=True)
     filename: str
     stored_path: str
     extracted_text: Optional[str] = ""
     party: Optional[str] = None
+    status: str = "ready"  # extracting | ready | failed
+    size: Optional[int] = None
+    blob_sha256: Optional[str] = Field(default=None, foreign_key="blob.sha256", index=True)  # content hash; text lives on the Blob
+
+class Blob(SQLModel, table=True):
+    """Content-addressed upload shared by every Evidence row with the same bytes."""
+    sha256: str = Field(primary_key=True)
+    size: int
+    stored_path: str
+    refcount: int = 0
+    status: str = "extracting"  # extracting | ready | failed
+    extracted_text: Optional[str] = ""  # legacy; text now lives compressed in BlobText
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    extracted_at: Optional[datetime] = None
+    page_count: Optional[int] = None
+
+class BlobPage(SQLModel, table=True):
+    """Per-page extracted text of blobs extracted before BlobText existed."""
+    blob_sha256: str = Field(primary_key=True)
+    page_no: int = Field(primary_key=True)  # 0-based
+    text: str = ""
+
+class BlobText(SQLModel, table=True):
+    """Compressed extracted text of a blob, one frame per page (see textstore).
+
+    Kept off the Blob row so blob lookups never read it; slices fetch only
+    the frames they need."""
+    blob_sha256: str = Field(primary_key=True)
+    length: int = 0    # characters in the joined text (pages separated by PAGE_BREAK)
+    raw_size: int = 0  # UTF-8 bytes before compression
+    pages: str = "[]"  # JSON [[char_start, byte_start, byte_stop], ...] per page
+    data: bytes = Field(default=b"", sa_column=Column(LargeBinary, nullable=False))
+
+class BlobChunk(SQLModel, table=True):
+    """Retrieval chunk of a blob's text: offsets into the joined BlobText pages plus term counts."""
+    blob_sha256: str = Field(primary_key=True)
+    ord: int = Field(primary_key=True)
+    page_no: int
+    start: int
+    stop: int
+    terms: str = "{}"  # JSON {term: frequency}, precomputed for BM25
+
+_run_document_z = Column("document_z", LargeBinary, nullable=True)
+
+class SimulationRun(SQLModel, table=True):
+    """One simulation of a case; its transcript turns and verdict point back here."""
+    __table_args__ = (Index("ix_simulationrun_case_id_created_at", "case_id", "created_at"),)
+    # The document is only loaded when accessed, not with every run lookup
+    __mapper_args__ = {"properties": {"document_z": deferred(_run_document_z)}}
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    case_id: int = Field(foreign_key="case.id", index=True)
+    status: str = "running"  # running | succeeded | failed
+    error: Optional[str] = None
+    settings: str = "{}"  # JSON simulationSettings used
+    model: Optional[str] = None
+    turn_count: int = 0
+    usage: Optional[str] = None    # JSON token usage report
+    timings: Optional[str] = None  # JSON wall-clock timings (seconds)
+    document: Optional[str] = None  # legacy uncompressed document_z
+    document_z: Optional[bytes] = Field(default=None, sa_column=_run_document_z)  # packed JSON transcript response
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
 
 class Transcript(SQLModel, table=True):
+    __table_args__ = (Index("ix_transcript_run_id_turn", "run_id", "turn"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    case_id: int
+    case_id: int = Field(foreign_key="case.id", index=True)
+    run_id: Optional[str] = Field(default=None, foreign_key="simulationrun.id", index=True)
+    turn: int = 0  # position within the run (within the case for rows without a run)
     agent: str
-    content: str
+    content: str  # empty when the turn is stored packed in content_z
+    content_z: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary, nullable=True))
+    round_no: Optional[int] = None  # trial round; None for rows written before runs were resumable
+    structured: Optional[str] = None  # JSON of the parsed counsel/judge turn, used to resume a run
 
 class JudgeResult(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    case_id: int
+    case_id: int = Field(foreign_key="case.id", index=True)
+    run_id: Optional[str] = Field(default=None, foreign_key="simulationrun.id", index=True)
     win_probability: float
     breakdown: str
     justification: str
+    timings: Optional[str] = None  # JSON per-run timing breakdown (stages, agents, rounds, DB)
+
+class SimulationJob(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    case_id: int = Field(foreign_key="case.id", index=True)
+    status: str = Field(default="queued", index=True)  # queued | running | succeeded | failed
+    settings: str = "{}"       # JSON simulationSettings overrides
+    cache_mode: Optional[str] = None  # LLM response cache mode for this run
+    run_id: Optional[str] = None  # SimulationRun holding the persisted turns
+    transcript: str = "[]"     # JSON list of turns produced so far
+    result: Optional[str] = None  # JSON judge result once finished
+    error: Optional[str] = None
+    owner: Optional[str] = None   # process that claimed the job (jobs.OWNER)
+    heartbeat_at: Optional[datetime] = None  # refreshed by the owner while running
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class SimulationRequest(BaseModel):
+    trialDepth: Optional[str] = "standard"
+    tone: Optional[str] = "formal"
+    verdictOutput: Optional[str] = "summary"
+    parallelOpenings: Optional[bool] = False
+
+class BatchSimulationRequest(BaseModel):
+    variants: List[SimulationRequest]
+    concurrency: int = 4
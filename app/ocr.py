@@ -0,0 +1,280 @@
+"""OCR for images and scanned PDF pages.
+
+Pages that pdfminer returns (almost) no text for are rasterized with
+pypdfium2 (in requirements.txt), preprocessed (grayscale,
+DPI normalization, deskew) and run through Tesseract on a bounded process
+pool. Results are cached per page on disk, keyed by file hash, page and OCR
+settings. Without pypdfium2 or the tesseract binary (a system package, e.g.
+``apt install tesseract-ocr``), OCR is skipped and extraction returns what
+pdfminer found; ``check`` logs a warning about it at startup.
+"""
+import hashlib
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") not in ("0", "false", "False")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))  # seconds per page, enforced on tesseract
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_PSM = int(os.getenv("OCR_PSM", "3"))  # Tesseract page segmentation: fully automatic
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "4000"))  # downscale larger images (px)
+OCR_MAX_SKEW = float(os.getenv("OCR_MAX_SKEW", "5"))  # degrees searched either way
+OCR_DESKEW = os.getenv("OCR_DESKEW", "1") not in ("0", "false", "False")
+# A PDF page with fewer non-blank characters than this is treated as scanned
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", ".ocr_cache")  # "" disables the page cache
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".tiff", ".tif", ".bmp")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_available: Optional[bool] = None
+_unavailable_reason = ""
+
+
+def available() -> bool:
+    """True when both the rasterizer and the tesseract binary are usable."""
+    global _available, _unavailable_reason
+    if _available is None:
+        try:
+            import pypdfium2  # noqa: F401
+            import pytesseract
+
+            pytesseract.get_tesseract_version()
+            _available = True
+        except Exception as e:
+            _available = False
+            _unavailable_reason = f"{type(e).__name__}: {e}"
+    return OCR_ENABLED and _available
+
+
+def check() -> bool:
+    """available(), warning loudly when OCR is switched on but cannot run:
+    scanned PDFs and images would otherwise just come back without text."""
+    if OCR_ENABLED and not available():
+        log.warning(
+            "OCR is disabled (%s). Scanned PDF pages and images will be stored without text; "
+            "install pypdfium2 and the tesseract binary, or set OCR_ENABLED=0 to silence this.",
+            _unavailable_reason,
+        )
+    return available()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        from .extraction import new_pool
+
+        _pool = new_pool(OCR_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# -------------------------------
+# Preprocessing
+# -------------------------------
+def _skew_angle(gray) -> float:
+    """Angle (degrees) that best straightens text lines: the rotation whose
+    horizontal projection profile has the highest variance."""
+    from PIL import Image
+
+    small = gray.copy()
+    small.thumbnail((600, 600))
+
+    def score(angle):
+        rotated = small.rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+        # Shrinking to one column gives the mean intensity of each row
+        return statistics.pvariance(list(rotated.resize((1, rotated.height), Image.BOX).getdata()))
+
+    # Coarse 1° sweep, then refine in 0.25° steps around the best angle
+    coarse = max(range(-int(OCR_MAX_SKEW), int(OCR_MAX_SKEW) + 1), key=score)
+    return max((coarse + d / 4 for d in range(-3, 4)), key=score)
+
+
+def preprocess(img, dpi: Optional[float] = None):
+    """Grayscale, scale to OCR_DPI (when the source DPI is known), cap the
+    size at OCR_MAX_SIDE, stretch contrast and deskew."""
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.exif_transpose(img).convert("L")
+    scale = OCR_DPI / dpi if dpi else 1.0
+    scale = min(scale, OCR_MAX_SIDE / max(gray.size))
+    if abs(scale - 1.0) > 0.05:
+        gray = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.LANCZOS)
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    if OCR_DESKEW:
+        angle = _skew_angle(gray)
+        if angle:
+            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return gray
+
+
+def _image_dpi(img) -> Optional[float]:
+    dpi = img.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > 1:
+        return float(dpi[0])
+    return None
+
+
+# -------------------------------
+# Worker tasks (run in the OCR pool)
+# -------------------------------
+def _tesseract(img) -> str:
+    import pytesseract
+
+    return pytesseract.image_to_string(
+        img, lang=OCR_LANG, config=f"--psm {OCR_PSM} --dpi {OCR_DPI}", timeout=OCR_TIMEOUT
+    )
+
+
+def _run(load) -> Tuple[str, str]:
+    """``(text, status)``; status is ok, timeout or error."""
+    try:
+        return _tesseract(preprocess(*load())), "ok"
+    except RuntimeError as e:
+        # pytesseract kills tesseract and raises RuntimeError on timeout
+        return "", "timeout" if "timeout" in str(e).lower() else "error"
+    except Exception:
+        return "", "error"
+
+
+def ocr_pdf_page(path: str, page_index: int) -> Tuple[str, str]:
+    def load():
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(path)
+        try:
+            # Rendered straight at OCR_DPI, so no rescaling is needed afterwards
+            return pdf[page_index].render(scale=OCR_DPI / 72).to_pil(), OCR_DPI
+        finally:
+            pdf.close()
+
+    return _run(load)
+
+
+def ocr_image_path(path: str) -> Tuple[str, str]:
+    def load():
+        from PIL import Image
+
+        img = Image.open(path)
+        img.load()
+        return img, _image_dpi(img)
+
+    return _run(load)
+
+
+# -------------------------------
+# Per-page cache
+# -------------------------------
+def _settings_tag() -> str:
+    raw = f"{OCR_LANG}|{OCR_PSM}|{OCR_DPI}|{OCR_MAX_SIDE}|{OCR_DESKEW}|{OCR_MAX_SKEW}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:12]
+
+
+def _file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PageCache:
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR):
+        self.dir = Path(cache_dir) if cache_dir else None
+        self.tag = _settings_tag()
+
+    def _path(self, digest: str, page: int) -> Optional[Path]:
+        if self.dir is None:
+            return None
+        return self.dir / digest[:2] / f"{digest}-p{page}-{self.tag}.txt"
+
+    def get(self, digest: str, page: int) -> Optional[str]:
+        path = self._path(digest, page)
+        if path is None or not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    def put(self, digest: str, page: int, text: str):
+        path = self._path(digest, page)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+
+
+# -------------------------------
+# Entry points
+# -------------------------------
+def textless_pages(pages: Sequence[str]) -> List[int]:
+    return [i for i, text in enumerate(pages) if len("".join(text.split())) < OCR_MIN_CHARS]
+
+
+def _collect(futures: Dict[int, object], digest: str, cache: PageCache, results: Dict[int, str]):
+    for page, fut in futures.items():
+        text, status = fut.result()
+        metrics.OCR_PAGES.inc(result=status)
+        if status == "ok":
+            cache.put(digest, page, text)
+        results[page] = text
+
+
+def ocr_pdf_pages(path, page_indexes: Sequence[int], pool: Optional[ProcessPoolExecutor] = None,
+                  cache: Optional[PageCache] = None) -> Dict[int, str]:
+    """OCR text for the given pages of a PDF (cached pages are not re-run)."""
+    path = str(path)
+    cache = cache or PageCache()
+    digest = _file_digest(path)
+    results: Dict[int, str] = {}
+    missing = []
+    for page in page_indexes:
+        text = cache.get(digest, page)
+        if text is None:
+            missing.append(page)
+        else:
+            metrics.OCR_PAGES.inc(result="cached")
+            results[page] = text
+    if missing:
+        start = time.perf_counter()
+        pool = pool or get_pool()
+        _collect({page: pool.submit(ocr_pdf_page, path, page) for page in missing}, digest, cache, results)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="ocr")
+    return results
+
+
+def fill_textless_pages(path, pages: List[str], pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+    """``pages`` with scanned (text-less) pages replaced by their OCR text."""
+    todo = textless_pages(pages)
+    if not todo or not available():
+        return pages
+    found = ocr_pdf_pages(path, todo, pool)
+    return [found.get(i) or text for i, text in enumerate(pages)]
+
+
+def ocr_image(path, cache: Optional[PageCache] = None) -> str:
+    """OCR one image file in the current process (extraction already runs in a worker)."""
+    cache = cache or PageCache()
+    digest = _file_digest(path)
+    text = cache.get(digest, 0)
+    if text is None:
+        text, status = ocr_image_path(str(path))
+        if status == "ok":
+            cache.put(digest, 0, text)
+    return text
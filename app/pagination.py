@@ -0,0 +1,49 @@
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "200"))
+# Largest character range returned by the evidence text endpoint
+MAX_TEXT_SLICE = int(os.getenv("TEXT_SLICE_MAX_CHARS", "200000"))
+
+
+def columns_of(model) -> List[str]:
+    return [c.name for c in model.__table__.columns]
+
+
+def parse_fields(model, fields: Optional[str], default_exclude: Iterable[str] = ()) -> List[str]:
+    """Column names for a ``fields=a,b,c`` projection; ``id`` is always included.
+
+    Raises ValueError for unknown names.
+    """
+    available = columns_of(model)
+    if not fields:
+        return [c for c in available if c not in set(default_exclude)]
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return ["id"] + [f for f in wanted if f != "id"]
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+
+
+def keyset_page(sess: Session, model, fields: List[str], *where, after: Optional[int] = None,
+                limit: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """One page of ``model`` rows ordered by id, selecting only ``fields``.
+
+    Returns ``(rows, next_after)``; ``next_after`` is None on the last page.
+    """
+    limit = clamp_limit(limit)
+    query = select(*[getattr(model, f) for f in fields]).where(*where)
+    if after is not None:
+        query = query.where(model.id > after)
+    rows = [dict(r._mapping) for r in sess.exec(query.order_by(model.id).limit(limit + 1)).all()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]["id"]
+    return rows, None
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from app import metrics, models, textstore
+from app.db import get_engine
+
+# Buffered turns are written once this many are pending (about one round)
+FLUSH_TURNS = int(os.getenv("TRANSCRIPT_FLUSH_TURNS", "3"))
+
+
+class RunWriter:
+    """Batched write path for one simulation run.
+
+    ``start`` creates the SimulationRun row. Turns are buffered and written
+    with a single multi-row INSERT every ``flush_turns`` turns, so a run that
+    dies midway keeps everything flushed so far. ``finish`` (or ``fail``)
+    writes the remaining turns, the verdict and the run status in one
+    transaction, together with the run's usage, timings and the precomputed
+    response document that GET /transcript serves. Each write opens its own
+    short session, so no connection is held while waiting on the model.
+
+    Turns are numbered within the run, so concurrent runs of one case never
+    contend for the same ``Transcript.turn``. Async callers use ``astart``,
+    ``aadd_turn``, ``afinish`` and ``afail``, which run the database work in
+    a worker thread instead of on the event loop.
+    """
+
+    def __init__(self, case_id: int, settings: Optional[dict] = None, model: Optional[str] = None,
+                 flush_turns: int = FLUSH_TURNS):
+        self.case_id = case_id
+        self.settings = settings or {}
+        self.model = model
+        self.flush_turns = max(1, flush_turns)
+        self.run_id: Optional[str] = None
+        self._next_turn = 0
+        self._pending: List[Dict] = []
+        self._turns: List[Dict] = []
+        # LLM calls of every attempt, shared with iter_simulation(usage_calls=...)
+        self.usage_calls: List[Dict] = []
+        self._turn_times: List[float] = []
+        self._written = 0
+        self._started = 0.0
+        self._db_seconds = 0.0
+
+    @contextlib.contextmanager
+    def _session(self):
+        start = time.perf_counter()
+        with Session(get_engine()) as sess:
+            yield sess
+        seconds = time.perf_counter() - start
+        self._db_seconds += seconds
+        metrics.STAGE_SECONDS.observe(seconds, stage="db_commit")
+
+    def start(self) -> str:
+        self._started = time.perf_counter()
+        with self._session() as sess:
+            run = models.SimulationRun(
+                case_id=self.case_id, settings=json.dumps(self.settings), model=self.model
+            )
+            sess.add(run)
+            self.run_id = run.id
+            sess.commit()
+        return self.run_id
+
+    @classmethod
+    def reopen(cls, run_id: str, flush_turns: int = FLUSH_TURNS,
+               statuses: Sequence[str] = ("failed",)) -> Optional["RunWriter"]:
+        """Writer that continues a failed run, with its written turns loaded
+        for ``checkpoint``; None if the run is not in one of ``statuses``.
+
+        The run is claimed with a compare-and-set on its status, so two
+        callers can never both reopen it. Job recovery passes ``"running"``
+        too, for runs whose process died (see jobs.start).
+        """
+        with Session(get_engine()) as sess:
+            claimed = sess.execute(
+                update(models.SimulationRun)
+                .where(models.SimulationRun.id == run_id)
+                .where(models.SimulationRun.status.in_(statuses))
+                # The failed run's document would otherwise be served while it resumes
+                .values(status="running", error=None, finished_at=None, document=None, document_z=None)
+            ).rowcount
+            if not claimed:
+                return None
+            run = sess.get(models.SimulationRun, run_id)
+            rows = sess.exec(
+                select(models.Transcript).where(models.Transcript.run_id == run_id).order_by(models.Transcript.turn)
+            ).all()
+            writer = cls(run.case_id, json.loads(run.settings or "{}"), run.model, flush_turns)
+            writer.run_id = run.id
+            writer._turns = [turn_row(r) for r in rows]
+            writer._written = len(rows)
+            writer.usage_calls = (json.loads(run.usage) if run.usage else {}).get("calls") or []
+            writer._next_turn = rows[-1].turn + 1 if rows else 0
+            sess.commit()
+        writer._started = time.perf_counter()
+        return writer
+
+    def checkpoint(self) -> List[Dict]:
+        """Completed turns in the shape iter_simulation(resume=...) replays."""
+        return [
+            {
+                "agent": t["agent"],
+                "content": t["content"],
+                "round": t.get("round_no"),
+                "structured": json.loads(t["structured"]) if t.get("structured") else None,
+            }
+            for t in self._turns
+        ]
+
+    def add_turn(self, agent: str, content: str, round_no: Optional[int] = None, structured: Optional[Dict] = None):
+        if self._buffer(agent, content, round_no, structured):
+            self.flush()
+
+    def _buffer(self, agent: str, content: str, round_no: Optional[int], structured: Optional[Dict]) -> bool:
+        """Queue a turn; True once enough are pending to flush."""
+        row = {
+            "case_id": self.case_id,
+            "run_id": self.run_id,
+            "turn": self._next_turn,
+            "agent": agent,
+            "content": content,
+            "round_no": round_no,
+            "structured": json.dumps(structured) if structured else None,
+        }
+        self._pending.append(row)
+        self._turns.append(row)
+        self._turn_times.append(round(time.perf_counter() - self._started, 3))
+        self._next_turn += 1
+        return len(self._pending) >= self.flush_turns
+
+    def _write_pending(self, sess: Session):
+        if self._pending:
+            sess.execute(insert(models.Transcript), [_packed_turn(r) for r in self._pending])
+            self._written += len(self._pending)
+            self._pending = []
+
+    def _set_run(self, sess: Session, **fields):
+        sess.execute(
+            update(models.SimulationRun)
+            .where(models.SimulationRun.id == self.run_id)
+            .values(turn_count=self._written, **fields)
+        )
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._session() as sess:
+            self._write_pending(sess)
+            self._set_run(sess)
+            sess.commit()
+
+    def _timings(self) -> Dict:
+        return {
+            "elapsed": round(time.perf_counter() - self._started, 3),
+            "first_turn": self._turn_times[0] if self._turn_times else None,
+            "turns": self._turn_times,
+            "db": round(self._db_seconds, 4),
+        }
+
+    def _document(self, status: str, judge: Optional[Dict], timings: Dict, usage: Optional[Dict],
+                  error: Optional[str] = None) -> str:
+        return json.dumps({
+            "run": {
+                "id": self.run_id,
+                "status": status,
+                "error": error,
+                "settings": self.settings,
+                "model": self.model,
+                "usage": usage,
+                "timings": timings,
+                "finished_at": datetime.utcnow().isoformat(),
+            },
+            "transcript": [_turn_doc(t) for t in self._turns],
+            "judge": judge,
+        })
+
+    @staticmethod
+    def _verdict_doc(verdict: dict, judge: dict) -> dict:
+        doc = {k: v for k, v in verdict.items() if k != "timings"}
+        doc["breakdown"] = judge.get("breakdown") or {}
+        for key in ("probability_source", "verdict_repairs", "rounds", "stop_reason", "excluded_evidence"):
+            if key in judge:
+                doc[key] = judge[key]
+        return doc
+
+    def finish(self, judge: dict):
+        usage = judge.get("usage")
+        timings = {**self._timings(), "stages": judge.get("timings")}
+        verdict = {
+            "case_id": self.case_id,
+            "run_id": self.run_id,
+            "win_probability": judge["win_probability"],
+            "breakdown": json.dumps(judge.get("breakdown") or {}),
+            "justification": judge.get("justification", ""),
+            "timings": json.dumps(timings),
+        }
+        with self._session() as sess:
+            self._write_pending(sess)
+            sess.execute(insert(models.JudgeResult), [verdict])
+            self._set_run(
+                sess, status="succeeded", finished_at=datetime.utcnow(),
+                usage=json.dumps(usage), timings=json.dumps(timings),
+                document_z=textstore.pack(
+                    self._document("succeeded", self._verdict_doc(verdict, judge), timings, usage)
+                ),
+            )
+            sess.execute(
+                update(models.Case).where(models.Case.id == self.case_id).values(latest_run_id=self.run_id)
+            )
+            sess.commit()
+        metrics.SIMULATIONS.inc(status="succeeded")
+
+    def fail(self, error: str):
+        timings = self._timings()
+        # Calls made so far, so a resumed run reports the usage of all its attempts
+        usage = {"calls": self.usage_calls, "llm_calls": len(self.usage_calls)}
+        with self._session() as sess:
+            self._write_pending(sess)
+            self._set_run(
+                sess, status="failed", error=error, finished_at=datetime.utcnow(),
+                usage=json.dumps(usage), timings=json.dumps(timings),
+                document_z=textstore.pack(self._document("failed", None, timings, usage, error)),
+            )
+            sess.commit()
+        metrics.SIMULATIONS.inc(status="failed")
+
+    # ---- async variants: database work runs in a worker thread ----
+    async def astart(self) -> str:
+        return await asyncio.to_thread(self.start)
+
+    async def aadd_turn(self, agent: str, content: str, round_no: Optional[int] = None,
+                        structured: Optional[Dict] = None):
+        if self._buffer(agent, content, round_no, structured):
+            await asyncio.to_thread(self.flush)
+
+    async def afinish(self, judge: dict):
+        await asyncio.to_thread(self.finish, judge)
+
+    async def afail(self, error: str):
+        await asyncio.to_thread(self.fail, error)
+
+
+# -------------------------------
+# Reads
+# -------------------------------
+def _packed_turn(row: Dict) -> Dict:
+    """Insert values for a turn; long content is stored packed in content_z."""
+    if len(row["content"]) < textstore.TEXT_MIN_BYTES:
+        return {**row, "content_z": None}
+    return {**row, "content": "", "content_z": textstore.pack(row["content"])}
+
+
+def turn_row(row: models.Transcript) -> Dict:
+    """A stored turn as a plain dict, with its content unpacked."""
+    turn = row.model_dump(exclude={"id", "content_z"})
+    if row.content_z:
+        turn["content"] = textstore.unpack(row.content_z)
+    return turn
+
+
+def _turn_doc(row: Dict) -> Dict:
+    return {**row, "structured": json.loads(row["structured"]) if row.get("structured") else None}
+
+
+def run_document(sess: Session, run: models.SimulationRun) -> dict:
+    """Stored document for finished runs; assembled from rows while one is in flight."""
+    if run.document_z:
+        return json.loads(textstore.unpack(run.document_z))
+    if run.document:  # written before documents were packed
+        return json.loads(run.document)
+    turns = sess.exec(
+        select(models.Transcript)
+        .where(models.Transcript.run_id == run.id)
+        .order_by(models.Transcript.turn)
+    ).all()
+    return {
+        "run": {
+            "id": run.id,
+            "status": run.status,
+            "error": run.error,
+            "settings": json.loads(run.settings or "{}"),
+            "model": run.model,
+            "usage": None,
+            "timings": None,
+            "finished_at": None,
+        },
+        "transcript": [_turn_doc(turn_row(t)) for t in turns],
+        "judge": None,
+    }
@@ -1,15 +1,59 @@
+import string
+from typing import List, Optional, Tuple
+
+from .tokens import estimate_tokens
+
+
+class PromptTemplate:
+    """A prompt template parsed once, at import.
+
+    ``render`` joins the literal segments with the field values, skipping
+    str.format's per-call parsing; ``fields`` and the literal text's token
+    estimate are known up front for budgeting.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, name, spec, conversion in string.Formatter().parse(source):
+            if spec or conversion:
+                raise ValueError(f"Prompt fields take no format spec or conversion: {{{name}}}")
+            self.parts.append((literal, name))
+        self.fields = frozenset(name for _, name in self.parts if name is not None)
+        self.tokens = estimate_tokens("".join(literal for literal, _ in self.parts))
+
+    def render(self, **fields: str) -> str:
+        out = []
+        for literal, name in self.parts:
+            out.append(literal)
+            if name is not None:
+                out.append(fields[name])
+        return "".join(out)
+
+    def __str__(self) -> str:
+        return self.source
+
+
 SYSTEM_DEFENSE = "You are Defense Counsel. Only use case and evidence. Cite evidence as [E#]."
 SYSTEM_OPPOSITION = "You are Opposing Counsel. Only use case and evidence. Cite evidence as [E#]."
 SYSTEM_JUDGE = "You are a neutral Judge. Moderate, request clarifications, and issue decisions."
 
-DEFENSE_PROMPT = """Context:
+# Structured turn formats (braces doubled, as in str.format)
+COUNSEL_JSON = """Respond with a single JSON object and nothing else:
+{{"argument": "<your argument, citing [E#]>", "cited_evidence": ["E1"], "testimony_request": "<question for the user, or null>", "no_further_arguments": false}}"""
+
+JUDGE_JSON = """Respond with a single JSON object and nothing else:
+{{"assessment": "<your assessment of this round>", "decision": "continue" or "stop", "confidence": <0.0-1.0, how sure you are of the likely outcome>, "defense_win_probability": <0-100>, "open_questions": ["<what you still need>"], "testimony_request": "<question for the user, or null>"}}
+Choose "stop" when you are ready for a final decision."""
+
+DEFENSE_PROMPT = PromptTemplate("""Context:
 {context}
 
 INSTRUCTIONS:
 Give an opening defense argument (≤6 bullets, cite [E#]).
-"""
+""" + COUNSEL_JSON)
 
-DEFENSE_REBUTTAL_PROMPT = """Context:
+DEFENSE_REBUTTAL_PROMPT = PromptTemplate("""Context:
 {context}
 
 Judge last said:
@@ -19,10 +63,10 @@ Opposition said:
 {opposition}
 
 INSTRUCTIONS:
-Provide a rebuttal addressing judge concerns and opposition. If no further arguments exist, say 'No further arguments'.
-"""
+Provide a rebuttal addressing judge concerns and opposition. If no further arguments exist, set "no_further_arguments" to true.
+""" + COUNSEL_JSON)
 
-OPPOSITION_PROMPT = """Context:
+OPPOSITION_PROMPT = PromptTemplate("""Context:
 {context}
 
 DEFENSE:
@@ -30,9 +74,16 @@ DEFENSE:
 
 INSTRUCTIONS:
 Counter the defense with evidence [E#] and note weaknesses.
-"""
+""" + COUNSEL_JSON)
+
+OPPOSITION_OPENING_PROMPT = PromptTemplate("""Context:
+{context}
+
+INSTRUCTIONS:
+Give an opening argument for the opposition (≤6 bullets, cite [E#]) and note weaknesses in the claim.
+""" + COUNSEL_JSON)
 
-JUDGE_ITER_PROMPT = """Context:
+JUDGE_ITER_PROMPT = PromptTemplate("""Context:
 {context}
 
 DEFENSE:
@@ -42,19 +93,20 @@ OPPOSITION:
 {opposition}
 
 INSTRUCTIONS:
-Say if you are 'Satisfied, ready for final decision' OR 'Not satisfied, need further arguments: ...'
-"""
+Decide whether the arguments so far are enough for a final decision or another round is needed.
+""" + JUDGE_JSON)
 
-JUDGE_FINAL_PROMPT = """Context:
+JUDGE_FINAL_PROMPT = PromptTemplate("""Context:
 {context}
 
-FULL TRANSCRIPT:
+TRANSCRIPT (earlier rounds summarized):
 {transcript}
 
 INSTRUCTIONS:
-Final Decision:
-1) Strongest points for each side
-2) Numeric win probability for defense (0-100)
-3) Short justification
-Prefix with 'Final Decision:'.
-"""
+Give your final decision as a single JSON object and nothing else:
+{{"strongest_points": {{"defense": ["<point>"], "opposition": ["<point>"]}}, "defense_win_probability": <0-100, your own estimate, not a figure quoted from evidence>, "breakdown": [{{"factor": "<issue>", "favours": "defense" or "opposition" or "neutral", "weight": <0.0-1.0>, "note": "<why>"}}], "justification": "<short justification>"}}
+""")
+
+VERDICT_REPAIR_PROMPT = PromptTemplate("""Your final decision could not be read: {error}
+Reply again with only the corrected JSON object, same content, matching the requested format exactly.
+""")
@@ -0,0 +1,162 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from .extraction import PAGE_BREAK
+from .tokens import estimate_tokens
+
+# Chunking and selection knobs
+CHUNK_TOKENS = int(os.getenv("EVIDENCE_CHUNK_TOKENS", "200"))
+TOP_K = int(os.getenv("EVIDENCE_TOP_K", "6"))
+TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "1500"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_PARA_RE = re.compile(r"\n\s*\n")
+_STOPWORDS = frozenset(
+    "a an and are as at be been by for from has have he her his i in is it its of on or "
+    "our she that the their them they this to was we were which who will with you your "
+    "shall said any not no but if so than then there these those also such may".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 1 and w not in _STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    ord: int
+    page: int
+    start: int  # offsets into the document text
+    stop: int
+    terms: Dict[str, int] = field(default_factory=dict)
+    text: str = ""
+
+    @property
+    def length(self) -> int:
+        return sum(self.terms.values())
+
+
+# -------------------------------
+# Chunking (run once per document, at upload time)
+# -------------------------------
+def chunk_document(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Split text into ~chunk_tokens pieces on paragraph boundaries, per page."""
+    target = chunk_tokens * 4
+    chunks: List[Chunk] = []
+
+    def emit(page_no: int, start: int, stop: int):
+        # Paragraphs far over target (no blank lines) are cut at whitespace
+        while stop - start > 2 * target:
+            cut = text.rfind(" ", start + target, start + 2 * target)
+            cut = cut if cut > start else start + target
+            emit(page_no, start, cut)
+            start = cut
+        piece = text[start:stop]
+        if piece.strip():
+            chunks.append(Chunk(
+                ord=len(chunks), page=page_no, start=start, stop=stop,
+                terms=dict(Counter(tokenize(piece))), text=piece.strip(),
+            ))
+
+    offset = 0
+    for page_no, page in enumerate(text.split(PAGE_BREAK)):
+        start = 0
+        for end in [m.end() for m in _PARA_RE.finditer(page)] + [len(page)]:
+            if end - start >= target or end == len(page):
+                emit(page_no, offset + start, offset + end)
+                start = end
+        offset += len(page) + len(PAGE_BREAK)
+    return chunks
+
+
+# -------------------------------
+# BM25 index over a case's evidence
+# -------------------------------
+@dataclass
+class Hit:
+    source: int  # 1-based evidence number, cited as [E#]
+    name: str
+    chunk: Chunk
+    score: float
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return (self.source, self.chunk.ord)
+
+
+class ChunkIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries: List[Tuple[int, str, Chunk]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._seen = set()
+        self._total_len = 0
+
+    def add(self, source: int, name: str, chunks: Sequence[Chunk]):
+        for chunk in chunks:
+            # The same document can be listed for both parties; index it once
+            if chunk.text in self._seen:
+                continue
+            self._seen.add(chunk.text)
+            idx = len(self.entries)
+            self.entries.append((source, name, chunk))
+            self._total_len += chunk.length
+            for term, tf in chunk.terms.items():
+                self.postings[term].append((idx, tf))
+
+    def search(self, query: str, k: int = TOP_K, token_budget: int = TOKEN_BUDGET, exclude=()) -> List[Hit]:
+        """Top-k chunks for ``query`` that fit in ``token_budget``, in document order.
+
+        With no matching terms this falls back to the leading chunks, which
+        matches the old fixed-prefix behaviour. Hits whose ``key`` is in
+        ``exclude`` (e.g. already in the shared prefix) are skipped.
+        """
+        n = len(self.entries)
+        if not n:
+            return []
+        avgdl = (self._total_len / n) or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query or "")):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                dl = self.entries[idx][2].length
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / avgdl))
+
+        ranked = sorted(scores, key=scores.get, reverse=True) if scores else range(n)
+        picked, used = [], 0
+        for idx in ranked:
+            if len(picked) >= k:
+                break
+            source, _, chunk = self.entries[idx]
+            if (source, chunk.ord) in exclude:
+                continue
+            cost = estimate_tokens(chunk.text)
+            if used + cost > token_budget:
+                continue
+            picked.append(idx)
+            used += cost
+
+        return [
+            Hit(source=self.entries[i][0], name=self.entries[i][1], chunk=self.entries[i][2], score=scores.get(i, 0.0))
+            for i in sorted(picked)
+        ]
+
+
+def format_hits(hits: Sequence[Hit]) -> str:
+    return "\n\n".join(f"[E{h.source}] {h.name} (p.{h.chunk.page + 1})\n{h.chunk.text}" for h in hits)
+
+
+def build_index(files: Sequence[str], provider) -> ChunkIndex:
+    index = ChunkIndex()
+    for i, file in enumerate(files, start=1):
+        index.add(i, Path(file).name, provider.get_chunks(file))
+    return index
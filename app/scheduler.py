@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import QUEUE_SECONDS
+
+
+class TurnScheduler:
+    """Runs async steps as soon as their dependencies are done.
+
+    Each step is ``fn(results)`` where ``results`` maps the names of its
+    dependencies to their return values. Steps without a path between them
+    run concurrently, up to ``max_concurrency`` at a time. Time spent waiting
+    for a slot is recorded under ``queue_name``.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, queue_name: str = "turn_scheduler"):
+        self._steps: Dict[str, Tuple[Callable[[Dict[str, Any]], Awaitable[Any]], Tuple[str, ...]]] = {}
+        self._sem = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.queue_name = queue_name
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Awaitable[Any]], deps: Iterable[str] = ()) -> str:
+        deps = tuple(deps)
+        missing = [d for d in deps if d not in self._steps]
+        if missing:
+            raise ValueError(f"Step {name!r} depends on unknown steps: {', '.join(missing)}")
+        self._steps[name] = (fn, deps)
+        return name
+
+    async def as_completed(self) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ``(name, result)`` pairs in completion order."""
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(name: str):
+            fn, deps = self._steps[name]
+            results = {d: (await tasks[d])[1] for d in deps}
+            if self._sem:
+                waiting = time.perf_counter()
+                async with self._sem:
+                    QUEUE_SECONDS.observe(time.perf_counter() - waiting, queue=self.queue_name)
+                    return name, await fn(results)
+            return name, await fn(results)
+
+        # Steps are added in dependency order, so every dep's task exists first
+        for name in self._steps:
+            tasks[name] = asyncio.create_task(run_step(name))
+        try:
+            for next_done in asyncio.as_completed(list(tasks.values())):
+                yield await next_done
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def run(self) -> Dict[str, Any]:
+        return {name: result async for name, result in self.as_completed()}
@@ -0,0 +1,227 @@
+"""Offline load benchmark for the API: mock LLM, SQLite, the sample PDF as evidence.
+
+Starts the mock OpenRouter server and the API (uvicorn) as subprocesses in a
+temporary working directory, then drives create case → upload evidence →
+wait for extraction → simulate → read transcript with ``--concurrency``
+clients. Reports p50/p95/p99 latency per step, simulations per second, the
+average number of LLM calls per simulation and the API process's peak memory.
+
+Usage: python -m app.scripts.bench_api [--cases 20] [--concurrency 8] [--latency 0.2]
+       [--tokens-per-sec 200] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO = Path(__file__).resolve().parents[2]
+SAMPLE_PDF = REPO / "uploads" / "Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def rss_mb(pid: int, field: str = "VmRSS") -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, name: str, coro):
+        start = time.perf_counter()
+        try:
+            resp = await coro
+            resp.raise_for_status()
+            return resp
+        except Exception:
+            self.errors[name] += 1
+            return None
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    def report(self) -> Dict[str, Dict]:
+        out = {}
+        for name, values in self.latencies.items():
+            out[name] = {
+                "n": len(values),
+                "errors": self.errors[name],
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "mean": statistics.fmean(values),
+            }
+        return out
+
+
+async def one_case(client: httpx.AsyncClient, rec: Recorder, pdf: bytes):
+    resp = await rec.timed("create_case", client.post("/cases", json={
+        "title": "Benchmark case",
+        "description": "The claimant seeks payment for completed construction work under the contract.",
+    }))
+    if resp is None:
+        return
+    case_id = resp.json()["id"]
+
+    resp = await rec.timed("upload_evidence", client.post(
+        f"/cases/{case_id}/evidence", files={"file": (SAMPLE_PDF.name, pdf)}, data={"party": "Defense"},
+    ))
+    if resp is None:
+        return
+
+    # Extraction runs in the background; time upload → ready
+    start = time.perf_counter()
+    while True:
+        listing = (await client.get(f"/cases/{case_id}/evidence")).json()["evidence"]
+        if all(ev["status"] != "extracting" for ev in listing):
+            break
+        await asyncio.sleep(0.05)
+    rec.latencies["extraction_ready"].append(time.perf_counter() - start)
+
+    await rec.timed("simulate", client.post(f"/cases/{case_id}/simulate", params={"cache": "bypass"}))
+    await rec.timed("transcript", client.get(f"/cases/{case_id}/transcript"))
+
+
+async def drive(base_url: str, args, api_pid: int) -> Dict:
+    rec = Recorder()
+    pdf = SAMPLE_PDF.read_bytes()
+    sem = asyncio.Semaphore(args.concurrency)
+    peak = {"rss_mb": 0.0}
+    stop = asyncio.Event()
+
+    async def sample_memory():
+        while not stop.is_set():
+            peak["rss_mb"] = max(peak["rss_mb"], rss_mb(api_pid) or 0.0)
+            await asyncio.sleep(0.2)
+
+    async def worker(client):
+        async with sem:
+            await one_case(client, rec, pdf)
+
+    sampler = asyncio.create_task(sample_memory())
+    timeout = httpx.Timeout(600.0, connect=10.0)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(args.cases)))
+        metrics_text = (await client.get("/metrics")).text
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+
+    def metric_total(prefix):
+        return sum(float(line.rsplit(" ", 1)[1]) for line in metrics_text.splitlines() if line.startswith(prefix))
+
+    simulated = rec.report().get("simulate", {"n": 0, "errors": 0})
+    runs = metric_total("courtroom_simulation_llm_calls_count")
+    return {
+        "steps": rec.report(),
+        "elapsed": elapsed,
+        "simulations_per_sec": (simulated["n"] - simulated["errors"]) / elapsed,
+        "api_peak_rss_mb": rss_mb(api_pid, "VmHWM") or peak["rss_mb"],
+        "llm_calls": metric_total("courtroom_llm_call_seconds_count"),
+        "llm_calls_per_simulation": metric_total("courtroom_simulation_llm_calls_sum") / runs if runs else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20, help="cases to create, upload and simulate")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    llm_port, api_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": str(REPO) + os.pathsep + env.get("PYTHONPATH", ""),
+            "DB_URL": f"sqlite:///{tmp}/bench.db",
+            "OPENROUTER_API_KEY": "bench",
+            "OPENROUTER_BASE_URL": f"http://127.0.0.1:{llm_port}/v1/chat/completions",
+            "LLM_CACHE_MODE": "bypass",
+            "LLM_HTTP2": "0",
+        })
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-m", "app.scripts.mock_openrouter", "--port", str(llm_port),
+                 "--latency", str(args.latency), "--tokens-per-sec", str(args.tokens_per_sec)],
+                cwd=tmp, env=env,
+            ),
+            subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port), "--log-level", "warning"],
+                cwd=tmp, env=env,
+            ),
+        ]
+        try:
+            asyncio.run(wait_ready(f"http://127.0.0.1:{llm_port}/health"))
+            asyncio.run(wait_ready(f"http://127.0.0.1:{api_port}/health"))
+            results = asyncio.run(drive(f"http://127.0.0.1:{api_port}", args, procs[1].pid))
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait(timeout=10)
+
+    results["config"] = vars(args)
+    print(f"{args.cases} cases, concurrency {args.concurrency}, "
+          f"mock LLM {args.latency}s + {args.tokens_per_sec:g} tok/s\n")
+    print(f"{'step':<18}{'n':>5}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in results["steps"].items():
+        print(f"{name:<18}{s['n']:>5}{s['errors']:>5}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}")
+    print(f"\nsimulations/sec: {results['simulations_per_sec']:.2f}  (wall {results['elapsed']:.1f}s, "
+          f"{results['llm_calls']:.0f} LLM calls)")
+    if results["llm_calls_per_simulation"] is not None:
+        print(f"LLM calls/sim:   {results['llm_calls_per_simulation']:.1f}")
+    if results["api_peak_rss_mb"]:
+        print(f"API peak RSS:    {results['api_peak_rss_mb']:.1f} MB")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark cold starts: import-time profile of app.main and time to first /health.
+
+Each sample is a fresh interpreter, like a serverless cold start. The import
+profile comes from ``python -X importtime``; the /health timing is what
+app.coldstart records for the first response.
+
+Usage: python -m app.scripts.bench_cold_start [--repeat N] [--top N] [--serverless]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+HEALTH_PROBE = """
+import json
+import app.main
+from app import coldstart
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/health")
+print(json.dumps(coldstart.stats))
+"""
+
+
+def run(args, env):
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+
+
+def import_profile(env):
+    """{module: (self_us, cumulative_us)} for one `import app.main`."""
+    out = run(["-X", "importtime", "-c", "import app.main"], env).stderr
+    profile = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            profile[name.strip()] = (int(self_us), int(cum_us))
+        except ValueError:
+            continue  # header line
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="heaviest top-level packages to list")
+    parser.add_argument("--serverless", action="store_true", help="run with DB_SERVERLESS=1 (Vercel defaults)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("DB_URL", f"sqlite:///{tmp}/bench.db")
+        if args.serverless:
+            env["DB_SERVERLESS"] = "1"
+
+        totals, packages = [], defaultdict(list)
+        for _ in range(args.repeat):
+            profile = import_profile(env)
+            totals.append(profile["app.main"][1])
+            per_pkg = defaultdict(int)
+            for name, (self_us, _) in profile.items():
+                per_pkg[name.split(".")[0]] += self_us
+            for pkg, us in per_pkg.items():
+                packages[pkg].append(us)
+
+        probes = [json.loads(run(["-c", HEALTH_PROBE], env).stdout.strip().splitlines()[-1]) for _ in range(args.repeat)]
+
+    print(f"import app.main (median of {args.repeat}): {statistics.median(totals) / 1000:8.1f} ms\n")
+    print("heaviest packages (self time, median):")
+    ranked = sorted(packages.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for pkg, samples in ranked[: args.top]:
+        print(f"  {pkg:<28} {statistics.median(samples) / 1000:8.1f} ms")
+
+    print("\ncold start to first /health (median):")
+    for key in ("interpreter_s", "import_s", "first_response_s"):
+        values = [p[key] for p in probes if p.get(key) is not None]
+        if values:
+            print(f"  {key:<28} {statistics.median(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark the OCR pipeline on a generated fixture set of scanned pages.
+
+Fixture pages are rendered from known text, slightly rotated and saved both
+as PNG images and as one image-only PDF (no text layer, like a scan). The
+benchmark reports preprocessing cost per page, then OCR throughput in pages
+per second for the scanned PDF (cold and warm page cache) and for the images,
+with word recall against the source text. OCR needs pypdfium2 and the
+tesseract binary; without them only preprocessing is measured.
+
+Usage: python -m app.scripts.bench_ocr [--pages 8] [--workers N] [--json out.json]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app import extraction, ocr
+
+WORDS = (
+    "contract payment schedule claimant respondent arbitration award invoice delivery "
+    "completion certificate clause breach damages interest notice termination works "
+    "measurement variation engineer tender agreement dispute settlement evidence"
+).split()
+
+
+def make_fixtures(out: Path, n_pages: int, seed: int = 7):
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=30)
+    except TypeError:  # Pillow < 10.1 has only the small bitmap font
+        font = ImageFont.load_default()
+    images, truths = [], []
+    for i in range(n_pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(28)]
+        # A4 at 200 DPI
+        page = Image.new("L", (1654, 2339), 255)
+        draw = ImageDraw.Draw(page)
+        for row, line in enumerate(lines):
+            draw.text((120, 140 + row * 70), line, fill=0, font=font)
+        page = page.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, fillcolor=255)
+        page.save(out / f"page{i:03d}.png", dpi=(200, 200))
+        images.append(page)
+        truths.append(lines)
+    images[0].save(out / "scanned.pdf", save_all=True, append_images=images[1:], resolution=200)
+    return truths
+
+
+def recall(texts, truths) -> float:
+    found = total = 0
+    for text, lines in zip(texts, truths):
+        words = set(text.lower().split())
+        expected = [w for line in lines for w in line.split()]
+        found += sum(w in words for w in expected)
+        total += len(expected)
+    return found / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=ocr.OCR_WORKERS)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    from PIL import Image
+
+    results = {"pages": args.pages, "workers": args.workers, "dpi": ocr.OCR_DPI}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        truths = make_fixtures(tmp, args.pages)
+        pdf = tmp / "scanned.pdf"
+        images = sorted(tmp.glob("page*.png"))
+
+        # Preprocessing alone (grayscale, DPI normalization, deskew)
+        samples = []
+        for path in images:
+            img = Image.open(path)
+            start = time.perf_counter()
+            ocr.preprocess(img, ocr._image_dpi(img))
+            samples.append(time.perf_counter() - start)
+        results["preprocess_ms_per_page"] = statistics.median(samples) * 1000
+
+        # Scanned-page detection: pdfminer finds no text layer
+        start = time.perf_counter()
+        pages = [extraction.extract_pdf_range(str(pdf), i, i + 1)[0] for i in range(args.pages)]
+        todo = ocr.textless_pages(pages)
+        results["detect_s"] = time.perf_counter() - start
+        results["textless_pages"] = len(todo)
+
+        if not ocr.available():
+            results["ocr"] = "unavailable (needs pypdfium2 and the tesseract binary)"
+        else:
+            cache = ocr.PageCache(str(tmp / "cache"))
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                pool.submit(time.sleep, 0).result()  # start the workers outside the timings
+
+                start = time.perf_counter()
+                texts = ocr.ocr_pdf_pages(pdf, todo, pool, cache)
+                cold = time.perf_counter() - start
+                start = time.perf_counter()
+                ocr.ocr_pdf_pages(pdf, todo, pool, cache)
+                warm = time.perf_counter() - start
+
+                start = time.perf_counter()
+                image_texts = [text for text, _ in pool.map(ocr.ocr_image_path, map(str, images))]
+                image_s = time.perf_counter() - start
+
+            results.update({
+                "pdf_cold_pages_per_sec": len(todo) / cold,
+                "pdf_warm_pages_per_sec": len(todo) / warm,
+                "image_pages_per_sec": len(images) / image_s,
+                "pdf_word_recall": recall([texts.get(i, "") for i in range(args.pages)], truths),
+                "image_word_recall": recall(image_texts, truths),
+            })
+
+    print(f"{args.pages} fixture pages, {args.workers} OCR workers, {ocr.OCR_DPI} DPI\n")
+    print(f"preprocess (median):      {results['preprocess_ms_per_page']:8.1f} ms/page")
+    print(f"scanned-page detection:   {results['textless_pages']}/{args.pages} pages in {results['detect_s'] * 1000:.1f} ms")
+    if "ocr" in results:
+        print(f"OCR:                      {results['ocr']}")
+    else:
+        print(f"scanned PDF, cold cache:  {results['pdf_cold_pages_per_sec']:8.2f} pages/s")
+        print(f"scanned PDF, warm cache:  {results['pdf_warm_pages_per_sec']:8.2f} pages/s")
+        print(f"PNG images:               {results['image_pages_per_sec']:8.2f} pages/s")
+        print(f"word recall (PDF / PNG):  {results['pdf_word_recall']:.3f} / {results['image_word_recall']:.3f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
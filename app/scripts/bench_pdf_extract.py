@@ -0,0 +1,57 @@
+"""Benchmark PDF extraction: pdfminer whole-document vs the page-parallel engine.
+
+Usage: python -m app.scripts.bench_pdf_extract [path.pdf] [--repeat N] [--budget CHARS]
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pdfminer.high_level import extract_text as pdf_extract_text
+
+from app import extraction
+
+SAMPLE_PDF = Path("uploads/Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF")
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=str(SAMPLE_PDF))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=1500, help="chars build_context uses per file")
+    args = parser.parse_args()
+
+    path = args.path
+    pages = extraction.pdf_page_count(path)
+    print(f"{path}: {pages} pages, {extraction.WORKERS} workers, {extraction.PAGES_PER_TASK} pages/task\n")
+
+    with ProcessPoolExecutor(max_workers=extraction.WORKERS) as pool:
+        # Warm the workers so pool start-up is not billed to the first case
+        extraction.extract_pdf_pages(path, max_chars=1, pool=pool)
+
+        results = {
+            "baseline full (extract_text)": timed(lambda: pdf_extract_text(path), args.repeat),
+            "engine full (page-parallel)": timed(lambda: extraction.extract_pdf_pages(path, pool=pool), args.repeat),
+            f"baseline budget {args.budget} (full then slice)": timed(lambda: pdf_extract_text(path)[:args.budget], args.repeat),
+            f"engine budget {args.budget} (early stop)": timed(lambda: extraction.extract_pdf_pages(path, max_chars=args.budget, pool=pool), args.repeat),
+        }
+
+    base_full, eng_full, base_budget, eng_budget = results.values()
+    for name, secs in results.items():
+        print(f"{name:<45} {secs * 1000:9.1f} ms")
+    print(f"\nspeedup full:     {base_full / eng_full:5.2f}x")
+    print(f"speedup budgeted: {base_budget / eng_budget:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
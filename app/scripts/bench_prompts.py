@@ -0,0 +1,178 @@
+"""Microbenchmark per-turn prompt assembly: str.format vs the compiled builder.
+
+Replays the prompt calls of a full-depth trial (openings, then defense,
+opposition and judge for every round, then the final judge) against an
+evidence index built from the sample judgment, copied --files times. The
+baseline is the previous assembly: str.format over each template, the
+system prefix concatenated per call and the final transcript re-rendered
+from every turn. Both produce identical messages; the benchmark checks that,
+then reports CPU time and peak allocation per call. Turn evidence retrieval
+is the same on both paths, so it is memoized and reported on its own.
+
+Usage: python -m app.scripts.bench_prompts [path.pdf] [--files 8] [--budget 32000] [--repeat 200]
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from app import context, extraction, prompts, retrieval
+from app.context import ContextManager, estimate_tokens, summarize, truncate
+
+SAMPLE_PDF = Path("uploads/Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF")
+ROUNDS = 6  # trialDepth "full"
+
+
+class BaselineContext(ContextManager):
+    """The assembly path before templates were compiled."""
+
+    def add_turn(self, agent, round_no, content):
+        self.turns.append({"agent": agent, "round": round_no, "content": content, "summary": summarize(content)})
+
+    def history(self, budget):
+        if not self.turns:
+            return ""
+        last_round = self.turns[-1]["round"]
+        lines, used = [], 0
+        for t in reversed(self.turns):
+            full = t["round"] == last_round
+            line = f"{t['agent'].upper()} (Round {t['round']}): {t['content'] if full else t['summary']}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                if full:
+                    line = truncate(line, budget - used)
+                    cost = estimate_tokens(line)
+                else:
+                    lines.append(f"[{len(self.turns) - len(lines)} earlier turns omitted]")
+                    break
+            lines.append(line)
+            used += cost
+        return "\n\n".join(reversed(lines))
+
+    def messages(self, role, template, query, **fields):
+        template = template.source
+        fixed = self.prefix_tokens + estimate_tokens(role) + estimate_tokens(template)
+        fixed += sum(estimate_tokens(v) for v in fields.values())
+        remaining = max(0, self.input_budget - fixed)
+        if "{transcript}" in template:
+            fields["transcript"] = self.history(remaining * 2 // 3)
+            remaining -= estimate_tokens(fields["transcript"])
+        fields["context"] = self.context(query, remaining)
+        if context.CACHE_CONTROL:
+            system = [
+                {"type": "text", "text": self.prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": role},
+            ]
+        else:
+            system = self.prefix + "\n\n" + role
+        return [{"role": "system", "content": system}, {"role": "user", "content": template.format(**fields)}]
+
+
+def without_retrieval(cls, memo):
+    """``cls`` with turn evidence retrieval memoized, leaving only prompt assembly to measure."""
+    class Memoized(cls):
+        def context(self, query, budget):
+            if (query, budget) not in memo:
+                memo[query, budget] = super().context(query, budget)
+            return memo[query, budget]
+
+    return Memoized
+
+
+def trial_calls(sentences, rng):
+    """(agent, round, system, template, query, fields) for a full-depth trial, with turn contents."""
+    def reply():
+        return " ".join(rng.choice(sentences) for _ in range(rng.randint(10, 25)))
+
+    calls = [
+        ("defense", 1, prompts.SYSTEM_DEFENSE, prompts.DEFENSE_PROMPT, "claim", {}),
+        ("opposition", 1, prompts.SYSTEM_OPPOSITION, prompts.OPPOSITION_OPENING_PROMPT, "claim", {}),
+    ]
+    judge = defense = opposition = ""
+    for round_no in range(1, ROUNDS + 1):
+        if round_no > 1:
+            calls.append(("defense", round_no, prompts.SYSTEM_DEFENSE, prompts.DEFENSE_REBUTTAL_PROMPT,
+                          judge + "\n" + opposition, {"judge": judge, "opposition": opposition}))
+            defense = reply()
+            calls.append(("opposition", round_no, prompts.SYSTEM_OPPOSITION, prompts.OPPOSITION_PROMPT,
+                          defense, {"defense": defense}))
+        defense, opposition, judge = reply(), reply(), reply()
+        calls.append(("judge", round_no, prompts.SYSTEM_JUDGE, prompts.JUDGE_ITER_PROMPT,
+                      defense + "\n" + opposition, {"defense": defense, "opposition": opposition}))
+    calls.append(("judge_final", None, prompts.SYSTEM_JUDGE, prompts.JUDGE_FINAL_PROMPT,
+                  "claim\n" + defense + "\n" + opposition, {}))
+    return calls, [reply() for _ in calls]
+
+
+def run(cls, args, case_block, index, calls, replies):
+    """Per-call (CPU seconds, peak bytes) medians over ``args.repeat`` trials, and the messages."""
+    cpu = [[] for _ in calls]
+    peak = [[] for _ in calls]
+    out = []
+    for rep in range(args.repeat):
+        ctx = cls(case_block, index, "claim", input_budget=args.budget)
+        out = []
+        for i, ((agent, round_no, system, template, query, fields), content) in enumerate(zip(calls, replies)):
+            measure_mem = rep < args.mem_repeat
+            if measure_mem:
+                tracemalloc.start()
+            start = time.process_time()
+            messages = ctx.messages(system, template, query, **fields)
+            cpu[i].append(time.process_time() - start)
+            if measure_mem:
+                peak[i].append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            out.append(messages)
+            if agent != "judge_final":
+                ctx.add_turn(agent, round_no, content)
+    return [statistics.median(c) for c in cpu], [statistics.median(p) for p in peak], out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=str(SAMPLE_PDF))
+    parser.add_argument("--files", type=int, default=8, help="evidence files (copies of the PDF)")
+    parser.add_argument("--budget", type=int, default=32000, help="input token budget per call")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--mem-repeat", type=int, default=5, help="trials measured with tracemalloc")
+    args = parser.parse_args()
+
+    text = extraction.PAGE_BREAK.join(extraction.extract_pdf_pages(args.path))
+    index = retrieval.ChunkIndex()
+    for i in range(1, args.files + 1):
+        index.add(i, f"evidence{i}.pdf", retrieval.chunk_document(f"Exhibit {i}\n{text}"))
+    sentences = [s.strip() for s in text.split(". ") if len(s.strip()) > 40]
+    calls, replies = trial_calls(sentences, random.Random(7))
+    case_block = "Case Title: Bench\nDescription: " + " ".join(sentences[:20])
+
+    prefix = ContextManager(case_block, index, "claim", input_budget=args.budget).prefix_tokens
+    print(f"{len(calls)} calls per trial, {args.files} evidence files, budget {args.budget} tokens, "
+          f"shared prefix ~{prefix} tokens, cache_control {context.CACHE_CONTROL}")
+
+    # Turn evidence retrieval is the same code on both paths; memoize it so
+    # the comparison covers prompt assembly only, and report it separately
+    memo = {}
+    warm = without_retrieval(ContextManager, memo)(case_block, index, "claim", input_budget=args.budget)
+    start = time.process_time()
+    for (agent, round_no, system, template, query, fields), content in zip(calls, replies):
+        warm.messages(system, template, query, **fields)
+        if agent != "judge_final":
+            warm.add_turn(agent, round_no, content)
+    retrieval_cpu = (time.process_time() - start) / len(calls)
+
+    base_cpu, base_peak, base_out = run(without_retrieval(BaselineContext, memo), args, case_block, index, calls, replies)
+    new_cpu, new_peak, new_out = run(without_retrieval(ContextManager, memo), args, case_block, index, calls, replies)
+    assert base_out == new_out, "compiled prompts differ from the str.format baseline"
+
+    print(f"\n{'call':<16}{'base µs':>10}{'new µs':>10}{'base KiB':>10}{'new KiB':>10}")
+    for (agent, round_no, *_), bc, nc, bp, np_ in zip(calls, base_cpu, new_cpu, base_peak, new_peak):
+        label = f"{agent} r{round_no}" if round_no else agent
+        print(f"{label:<16}{bc * 1e6:>10.1f}{nc * 1e6:>10.1f}{bp / 1024:>10.1f}{np_ / 1024:>10.1f}")
+    print(f"{'per turn (mean)':<16}{statistics.fmean(base_cpu) * 1e6:>10.1f}{statistics.fmean(new_cpu) * 1e6:>10.1f}"
+          f"{statistics.fmean(base_peak) / 1024:>10.1f}{statistics.fmean(new_peak) / 1024:>10.1f}")
+    print(f"\nturn evidence retrieval (unchanged, excluded above): {retrieval_cpu * 1e6:.0f} µs per call")
+
+if __name__ == "__main__":
+    main()
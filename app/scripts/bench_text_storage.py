@@ -0,0 +1,174 @@
+"""Benchmark plain vs compressed text storage.
+
+Builds two SQLite databases with the same evidence and simulation runs: one
+in the old layout (Blob.extracted_text, BlobPage, Transcript.content,
+SimulationRun.document as plain text) and one in the compressed layout
+(BlobText page frames, Transcript.content_z, SimulationRun.document_z).
+Evidence text comes from the sample judgment PDF. Reports table sizes, then
+median latency and peak Python memory of the reads the API performs. Both
+layouts are read through the same blobstore/persistence functions, which
+fall back to the old columns for rows written before compression.
+
+Usage: python -m app.scripts.bench_text_storage [path.pdf] [--blobs 50] [--runs 50] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import blobstore, extraction, models, persistence, textstore
+
+SAMPLE_PDF = Path("uploads/Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF")
+TABLES = ("blob", "blobpage", "blobtext", "transcript", "simulationrun")
+EMPTY_TABLE = 4096  # SQLite default page size
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+def make_turns(sentences, rng, n_turns=14):
+    agents = ("defense", "opposition", "judge")
+    return [
+        {"agent": agents[i % 3], "content": " ".join(rng.choice(sentences) for _ in range(rng.randint(8, 20))),
+         "round_no": i // 3 + 1, "structured": None}
+        for i in range(n_turns)
+    ]
+
+
+def populate(engine, packed: bool, pages, n_blobs: int, n_runs: int, seed: int = 7):
+    rng = random.Random(seed)
+    sentences = [s.strip() for s in " ".join(pages).split(". ") if len(s.strip()) > 40]
+    with Session(engine) as sess:
+        case = models.Case(title="bench", description="text storage benchmark")
+        sess.add(case)
+        sess.commit()
+        for i in range(n_blobs):
+            # Distinct content per blob, as with real uploads
+            doc = [f"Document {i}\n{page}" for page in pages]
+            sha = f"{i:064x}"
+            sess.add(models.Blob(sha256=sha, size=0, stored_path="", status="ready", page_count=len(doc),
+                                 extracted_text="" if packed else extraction.PAGE_BREAK.join(doc)))
+            if packed:
+                blobstore.store_text(sess, sha, doc)
+            else:
+                sess.add_all(models.BlobPage(blob_sha256=sha, page_no=p, text=t) for p, t in enumerate(doc))
+        for r in range(n_runs):
+            run = models.SimulationRun(case_id=case.id, status="succeeded")
+            sess.add(run)
+            turns = [{**t, "case_id": case.id, "run_id": run.id, "turn": r * 100 + n}
+                     for n, t in enumerate(make_turns(sentences, rng))]
+            document = json.dumps({"run": {"id": run.id}, "transcript": turns, "judge": None})
+            if packed:
+                run.document_z = textstore.pack(document)
+                sess.add_all(models.Transcript(**persistence._packed_turn(t)) for t in turns)
+            else:
+                run.document = document
+                sess.add_all(models.Transcript(**t) for t in turns)
+        sess.commit()
+
+
+def table_sizes(engine, path: Path) -> dict:
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+        try:
+            rows = conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all()
+            sizes = {name: size for name, size in rows if name in TABLES}
+        except Exception:  # SQLite built without the dbstat table
+            sizes = {}
+    sizes["file"] = path.stat().st_size
+    return sizes
+
+
+# -------------------------------
+# Reads
+# -------------------------------
+def measure(engine, fn, repeat: int):
+    """(median ms, peak KiB) of ``fn(sess)`` in a fresh session, like one request."""
+    times, peaks = [], []
+    for _ in range(repeat):
+        with Session(engine) as sess:
+            tracemalloc.start()
+            start = time.perf_counter()
+            fn(sess)
+            times.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return statistics.median(times) * 1000, statistics.median(peaks) / 1024
+
+
+def reads(n_blobs: int, n_pages: int, run_ids):
+    sha = f"{n_blobs // 2:064x}"
+    ev = models.Evidence(case_id=1, filename="", stored_path="", blob_sha256=sha)
+    run_id = run_ids[len(run_ids) // 2]
+    return {
+        "blob lookup (sess.get)": lambda s: s.get(models.Blob, sha),
+        "full text, 5 blobs": lambda s: blobstore.texts_by_sha(s, [f"{i:064x}" for i in range(5)]),
+        "page slice (1 page)": lambda s: blobstore.page_slice(s, sha, n_pages // 2, n_pages // 2 + 1),
+        "text slice (20k chars)": lambda s: blobstore.text_slice(s, ev, 30000, 20000),
+        "run lookup (sess.get)": lambda s: s.get(models.SimulationRun, run_id),
+        "run document": lambda s: persistence.run_document(s, s.get(models.SimulationRun, run_id)),
+        "transcript rows": lambda s: [persistence.turn_row(t) for t in s.exec(
+            select(models.Transcript).where(models.Transcript.run_id == run_id)).all()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=str(SAMPLE_PDF))
+    parser.add_argument("--blobs", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    pages = extraction.extract_pdf_pages(args.path)
+    chars = sum(len(p) for p in pages)
+    print(f"{args.path}: {len(pages)} pages, {chars} chars; {args.blobs} blobs, {args.runs} runs; "
+          f"codec {textstore.codec()}\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("plain", "compressed"):
+            path = Path(tmp) / f"{layout}.db"
+            engine = create_engine(f"sqlite:///{path}")
+            SQLModel.metadata.create_all(engine)
+            populate(engine, layout == "compressed", pages, args.blobs, args.runs)
+            with Session(engine) as sess:
+                run_ids = sess.exec(select(models.SimulationRun.id).order_by(models.SimulationRun.id)).all()
+            results[layout] = {
+                "sizes": table_sizes(engine, path),
+                "reads": {name: measure(engine, fn, args.repeat)
+                          for name, fn in reads(args.blobs, len(pages), run_ids).items()},
+            }
+            engine.dispose()
+
+    plain, packed = results["plain"], results["compressed"]
+    print(f"{'size (KiB)':<26}{'plain':>10}{'compressed':>12}{'ratio':>8}")
+    for table in plain["sizes"]:
+        before, after = plain["sizes"][table], packed["sizes"].get(table, 0)
+        # An empty table still takes one page
+        ratio = f"{before / after:7.1f}x" if min(before, after) > EMPTY_TABLE else ""
+        print(f"{table:<26}{before / 1024:>10.0f}{after / 1024:>12.0f}{ratio}")
+    if "blobtext" in packed["sizes"]:
+        text_before = plain["sizes"].get("blob", 0) + plain["sizes"].get("blobpage", 0)
+        text_after = packed["sizes"].get("blob", 0) + packed["sizes"].get("blobtext", 0)
+        print(f"{'evidence text (blob+pages)':<26}{text_before / 1024:>10.0f}{text_after / 1024:>12.0f}"
+              f"{text_before / text_after:7.1f}x")
+
+    print(f"\n{'read':<26}{'plain ms':>10}{'comp. ms':>10}{'plain KiB':>11}{'comp. KiB':>11}")
+    for name, (ms, kib) in plain["reads"].items():
+        ms2, kib2 = packed["reads"][name]
+        print(f"{name:<26}{ms:>10.2f}{ms2:>10.2f}{kib:>11.0f}{kib2:>11.0f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Move text written by older versions into compressed storage.
+
+Blob.extracted_text (with its BlobPage rows) becomes a BlobText row, long
+Transcript.content values are packed into content_z and SimulationRun.document
+into document_z. Works in batches and is safe to re-run. PostgreSQL only
+returns the freed space after VACUUM FULL (or pg_repack) on the blob,
+blobpage, transcript and simulationrun tables.
+
+Usage: python -m app.scripts.compact_text [--batch 200]
+"""
+import argparse
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, func, select
+
+from app import blobstore, extraction, models, textstore
+from app.db import get_engine
+
+
+def compact_blobs(sess: Session, batch: int) -> int:
+    done = 0
+    while True:
+        blobs = sess.exec(select(models.Blob).where(models.Blob.extracted_text != "").limit(batch)).all()
+        if not blobs:
+            return done
+        for blob in blobs:
+            pages = sess.exec(
+                select(models.BlobPage.text)
+                .where(models.BlobPage.blob_sha256 == blob.sha256)
+                .order_by(models.BlobPage.page_no)
+            ).all()
+            # BlobChunk offsets point into the joined text, so the pages must rebuild it exactly
+            if extraction.PAGE_BREAK.join(pages) != blob.extracted_text:
+                pages = blob.extracted_text.split(extraction.PAGE_BREAK)
+            blobstore.store_text(sess, blob.sha256, list(pages))
+            blob.extracted_text = ""
+            sess.add(blob)
+        sess.commit()
+        done += len(blobs)
+
+
+def compact_transcripts(sess: Session, batch: int) -> int:
+    done, after = 0, 0
+    while True:
+        rows = sess.exec(
+            select(models.Transcript.id, models.Transcript.content)
+            .where(models.Transcript.id > after)
+            .where(models.Transcript.content_z.is_(None))
+            .where(func.length(models.Transcript.content) >= textstore.TEXT_MIN_BYTES)
+            .order_by(models.Transcript.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            return done
+        for row_id, content in rows:
+            sess.execute(
+                update(models.Transcript)
+                .where(models.Transcript.id == row_id)
+                .values(content="", content_z=textstore.pack(content))
+            )
+        sess.commit()
+        done += len(rows)
+        after = rows[-1][0]
+
+
+def compact_runs(sess: Session, batch: int) -> int:
+    done = 0
+    while True:
+        rows = sess.exec(
+            select(models.SimulationRun.id, models.SimulationRun.document)
+            .where(models.SimulationRun.document.is_not(None))
+            .limit(batch)
+        ).all()
+        if not rows:
+            return done
+        for run_id, document in rows:
+            sess.execute(
+                update(models.SimulationRun)
+                .where(models.SimulationRun.id == run_id)
+                .values(document=None, document_z=textstore.pack(document))
+            )
+        sess.commit()
+        done += len(rows)
+
+
+def compact_text(batch: int = 200):
+    print(f"Compacting stored text (codec: {textstore.codec()})...")
+    with Session(get_engine()) as sess:
+        blobs = compact_blobs(sess, batch)
+        # BlobPage rows of compacted blobs are dropped by store_text; catch any left behind
+        sess.execute(delete(models.BlobPage).where(
+            models.BlobPage.blob_sha256.in_(select(models.BlobText.blob_sha256))
+        ))
+        sess.commit()
+        turns = compact_transcripts(sess, batch)
+        runs = compact_runs(sess, batch)
+    print(f"✅ Packed {blobs} blob texts, {turns} transcript turns and {runs} run documents.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch", type=int, default=200)
+    compact_text(parser.parse_args().batch)
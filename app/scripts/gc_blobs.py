@@ -0,0 +1,12 @@
+from sqlmodel import Session
+from app import blobstore
+from app.db import get_engine
+
+def gc_blobs():
+    print("Collecting unreferenced evidence blobs...")
+    with Session(get_engine()) as sess:
+        removed = blobstore.collect_garbage(sess)
+    print(f"✅ Removed {removed['blobs']} blobs and {removed['stray_files']} stray files.")
+
+if __name__ == "__main__":
+    gc_blobs()
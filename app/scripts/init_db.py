@@ -1,10 +1,10 @@
-from sqlmodel import SQLModel
-from app import models
-from app.main import engine
+from app import migrations
+from app.db import get_engine
 
 def init_db():
-    print("Creating tables in Neon...")
-    SQLModel.metadata.create_all(engine)
+    print("Creating tables and applying migrations in Neon...")
+    for stmt in migrations.upgrade(get_engine()):
+        print(f"  {stmt}")
     print("✅ Done.")
 
 if __name__ == "__main__":
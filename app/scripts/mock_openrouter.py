@@ -0,0 +1,127 @@
+"""Local stand-in for the OpenRouter chat completions API, for offline benchmarks.
+
+Replies are generated word by word at ``--tokens-per-sec`` after ``--latency``
+seconds (time to first token), in both regular and ``stream: true`` mode, and
+report a ``usage`` block like OpenRouter does. Requests with ``response_format``
+get the structured counsel/judge/verdict JSON (app.structured) instead; the
+judge always estimates 62% at 0.8 confidence, so trials converge after two rounds.
+
+Usage: python -m app.scripts.mock_openrouter [--port 8799] [--latency 0.3] [--tokens-per-sec 80]
+Point the app at it with OPENROUTER_BASE_URL=http://127.0.0.1:8799/v1/chat/completions
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPLY = (
+    "Counsel submits that the record supports the claim. The contract terms, the "
+    "payment schedule and the correspondence show performance by the claimant, while "
+    "the objections raised go to quantum rather than liability. On balance the "
+    "claimant has a 62% chance of success."
+)
+
+config = {"latency": 0.3, "tokens_per_sec": 80.0, "reply": REPLY}
+app = FastAPI(title="Mock OpenRouter")
+
+
+def _reply(body: dict) -> str:
+    if not body.get("response_format"):
+        return config["reply"]
+    system = body["messages"][0]["content"] if body.get("messages") else ""
+    if "strongest_points" in body["messages"][-1]["content"]:
+        return json.dumps({
+            "strongest_points": {
+                "defense": ["Work was completed and accepted [E1]"],
+                "opposition": ["Final bill figures are disputed [E1]"],
+            },
+            "defense_win_probability": 62,
+            "breakdown": [
+                {"factor": "Performance", "favours": "defense", "weight": 0.6, "note": "Completion is documented."},
+                {"factor": "Quantum", "favours": "opposition", "weight": 0.4, "note": "Amounts are contested."},
+            ],
+            "justification": "Liability is established; the dispute goes to quantum.",
+        })
+    if "Judge" in system:
+        return json.dumps({
+            "assessment": "Both sides have addressed the contract terms; quantum remains disputed.",
+            "decision": "continue",
+            "confidence": 0.8,
+            "defense_win_probability": 62,
+            "open_questions": ["Was the final bill certified?"],
+            "testimony_request": None,
+        })
+    return json.dumps({
+        "argument": config["reply"],
+        "cited_evidence": ["E1"],
+        "testimony_request": None,
+        "no_further_arguments": False,
+    })
+
+
+def _words(body: dict, max_tokens: int):
+    # Split on spaces so the joined words reproduce JSON replies exactly
+    words = [w + " " for w in _reply(body).split(" ")]
+    return words[: max(1, max_tokens)]
+
+
+def _usage(body: dict, completion_tokens: int) -> dict:
+    prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    words = _words(body, int(body.get("max_tokens") or 800))
+    per_token = 1.0 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+    usage = _usage(body, len(words))
+    model = body.get("model", "mock")
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(config["latency"])
+            yield ": OPENROUTER PROCESSING\n\n"
+            for word in words:
+                yield "data: " + json.dumps({"model": model, "choices": [{"delta": {"content": word}}]}) + "\n\n"
+                await asyncio.sleep(per_token)
+            yield "data: " + json.dumps({"model": model, "choices": [{"delta": {}}], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(config["latency"] + per_token * len(words))
+    return {
+        "id": f"mock-{time.time_ns()}",
+        "model": model,
+        "choices": [{"message": {"role": "assistant", "content": "".join(words).strip()}}],
+        "usage": usage,
+    }
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", **config}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=config["latency"], help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=config["tokens_per_sec"])
+    args = parser.parse_args()
+    config.update(latency=args.latency, tokens_per_sec=args.tokens_per_sec)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
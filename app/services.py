@@ -1,75 +1,82 @@
+import asyncio
+import inspect
+import json
 import os
-import re
-import requests
-from pathlib import Path
-from pdfminer.high_level import extract_text as pdf_extract_text
-from PIL import Image
-import pytesseract
-from typing import List, Dict, Tuple
+import statistics
+import time
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from . import prompts  # <-- make sure you have your prompts.py with system/user prompts
+from . import evidence as evidence_store
+from . import dispatch, llm, metrics, retrieval, structured
+from .context import ContextManager
+from .scheduler import TurnScheduler
+from .extraction import extract_text_from_file  # re-exported for existing callers
 
-# Load API key
+# Load API key (checked when the first LLM call is made, see llm._headers)
 load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-if not OPENROUTER_API_KEY:
-    raise RuntimeError("Set OPENROUTER_API_KEY env var in .env file or environment")
 
-BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
 MODEL = "mistralai/mistral-small-3.2-24b-instruct:free"  
 # Recommended alternatives: mixtral-8x7b, meta-llama-3-8b, google-gemma-7b, qwen2-7b
+# Tried in order when MODEL is rate limited or down (LLM_FALLBACK_MODELS="" disables)
+FALLBACK_MODELS = [
+    m.strip() for m in os.getenv(
+        "LLM_FALLBACK_MODELS",
+        "mistralai/mixtral-8x7b-instruct,meta-llama/llama-3-8b-instruct,google/gemma-7b-it,qwen/qwen-2-7b-instruct",
+    ).split(",") if m.strip()
+]
+# Times a trial is resumed from its completed turns after the whole model chain failed
+RESUME_ATTEMPTS = int(os.getenv("SIM_RESUME_ATTEMPTS", "2"))
+
+dispatcher = dispatch.Dispatcher([MODEL, *FALLBACK_MODELS])
 
 
 # -------------------------------
-# Utility: Extract text from files
+# Build simulation payload for a stored case
 # -------------------------------
-def extract_text_from_file(path: Path) -> str:
-    suf = path.suffix.lower()
-    try:
-        if suf == ".pdf":
-            return pdf_extract_text(str(path))
-        elif suf in [".png", ".jpg", ".jpeg", ".tiff", ".bmp"]:
-            img = Image.open(path)
-            return pytesseract.image_to_string(img)
-        elif suf == ".txt":
-            return path.read_text(encoding="utf-8")
-        else:
-            return ""
-    except Exception:
-        return ""
+DEFAULT_SETTINGS = {
+    "trialDepth": "standard",
+    "tone": "formal",
+    "verdictOutput": "summary",
+}
 
 
-# -------------------------------
-# Utility: Call OpenRouter API
-# -------------------------------
-def _call_chat(messages, max_tokens=800) -> str:
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
+def build_case_payload(case, evidence_rows, settings: dict = None) -> dict:
+    """Payload for run_simulation from a models.Case and its Evidence rows."""
+    return {
+        "caseInfo": {
+            "title": case.title,
+            "caseType": case.case_type,
+            "incidentDate": "Unknown",
+            "location": "Unknown",
+        },
+        "userClaim": {
+            "mainClaim": case.description,
+            "objective": "Win case",
+            "supportingStatement": "The defense has evidence to support its position.",
+        },
+        "evidence": {
+            "files": [ev.stored_path for ev in evidence_rows]
+        },
+        "opposition": {
+            "anticipatedArguments": "The opposition disagrees with the claim.",
+            "probableWeaknesses": "Insufficient proof.",
+        },
+        "simulationSettings": {**DEFAULT_SETTINGS, **(settings or {})},
     }
-    payload = {
-        "model": MODEL,
-        "messages": messages,
-        "max_tokens": max_tokens,
-        "temperature": 0.2,
-    }
-    resp = requests.post(BASE_URL, headers=headers, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["choices"][0]["message"]["content"].strip()
 
 
 # -------------------------------
 # Build context from frontend JSON
 # -------------------------------
-def build_context(payload: dict) -> str:
+def build_case_block(payload: dict) -> str:
     case_info = payload.get("caseInfo", {})
     user_claim = payload.get("userClaim", {})
-    evidence = payload.get("evidence", {})
     opposition = payload.get("opposition", {})
     settings = payload.get("simulationSettings", {})
 
-    case_block = (
+    return (
         f"CASE TITLE: {case_info.get('title','')}\n"
         f"TYPE: {case_info.get('caseType','')}\n"
         f"INCIDENT DATE: {case_info.get('incidentDate','')}\n"
@@ -84,103 +91,431 @@ def build_context(payload: dict) -> str:
         f"Verdict Output: {settings.get('verdictOutput','')}\n"
     )
 
-    # Evidence handling
-    ev_files = evidence.get("files", [])
-    ev_texts = []
-    for i, file in enumerate(ev_files, start=1):
-        file_path = Path(file)
-        extracted = extract_text_from_file(file_path) if file_path.exists() else ""
-        excerpt = extracted[:1500]
-        ev_texts.append(f"[E{i}] {file_path.name}\n{excerpt}")
 
-    return case_block + "\n\nEVIDENCES:\n" + ("\n\n".join(ev_texts) if ev_texts else "No evidence provided.")
+def claim_query(payload: dict) -> str:
+    """Retrieval query used before any argument has been made."""
+    user_claim = payload.get("userClaim", {})
+    opposition = payload.get("opposition", {})
+    return " ".join([
+        payload.get("caseInfo", {}).get("title", ""),
+        user_claim.get("mainClaim", ""),
+        user_claim.get("supportingStatement", ""),
+        opposition.get("anticipatedArguments", ""),
+    ])
+
+
+def build_evidence_index(payload: dict, provider=None) -> retrieval.ChunkIndex:
+    # Texts come from the provider (DB rows for the API, hash-keyed cache for the CLI)
+    provider = provider or evidence_store.CachedFileProvider()
+    return retrieval.build_index(payload.get("evidence", {}).get("files", []), provider)
+
+
+def evidence_block(index: retrieval.ChunkIndex, query: str) -> str:
+    """Top-k evidence chunks relevant to ``query``, under the evidence token budget."""
+    hits = index.search(query)
+    return "EVIDENCES:\n" + (retrieval.format_hits(hits) if hits else "No evidence provided.")
+
+
+def excluded_evidence(provider) -> List[str]:
+    """Notes for evidence the provider left out (see StoredEvidenceProvider.excluded)."""
+    return list((getattr(provider, "excluded", None) or {}).values())
+
+
+def excluded_block(notes: List[str]) -> str:
+    if not notes:
+        return ""
+    return "\nEXCLUDED EVIDENCE (text not available, not before the court):\n" + "\n".join(f"- {n}" for n in notes) + "\n"
+
+
+def build_context(payload: dict, provider=None, query: str = None) -> str:
+    index = build_evidence_index(payload, provider)
+    return build_case_block(payload) + "\n\n" + evidence_block(index, query or claim_query(payload))
 
 
 # -------------------------------
 # Courtroom Simulation
 # -------------------------------
-def run_simulation(payload: dict, get_user_input=None) -> Tuple[List[Dict], Dict]:
-    context = build_context(payload)
-    transcript = []
+async def _ask_user(get_user_input, prompt_text: str) -> str:
+    if inspect.iscoroutinefunction(get_user_input):
+        return await get_user_input(prompt_text)
+    return await asyncio.to_thread(get_user_input, prompt_text)
+
+
+def run_simulation(payload: dict, get_user_input=None, provider=None, on_turn=None) -> Tuple[List[Dict], Dict]:
+    """Blocking wrapper around run_resumable for the CLI and scripts."""
+    return llm.run_sync(run_resumable(payload, get_user_input, provider, on_turn))
+
+
+async def run_simulation_async(payload: dict, get_user_input=None, provider=None, on_turn=None,
+                               resume: Optional[List[Dict]] = None,
+                               usage_calls: Optional[List[Dict]] = None) -> Tuple[List[Dict], Dict]:
+    """Run the trial. ``on_turn`` (sync or async) is called with each new
+    transcript entry as soon as it is produced, for partial progress.
+    ``resume`` turns (from an earlier attempt) are replayed, not re-run."""
+    transcript, judge = [], {}
+    async for ev in iter_simulation(payload, get_user_input, provider, resume=resume, usage_calls=usage_calls):
+        if ev["event"] == "turn":
+            entry = {"agent": ev["agent"], "content": ev["content"], "round": ev["round"], "structured": ev["structured"]}
+            transcript.append(entry)
+            if on_turn and not ev.get("resumed"):
+                result = on_turn(entry)
+                if inspect.isawaitable(result):
+                    await result
+        elif ev["event"] == "verdict":
+            judge = ev["judge"]
+    return transcript, judge
+
+
+async def run_resumable(payload: dict, get_user_input=None, provider=None, on_turn=None,
+                        resume: Optional[List[Dict]] = None, attempts: int = RESUME_ATTEMPTS,
+                        usage_calls: Optional[List[Dict]] = None) -> Tuple[List[Dict], Dict]:
+    """run_simulation_async that survives the model chain going down: after
+    LLMUnavailable it waits and resumes from the turns completed so far.
+    Usage covers every attempt (and ``usage_calls`` from earlier ones)."""
+    done = list(resume or [])
+    calls = usage_calls if usage_calls is not None else []
+
+    def checkpoint(entry):
+        done.append(entry)
+        if on_turn:
+            return on_turn(entry)
+
+    for attempt in range(attempts + 1):
+        try:
+            return await run_simulation_async(payload, get_user_input, provider, checkpoint, resume=done,
+                                              usage_calls=calls)
+        except dispatch.LLMUnavailable as e:
+            if attempt >= attempts:
+                raise
+            await asyncio.sleep(dispatch.backoff(attempt + 2, e.retry_after))
+
+
+def _testimony_question(turns, round_no: int):
+    """Question to put to the user, or None. ``turns`` are ``(raw_text, parsed)`` pairs,
+    first match wins; unparseable replies fall back to the keyword scan."""
+    for raw, parsed in turns:
+        if parsed is None:
+            if structured.testimony_fallback(raw):
+                return f"Round {round_no}: Provide testimony/evidence: "
+        elif parsed.testimony_request:
+            return f"Round {round_no}: {parsed.testimony_request} "
+    return None
+
+
+def _judge_text(parsed: Optional[structured.JudgeTurn], raw: str) -> str:
+    if parsed is None:
+        return raw
+    text = parsed.assessment
+    if parsed.open_questions:
+        text += "\nOpen questions: " + "; ".join(parsed.open_questions)
+    return text
+
+
+async def iter_simulation(payload: dict, get_user_input=None, provider=None, stream_tokens: bool = False,
+                          resume: Optional[List[Dict]] = None,
+                          usage_calls: Optional[List[Dict]] = None) -> AsyncIterator[Dict]:
+    """Run the trial as a stream of events.
+
+    Yields ``{"event": "turn", ...}`` for every completed transcript entry,
+    ``{"event": "delta", ...}`` for token deltas when ``stream_tokens`` is set
+    (the text of the reply's argument, assessment or justification field, not
+    the raw JSON),
+    and a final ``{"event": "verdict", "judge": ...}``. Counsel and judge turns
+    are structured JSON (``structured`` on the turn event); a RoundController
+    ends the trial early once the judge stops or its estimate converges.
+    Turns found in ``resume`` (matched by agent and round) are replayed as
+    ``resumed`` turn events without calling the model. ``usage_calls`` is the
+    call log of the run: pass the same list to every attempt so the usage
+    report also counts the calls of the attempts that failed.
+    """
+    timer = metrics.RunTimer()
+    with timer.span("evidence_index"):
+        index = await asyncio.to_thread(build_evidence_index, payload, provider)
+    excluded = excluded_evidence(provider)
+    with timer.span("context_build"):
+        ctx = ContextManager(build_case_block(payload) + excluded_block(excluded), index, claim_query(payload))
+    if usage_calls is not None:
+        ctx.calls = usage_calls
     defense_out, opposition_out, judge_out = "", "", ""
+    defense_raw, opposition_raw, judge_raw = "", "", ""
+    saved = [t for t in (resume or []) if t.get("round") is not None]
 
     # Map trial depth → number of rounds
+    settings = payload.get("simulationSettings", {})
     depth_map = {"quick": 2, "standard": 4, "full": 6}
-    max_rounds = depth_map.get(payload.get("simulationSettings", {}).get("trialDepth"), 4)
+    max_rounds = depth_map.get(settings.get("trialDepth"), 4)
+    controller = structured.RoundController(max_rounds)
+    defense_turn = opposition_turn = judge_turn = None
 
-    for round_idx in range(max_rounds):
-        # Defense
-        if round_idx == 0:
-            d_prompt = prompts.DEFENSE_PROMPT.format(context=context)
-        else:
-            d_prompt = prompts.DEFENSE_REBUTTAL_PROMPT.format(
-                context=context,
-                judge=judge_out,
-                opposition=opposition_out
-            )
-        defense_out = _call_chat(
-            [{"role": "system", "content": prompts.SYSTEM_DEFENSE},
-             {"role": "user", "content": d_prompt}], max_tokens=500
+    def chat(messages, max_tokens, response_format=structured.RESPONSE_FORMAT):
+        return dispatcher.astream_chat(
+            messages, max_tokens=max_tokens, stream=stream_tokens, response_format=response_format
         )
-        transcript.append({"agent": "defense", "content": defense_out})
 
-        # Check if defense requests testimony
-        needs_testimony = any(
-            kw in defense_out.lower() for kw in ["testimony", "statement", "please provide", "can the user", "user input"]
-        )
+    async def deltas(call, agent, round_no, field):
+        """Delta events carrying only the ``field`` text of a streamed JSON reply."""
+        text = structured.FieldStream(field)
+        async for delta in call:
+            piece = text.feed(delta)
+            if piece:
+                yield {"event": "delta", "agent": agent, "round": round_no, "text": piece}
 
-        # Opposition
-        o_prompt = prompts.OPPOSITION_PROMPT.format(context=context, defense=defense_out)
-        opposition_out = _call_chat(
-            [{"role": "system", "content": prompts.SYSTEM_OPPOSITION},
-             {"role": "user", "content": o_prompt}], max_tokens=500
-        )
-        transcript.append({"agent": "opposition", "content": opposition_out})
+    def prompt(agent, round_no, *args, **fields):
+        with timer.span("context_build", agent, round_no):
+            return ctx.messages(*args, **fields)
+
+    def done(agent, round_no, messages, result):
+        ctx.record(agent, round_no, messages, result.usage, result.cached, result.model)
+        timer.llm(agent, round_no, result)
 
-        if any(kw in opposition_out.lower() for kw in ["testimony", "statement", "please provide", "can the user", "user input"]):
-            needs_testimony = True
+    def turn(agent, content, round_no, usage=None, parsed=None, resumed=False):
+        ctx.add_turn(agent, round_no, content)
+        return {
+            "event": "turn", "agent": agent, "content": content, "round": round_no, "usage": usage,
+            "structured": parsed.model_dump() if parsed else None, "resumed": resumed,
+        }
 
-        # Ask user if needed
-        if needs_testimony and get_user_input:
-            user_testimony = get_user_input(f"Round {round_idx+1}: Provide testimony/evidence: ")
-            if user_testimony:
-                transcript.append({"agent": "user", "content": user_testimony})
-                context += f"\n\nUSER INPUT (Round {round_idx+1}): {user_testimony}"
+    def counsel(result):
+        """(transcript text, CounselTurn or None) for one counsel reply."""
+        parsed = structured.parse(result.content, structured.CounselTurn)
+        return (parsed.argument if parsed else result.content), parsed
+
+    def replay(agent, round_no, schema=None):
+        """``(text, raw, parsed)`` of a checkpointed turn, or None."""
+        for i, t in enumerate(saved):
+            if t["agent"] == agent and t["round"] == round_no:
+                del saved[i]
+                parsed = schema.model_validate(t["structured"]) if schema and t.get("structured") else None
+                raw = json.dumps(t["structured"]) if parsed else t["content"]
+                return t["content"], raw, parsed
+        return None
+
+    for round_idx in range(max_rounds):
+        round_no = round_idx + 1
+
+        if round_idx == 0 and settings.get("parallelOpenings"):
+            # Opening statements depend only on the case, so they run concurrently
+            # (token deltas are not streamed for these two calls)
+            openings = {}
+            for agent, system, template in (
+                ("defense", prompts.SYSTEM_DEFENSE, prompts.DEFENSE_PROMPT),
+                ("opposition", prompts.SYSTEM_OPPOSITION, prompts.OPPOSITION_OPENING_PROMPT),
+            ):
+                hit = replay(agent, round_no, structured.CounselTurn)
+                if hit:
+                    if agent == "defense":
+                        defense_out, defense_raw, defense_turn = hit
+                    else:
+                        opposition_out, opposition_raw, opposition_turn = hit
+                    yield turn(agent, hit[0], round_no, None, hit[2], resumed=True)
+                else:
+                    openings[agent] = prompt(agent, round_no, system, template, claim_query(payload))
+            sched = TurnScheduler()
+            for agent, messages in openings.items():
+                sched.add(agent, lambda _, m=messages: dispatcher.achat(
+                    m, max_tokens=500, response_format=structured.RESPONSE_FORMAT
+                ))
+            async for agent, result in sched.as_completed():
+                done(agent, round_no, openings[agent], result)
+                text, parsed = counsel(result)
+                if agent == "defense":
+                    defense_out, defense_turn = text, parsed
+                    defense_raw = result.content
+                else:
+                    opposition_out, opposition_turn = text, parsed
+                    opposition_raw = result.content
+                yield turn(agent, text, round_no, result.usage, parsed)
+        else:
+            # Defense (evidence is re-ranked per turn against what is being answered)
+            hit = replay("defense", round_no, structured.CounselTurn)
+            if hit:
+                defense_out, defense_raw, defense_turn = hit
+                yield turn("defense", defense_out, round_no, None, defense_turn, resumed=True)
+            else:
+                if round_idx == 0:
+                    messages = prompt("defense", round_no, prompts.SYSTEM_DEFENSE, prompts.DEFENSE_PROMPT, claim_query(payload))
+                else:
+                    messages = prompt(
+                        "defense", round_no, prompts.SYSTEM_DEFENSE, prompts.DEFENSE_REBUTTAL_PROMPT,
+                        judge_out + "\n" + opposition_out,
+                        judge=judge_out,
+                        opposition=opposition_out
+                    )
+                call = chat(messages, 500)
+                async for ev in deltas(call, "defense", round_no, "argument"):
+                    yield ev
+                defense_raw = call.result.content
+                defense_out, defense_turn = counsel(call.result)
+                done("defense", round_no, messages, call.result)
+                yield turn("defense", defense_out, round_no, call.result.usage, defense_turn)
+
+            # Opposition
+            hit = replay("opposition", round_no, structured.CounselTurn)
+            if hit:
+                opposition_out, opposition_raw, opposition_turn = hit
+                yield turn("opposition", opposition_out, round_no, None, opposition_turn, resumed=True)
+            else:
+                messages = prompt(
+                    "opposition", round_no, prompts.SYSTEM_OPPOSITION, prompts.OPPOSITION_PROMPT, defense_out, defense=defense_out
+                )
+                call = chat(messages, 500)
+                async for ev in deltas(call, "opposition", round_no, "argument"):
+                    yield ev
+                opposition_raw = call.result.content
+                opposition_out, opposition_turn = counsel(call.result)
+                done("opposition", round_no, messages, call.result)
+                yield turn("opposition", opposition_out, round_no, call.result.usage, opposition_turn)
+
+        # Ask the user if the judge (last round) or either counsel requested testimony
+        hit = replay("user", round_no)
+        if hit:
+            ctx.add_testimony(round_no, hit[0])
+            yield turn("user", hit[0], round_no, resumed=True)
+        else:
+            question = _testimony_question(
+                ([(judge_raw, judge_turn)] if judge_turn else [])
+                + [(defense_raw, defense_turn), (opposition_raw, opposition_turn)],
+                round_no,
+            )
+            if question and get_user_input:
+                user_testimony = await _ask_user(get_user_input, question)
+                if user_testimony:
+                    ctx.add_testimony(round_no, user_testimony)
+                    yield turn("user", user_testimony, round_no)
 
         # Judge
-        j_prompt = prompts.JUDGE_ITER_PROMPT.format(
-            context=context,
-            defense=defense_out,
-            opposition=opposition_out
-        )
-        judge_out = _call_chat(
-            [{"role": "system", "content": prompts.SYSTEM_JUDGE},
-             {"role": "user", "content": j_prompt}], max_tokens=400
-        )
-        transcript.append({"agent": "judge", "content": judge_out})
+        hit = replay("judge", round_no, structured.JudgeTurn)
+        if hit:
+            judge_out, judge_raw, judge_turn = hit
+            yield turn("judge", judge_out, round_no, None, judge_turn, resumed=True)
+        else:
+            messages = prompt(
+                "judge", round_no, prompts.SYSTEM_JUDGE, prompts.JUDGE_ITER_PROMPT,
+                defense_out + "\n" + opposition_out,
+                defense=defense_out,
+                opposition=opposition_out
+            )
+            call = chat(messages, 400)
+            async for ev in deltas(call, "judge", round_no, "assessment"):
+                yield ev
+            judge_raw = call.result.content
+            judge_turn = structured.parse(judge_raw, structured.JudgeTurn)
+            judge_out = _judge_text(judge_turn, judge_raw)
+            done("judge", round_no, messages, call.result)
+            yield turn("judge", judge_out, round_no, call.result.usage, judge_turn)
 
-        if "satisfied" in judge_out.lower() or "final decision" in judge_out.lower():
+        if controller.should_stop(judge_turn, judge_raw, defense_turn):
             break
 
-    # Final Decision
-    j_final_prompt = prompts.JUDGE_FINAL_PROMPT.format(
-        context=context,
-        transcript="\n\n".join([f"{t['agent'].upper()}: {t['content']}" for t in transcript])
-    )
-    judge_final_out = _call_chat(
-        [{"role": "system", "content": prompts.SYSTEM_JUDGE},
-         {"role": "user", "content": j_final_prompt}], max_tokens=400
+    # Final Decision (earlier rounds arrive as rolling summaries)
+    messages = prompt(
+        "judge_final", None, prompts.SYSTEM_JUDGE, prompts.JUDGE_FINAL_PROMPT,
+        claim_query(payload) + "\n" + defense_out + "\n" + opposition_out
     )
+    call = chat(messages, 700)
+    async for ev in deltas(call, "judge_final", None, "justification"):
+        yield ev
+    judge_final_out = call.result.content
+    done("judge_final", None, messages, call.result)
 
-    # Extract win probability
-    win_prob = 50.0
-    m = re.search(r"(\d{1,3})\s*%|\b(\d{1,3})\s*percent", judge_final_out, re.IGNORECASE)
-    if m:
-        num = m.group(1) or m.group(2)
-        win_prob = min(max(float(num), 0.0), 100.0)
+    # Validate the verdict; on failure ask the judge to repair its own reply
+    # (bounded by VERDICT_REPAIR_ATTEMPTS) rather than re-running the trial
+    verdict = structured.parse(judge_final_out, structured.Verdict)
+    repairs = 0
+    while verdict is None and repairs < structured.VERDICT_REPAIR_ATTEMPTS:
+        repairs += 1
+        error = structured.parse_error(judge_final_out, structured.Verdict)
+        messages = messages + [
+            {"role": "assistant", "content": judge_final_out},
+            {"role": "user", "content": prompts.VERDICT_REPAIR_PROMPT.render(error=error[:800])},
+        ]
+        result = await dispatcher.achat(messages, max_tokens=700, response_format=structured.RESPONSE_FORMAT)
+        done("judge_final", None, messages, result)
+        judge_final_out = result.content
+        verdict = structured.parse(judge_final_out, structured.Verdict)
 
-    return transcript, {
+    if verdict is not None:
+        win_prob, source = verdict.defense_win_probability, "verdict"
+        justification, breakdown = verdict.justification, verdict.breakdown_dict()
+    elif controller.estimates:
+        # Last structured estimate from the round judge beats a guessed number
+        win_prob, source = controller.estimates[-1], "judge_estimate"
+        justification, breakdown = judge_final_out, {}
+    else:
+        raise structured.VerdictError(
+            f"Final verdict could not be parsed after {repairs} repair attempt(s): "
+            + structured.parse_error(judge_final_out, structured.Verdict)
+        )
+
+    usage = ctx.usage_report()
+    metrics.SIMULATION_LLM_CALLS.observe(usage["llm_calls"], stop_reason=controller.stop_reason)
+
+    yield {"event": "verdict", "judge": {
         "win_probability": win_prob,
-        "justification": judge_final_out,
-        "raw": judge_final_out
+        "probability_source": source,
+        "verdict_repairs": repairs,
+        "breakdown": breakdown,
+        "justification": justification,
+        "raw": judge_final_out,
+        "usage": usage,
+        "rounds": controller.rounds,
+        "max_rounds": max_rounds,
+        "stop_reason": controller.stop_reason,
+        "excluded_evidence": excluded,
+        "timings": timer.breakdown(),
+    }}
+
+
+# -------------------------------
+# Batch "what-if" simulations
+# -------------------------------
+async def run_batch(payloads: List[dict], provider=None, concurrency: int = 4) -> List[Dict]:
+    """Run independent variants of a case concurrently, ``concurrency`` at a time.
+
+    Failures are reported per variant instead of failing the batch.
+    """
+    sched = TurnScheduler(max_concurrency=concurrency, queue_name="batch")
+
+    def variant(payload):
+        async def run(_):
+            start = time.perf_counter()
+            try:
+                transcript, judge = await run_resumable(payload, provider=provider)
+                return {
+                    "win_probability": judge["win_probability"],
+                    "turns": len(transcript),
+                    "llm_calls": judge.get("usage", {}).get("llm_calls"),
+                    "rounds": judge.get("rounds"),
+                    "stop_reason": judge.get("stop_reason"),
+                    "justification": judge.get("justification", ""),
+                    "elapsed": time.perf_counter() - start,
+                }
+            except Exception as e:
+                return {"error": str(e), "elapsed": time.perf_counter() - start}
+        return run
+
+    for i, payload in enumerate(payloads):
+        sched.add(str(i), variant(payload))
+    results = await sched.run()
+    return [
+        {"settings": payloads[i].get("simulationSettings", {}), **results[str(i)]}
+        for i in range(len(payloads))
+    ]
+
+
+def batch_stats(results: List[Dict]) -> Dict:
+    probs = [r["win_probability"] for r in results if "win_probability" in r]
+    if not probs:
+        return {"n": len(results), "succeeded": 0}
+    calls = [r["llm_calls"] for r in results if r.get("llm_calls") is not None]
+    return {
+        "n": len(results),
+        "succeeded": len(probs),
+        "mean": statistics.fmean(probs),
+        "median": statistics.median(probs),
+        "stdev": statistics.stdev(probs) if len(probs) > 1 else 0.0,
+        "min": min(probs),
+        "max": max(probs),
+        "defense_favoured": sum(p > 50 for p in probs) / len(probs),
+        "mean_llm_calls": statistics.fmean(calls) if calls else None,
     }
@@ -0,0 +1,262 @@
+import json
+import os
+import re
+from typing import Dict, List, Literal, Optional, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+# Ask the provider for JSON output (OpenRouter drops the parameter for models without it)
+JSON_MODE = os.getenv("LLM_JSON_MODE", "1") not in ("0", "false", "False")
+RESPONSE_FORMAT = {"type": "json_object"} if JSON_MODE else None
+
+# Adaptive round control
+MIN_ROUNDS = int(os.getenv("SIM_MIN_ROUNDS", "1"))
+# Stop once two consecutive judge estimates move less than this (probability points)...
+CONVERGENCE_DELTA = float(os.getenv("SIM_CONVERGENCE_DELTA", "5"))
+# ...and the judge is at least this confident
+CONVERGENCE_CONFIDENCE = float(os.getenv("SIM_CONVERGENCE_CONFIDENCE", "0.7"))
+
+# Follow-up calls allowed when the final verdict does not validate
+VERDICT_REPAIR_ATTEMPTS = int(os.getenv("VERDICT_REPAIR_ATTEMPTS", "1"))
+
+T = TypeVar("T", bound=BaseModel)
+
+
+# -------------------------------
+# Turn schemas
+# -------------------------------
+class CounselTurn(BaseModel):
+    argument: str
+    cited_evidence: List[str] = Field(default_factory=list)
+    testimony_request: Optional[str] = None
+    no_further_arguments: bool = False
+
+
+class JudgeTurn(BaseModel):
+    assessment: str
+    decision: Literal["continue", "stop"]
+    confidence: float = Field(ge=0.0, le=1.0)
+    defense_win_probability: Optional[float] = Field(default=None, ge=0.0, le=100.0)
+    open_questions: List[str] = Field(default_factory=list)
+    testimony_request: Optional[str] = None
+
+
+class StrongestPoints(BaseModel):
+    defense: List[str] = Field(default_factory=list)
+    opposition: List[str] = Field(default_factory=list)
+
+
+class Factor(BaseModel):
+    factor: str
+    favours: Literal["defense", "opposition", "neutral"]
+    weight: float = Field(ge=0.0, le=1.0)
+    note: str = ""
+
+
+class Verdict(BaseModel):
+    strongest_points: StrongestPoints
+    defense_win_probability: float = Field(ge=0.0, le=100.0)
+    breakdown: List[Factor] = Field(default_factory=list)
+    justification: str
+
+    def breakdown_dict(self) -> Dict:
+        """What JudgeResult.breakdown stores (as JSON)."""
+        return {
+            "strongest_points": self.strongest_points.model_dump(),
+            "factors": [f.model_dump() for f in self.breakdown],
+        }
+
+
+class VerdictError(RuntimeError):
+    """The final verdict could not be parsed, even after the repair retry."""
+
+
+# -------------------------------
+# Parsing
+# -------------------------------
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def extract_json(text: str) -> Optional[dict]:
+    """First JSON object in ``text``, tolerating code fences and surrounding prose."""
+    if not text:
+        return None
+    fenced = _FENCE_RE.search(text)
+    candidates = [fenced.group(1)] if fenced else []
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def parse(text: str, schema: Type[T]) -> Optional[T]:
+    data = extract_json(text)
+    if data is None:
+        return None
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        return None
+
+
+def parse_error(text: str, schema: Type[T]) -> Optional[str]:
+    """Why ``text`` does not parse as ``schema`` (None when it does)."""
+    data = extract_json(text)
+    if data is None:
+        return "no JSON object found"
+    try:
+        schema.model_validate(data)
+    except ValidationError as e:
+        return str(e)
+    return None
+
+
+# -------------------------------
+# Streaming
+# -------------------------------
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class FieldStream:
+    """Pulls one string field out of a JSON reply as it streams in.
+
+    ``feed(delta)`` returns the newly decoded text of ``field`` (``""`` while
+    the key has not arrived yet, or once the value is complete), so clients
+    see e.g. the counsel's argument instead of raw JSON fragments. A reply
+    that does not open as JSON (``{`` or a code fence) is passed through.
+    """
+
+    def __init__(self, field: str):
+        self.key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buf = ""
+        self.json: Optional[bool] = None
+        self.pos: Optional[int] = None  # start of the undecoded value text
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        if self.json is False:
+            return delta
+        self.buf += delta
+        if self.json is None:
+            head = self.buf.lstrip()
+            if not head:
+                return ""
+            self.json = head[0] in "{`"
+            if not self.json:
+                return self.buf
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = self.key.search(self.buf)
+            if not match:
+                return ""
+            self.pos = match.end()
+        return self._decode()
+
+    def _decode(self) -> str:
+        out, i, buf = [], self.pos, self.buf
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self.done = True
+                break
+            if c != "\\":
+                out.append(c)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break  # escape split across deltas
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            code = buf[i + 2:i + 6]
+            if len(code) < 4:
+                break
+            try:
+                point = int(code, 16)
+            except ValueError:
+                point = 0xFFFD  # malformed escape; the turn event still carries the raw reply
+            i += 6
+            if 0xD800 <= point < 0xDC00:
+                if len(buf) < i + 6:
+                    i -= 6  # wait for the low surrogate
+                    break
+                low = int(buf[i + 2:i + 6], 16) if re.fullmatch(r"\\u[0-9a-fA-F]{4}", buf[i:i + 6]) else 0
+                if 0xDC00 <= low < 0xE000:
+                    point, i = 0x10000 + ((point - 0xD800) << 10) + (low - 0xDC00), i + 6
+            out.append(chr(point))
+        self.pos = i
+        return "".join(out)
+
+
+# Keyword fallbacks for replies that are not valid JSON
+_TESTIMONY_KEYWORDS = ("testimony", "statement", "please provide", "can the user", "user input")
+
+
+def testimony_fallback(text: str) -> bool:
+    return any(kw in text.lower() for kw in _TESTIMONY_KEYWORDS)
+
+
+def stop_fallback(text: str) -> bool:
+    lowered = text.lower()
+    if re.search(r"\bnot\s+(yet\s+)?satisfied\b", lowered):
+        return False
+    return "satisfied" in lowered or "final decision" in lowered
+
+
+# -------------------------------
+# Adaptive round controller
+# -------------------------------
+class RoundController:
+    """Decides after each judge turn whether another round is worth its LLM calls.
+
+    Stops on the judge's explicit ``stop``, when defense has nothing further,
+    or when the judge's win-probability estimate has converged at high
+    confidence. Unparseable judge replies fall back to the keyword check.
+    """
+
+    def __init__(self, max_rounds: int, min_rounds: int = MIN_ROUNDS,
+                 delta: float = CONVERGENCE_DELTA, confidence: float = CONVERGENCE_CONFIDENCE):
+        self.max_rounds = max_rounds
+        self.min_rounds = min(min_rounds, max_rounds)
+        self.delta = delta
+        self.confidence = confidence
+        self.rounds = 0
+        self.estimates: List[float] = []
+        self.stop_reason = "max_rounds"
+
+    def should_stop(self, judge: Optional[JudgeTurn], judge_text: str, defense: Optional[CounselTurn] = None) -> bool:
+        self.rounds += 1
+        if judge and judge.defense_win_probability is not None:
+            self.estimates.append(judge.defense_win_probability)
+        if self.rounds < self.min_rounds:
+            return False
+
+        if judge is None:
+            reason = "keyword" if stop_fallback(judge_text) else None
+        elif judge.decision == "stop":
+            reason = "judge_stop"
+        elif defense and defense.no_further_arguments:
+            reason = "no_further_arguments"
+        elif (
+            len(self.estimates) >= 2
+            and abs(self.estimates[-1] - self.estimates[-2]) < self.delta
+            and judge.confidence >= self.confidence
+        ):
+            reason = "converged"
+        else:
+            reason = None
+
+        if reason:
+            self.stop_reason = reason
+            return True
+        return False
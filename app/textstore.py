@@ -0,0 +1,99 @@
+"""Compressed storage for large text (extracted evidence, transcripts).
+
+Text is packed into self-describing frames: a one-byte codec tag followed by
+the payload. zstd is used when the optional ``zstandard`` package is
+installed (``pip install zstandard``), zlib otherwise; strings shorter than
+TEXT_MIN_BYTES are stored raw, where compression would only add overhead.
+
+Documents are packed one frame per page with an index of character and byte
+offsets, so a page or character range only reads and inflates the frames it
+overlaps (see blobstore.page_slice / text_slice).
+"""
+import os
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+TEXT_CODEC = os.getenv("TEXT_CODEC", "zstd")  # zstd | zlib | none
+TEXT_LEVEL = int(os.getenv("TEXT_LEVEL", "0"))  # 0 = the codec's default
+TEXT_MIN_BYTES = int(os.getenv("TEXT_MIN_BYTES", "256"))
+
+RAW, ZLIB, ZSTD = b"r", b"z", b"s"
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+def codec() -> str:
+    """The codec new frames are written with."""
+    if TEXT_CODEC == "zstd" and zstandard is not None:
+        return "zstd"
+    return "none" if TEXT_CODEC == "none" else "zlib"
+
+
+# -------------------------------
+# Frames
+# -------------------------------
+def pack(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    name = codec()
+    if len(raw) < TEXT_MIN_BYTES or name == "none":
+        return RAW + raw
+    if name == "zstd":
+        return ZSTD + zstandard.ZstdCompressor(level=TEXT_LEVEL or 3).compress(raw)
+    return ZLIB + zlib.compress(raw, TEXT_LEVEL or 6)
+
+
+def unpack(data: Optional[bytes]) -> str:
+    if not data:
+        return ""
+    tag, body = bytes(data[:1]), bytes(data[1:])
+    if tag == RAW:
+        return body.decode("utf-8")
+    if tag == ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if tag == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Text was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    raise ValueError(f"Unknown text frame codec {tag!r}")
+
+
+# -------------------------------
+# Paged documents
+# -------------------------------
+def pack_pages(pages: Sequence[str], sep: str) -> Tuple[bytes, List[List[int]], int]:
+    """``(data, index, length)`` for ``sep.join(pages)``.
+
+    ``index`` holds ``[char_start, byte_start, byte_stop]`` per page: where
+    the page starts in the joined text and where its frame sits in ``data``.
+    """
+    frames, index = [], []
+    char_pos = byte_pos = 0
+    for i, page in enumerate(pages):
+        if i:
+            char_pos += len(sep)
+        frame = pack(page)
+        index.append([char_pos, byte_pos, byte_pos + len(frame)])
+        frames.append(frame)
+        char_pos += len(page)
+        byte_pos += len(frame)
+    return b"".join(frames), index, char_pos
+
+
+def unpack_pages(data: bytes, entries: Sequence[Sequence[int]]) -> List[str]:
+    """Pages for consecutive index ``entries``; ``data`` starts at the first one's frame."""
+    base = entries[0][1] if entries else 0
+    return [unpack(data[start - base:stop - base]) for _, start, stop in entries]
+
+
+def pages_for_range(index: Sequence[Sequence[int]], start: int, stop: int) -> Tuple[int, int]:
+    """Pages ``[first, last)`` that overlap characters ``[start, stop)``."""
+    first = 0
+    while first + 1 < len(index) and index[first + 1][0] <= start:
+        first += 1
+    last = first + 1
+    while last < len(index) and index[last][0] < stop:
+        last += 1
+    return first, last
@@ -0,0 +1,9 @@
+import math
+
+# Rough chars-per-token ratio for English prose on Mistral/Llama tokenizers.
+# Good enough for budgeting; we never need exact counts client-side.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
@@ -0,0 +1,242 @@
+"""Non-interactive batch runner: simulate every case payload in a JSONL file.
+
+Each input line is a payload as run_simulation consumes it (caseInfo,
+userClaim, evidence, opposition, simulationSettings), optionally with an
+"id". Relative evidence paths are resolved against the JSONL file's folder.
+
+Results are appended to <out>/results.jsonl as each case finishes, so a
+killed run picks up where it left off: cases already recorded as ok are
+skipped (failed ones are retried unless --skip-failed). A summary of
+throughput and the verdict distribution is printed and written to
+<out>/summary.json.
+
+Usage: python batch_courtroom.py cases.jsonl [--out batch_out] [--concurrency 4]
+       [--rate 2] [--burst 4] [--cache read-through] [--limit N] [--save-transcripts]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app import evidence, llm, llm_cache, services
+from app.scheduler import TurnScheduler
+
+# Extracted text is cached by content hash, shared with cli_courtroom.py
+EXTRACT_CACHE_DIR = Path(".extract_cache")
+
+
+# -------------------------------
+# Input
+# -------------------------------
+def case_id(payload: dict) -> str:
+    """The payload's "id", else a hash of its content (stable across reorderings)."""
+    if payload.get("id") is not None:
+        return str(payload["id"])
+    raw = json.dumps(payload, sort_keys=True).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def load_cases(path: Path) -> List[Tuple[str, dict]]:
+    cases, seen = [], set()
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"{path}:{lineno}: invalid JSON ({e})")
+        cid = case_id(payload)
+        if cid in seen:
+            raise SystemExit(f"{path}:{lineno}: duplicate case id {cid!r}")
+        seen.add(cid)
+        files = payload.get("evidence", {}).get("files", [])
+        payload.setdefault("evidence", {})["files"] = [
+            f if Path(f).is_absolute() or Path(f).exists() else str(path.parent / f) for f in files
+        ]
+        cases.append((cid, payload))
+    return cases
+
+
+# -------------------------------
+# Checkpoint
+# -------------------------------
+def load_checkpoint(path: Path) -> Dict[str, dict]:
+    """Last recorded result per case id (a torn final line from a kill is ignored)."""
+    done = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[rec["id"]] = rec
+    return done
+
+
+class Checkpoint:
+    def __init__(self, path: Path):
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, rec: dict):
+        self._f.write(json.dumps(rec) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+# -------------------------------
+# Run
+# -------------------------------
+async def run_case(cid: str, payload: dict, provider, out: Path, save_transcripts: bool) -> dict:
+    start = time.perf_counter()
+    try:
+        transcript, judge = await services.run_resumable(payload, provider=provider)
+    except Exception as e:
+        return {"id": cid, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "elapsed": round(time.perf_counter() - start, 3)}
+    if save_transcripts:
+        (out / "transcripts" / f"{cid}.json").write_text(
+            json.dumps({"id": cid, "transcript": transcript, "judge": judge}, indent=2), encoding="utf-8"
+        )
+    usage = judge.get("usage") or {}
+    return {
+        "id": cid,
+        "status": "ok",
+        "win_probability": judge["win_probability"],
+        "probability_source": judge.get("probability_source"),
+        "rounds": judge.get("rounds"),
+        "stop_reason": judge.get("stop_reason"),
+        "llm_calls": usage.get("llm_calls"),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "turns": len(transcript),
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+
+
+async def run_batch(cases, args, checkpoint: Checkpoint) -> List[dict]:
+    provider = evidence.CachedFileProvider(EXTRACT_CACHE_DIR)
+    sched = TurnScheduler(max_concurrency=args.concurrency, queue_name="batch_cli")
+    for cid, payload in cases:
+        sched.add(cid, lambda _, c=cid, p=payload: run_case(c, p, provider, args.out, args.save_transcripts))
+
+    results = []
+    with llm_cache.use_mode(args.cache):
+        async for cid, rec in sched.as_completed():
+            checkpoint.write(rec)
+            results.append(rec)
+            status = f"{rec['win_probability']:.0f}%" if rec["status"] == "ok" else rec["error"]
+            print(f"[{len(results)}/{len(cases)}] {cid}: {status} ({rec['elapsed']:.1f}s)", flush=True)
+    await llm.aclose()
+    return results
+
+
+# -------------------------------
+# Summary
+# -------------------------------
+def summarize(records: List[dict], session: List[dict], elapsed: float) -> dict:
+    ok = [r for r in records if r["status"] == "ok"]
+    probs = [r["win_probability"] for r in ok]
+    calls = [r["llm_calls"] for r in ok if r.get("llm_calls") is not None]
+    bands = Counter(min(int(p // 20), 4) for p in probs)
+    return {
+        "cases": len(records),
+        "succeeded": len(ok),
+        "failed": len(records) - len(ok),
+        "this_run": {
+            "cases": len(session),
+            "elapsed_s": round(elapsed, 2),
+            "cases_per_min": round(len(session) / elapsed * 60, 2) if elapsed else None,
+            "mean_case_s": round(statistics.fmean(r["elapsed"] for r in session), 2) if session else None,
+        },
+        "verdicts": services.batch_stats(ok),
+        "win_probability_bands": {f"{b * 20}-{b * 20 + 20}": bands.get(b, 0) for b in range(5)},
+        "stop_reasons": dict(Counter(r.get("stop_reason") for r in ok)),
+        "mean_llm_calls": round(statistics.fmean(calls), 2) if calls else None,
+        "tokens": {
+            "prompt": sum(r.get("prompt_tokens") or 0 for r in ok),
+            "completion": sum(r.get("completion_tokens") or 0 for r in ok),
+        },
+    }
+
+
+def print_summary(summary: dict):
+    run = summary["this_run"]
+    print("\n=== Batch Summary ===")
+    print(f"Cases: {summary['cases']}  ok: {summary['succeeded']}  failed: {summary['failed']}")
+    if run["cases"]:
+        print(f"This run: {run['cases']} cases in {run['elapsed_s']:.1f}s "
+              f"({run['cases_per_min']:.1f} cases/min, {run['mean_case_s']:.1f}s per case)")
+    verdicts = summary["verdicts"]
+    if verdicts.get("succeeded"):
+        print(f"Win probability: mean {verdicts['mean']:.1f}  median {verdicts['median']:.1f}  "
+              f"stdev {verdicts['stdev']:.1f}  range {verdicts['min']:.0f}-{verdicts['max']:.0f}  "
+              f"defense favoured {verdicts['defense_favoured']:.0%}")
+        for band, n in summary["win_probability_bands"].items():
+            print(f"  {band:>7}%  {'#' * n} {n}")
+    if summary["mean_llm_calls"] is not None:
+        print(f"LLM calls per case: {summary['mean_llm_calls']:.1f}  stop reasons: {summary['stop_reasons']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", type=Path, help="JSONL file, one case payload per line")
+    parser.add_argument("--out", type=Path, default=Path("batch_out"), help="checkpoint and summary folder")
+    parser.add_argument("--concurrency", type=int, default=4, help="cases simulated at once")
+    parser.add_argument("--rate", type=float, default=llm.settings["rate_limit"],
+                        help="max LLM requests per second across all cases (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=llm.settings["rate_burst"])
+    parser.add_argument("--cache", default=llm_cache.current_mode(), choices=llm_cache.MODES, help="LLM cache mode")
+    parser.add_argument("--limit", type=int, help="only the first N pending cases")
+    parser.add_argument("--skip-failed", action="store_true", help="do not retry cases that failed before")
+    parser.add_argument("--save-transcripts", action="store_true", help="write <out>/transcripts/<id>.json")
+    args = parser.parse_args()
+
+    try:
+        args.cache = llm_cache.validate_mode(args.cache)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    llm.configure(rate_limit=args.rate, rate_burst=args.burst)
+
+    cases = load_cases(args.cases)
+    args.out.mkdir(parents=True, exist_ok=True)
+    if args.save_transcripts:
+        (args.out / "transcripts").mkdir(exist_ok=True)
+    results_path = args.out / "results.jsonl"
+    done = load_checkpoint(results_path)
+    skip = {cid for cid, rec in done.items() if rec["status"] == "ok" or args.skip_failed}
+    pending = [(cid, p) for cid, p in cases if cid not in skip]
+    print(f"{len(cases)} cases, {len(cases) - len(pending)} already done, {len(pending[: args.limit])} to run "
+          f"(concurrency {args.concurrency}, rate {args.rate or 'unlimited'}/s)", flush=True)
+
+    checkpoint = Checkpoint(results_path)
+    start = time.perf_counter()
+    try:
+        pending = pending[: args.limit]
+        session = asyncio.run(run_batch(pending, args, checkpoint)) if pending else []
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished cases are checkpointed, rerun to resume.", file=sys.stderr)
+        raise SystemExit(130)
+    finally:
+        checkpoint.close()
+    elapsed = time.perf_counter() - start
+
+    ids = {cid for cid, _ in cases}
+    records = [rec for cid, rec in load_checkpoint(results_path).items() if cid in ids]
+    summary = summarize(records, session, elapsed)
+    (args.out / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
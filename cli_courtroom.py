@@ -1,12 +1,15 @@
 import sys
 from pathlib import Path
-from app import services, models
+from app import services, models, evidence
 
 # Case metadata
 TITLE = "BSNL vs M/S S D Constructions"
 DESCRIPTION = "A dispute regarding the installation of telecom equipment on a building."
 CASE_TYPE = "Civil"
 
+# Extracted text is cached by content hash, so the shared PDF is parsed once
+EXTRACT_CACHE_DIR = Path(".extract_cache")
+
 # Hardcoded evidence paths
 DEFENSE_FILE = Path("uploads/Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF")
 OPPOSITION_FILE = Path("uploads/Chief_General_Manager_Bharat_Sanchar_vs_M_S_S_D_Constructions_on_15_November_2022.PDF")
@@ -72,7 +75,8 @@ def main():
 
     transcript, result = services.run_simulation(
         payload,
-        get_user_input=get_user_input
+        get_user_input=get_user_input,
+        provider=evidence.CachedFileProvider(EXTRACT_CACHE_DIR)
     )
 
     print("\n=== Simulation Transcript ===")
@@ -80,6 +84,10 @@ def main():
         print(f"[{entry['agent'].upper()}] {entry['content']}\n")
 
     print("=== Judge's Final Decision ===")
+    points = (result.get("breakdown") or {}).get("strongest_points", {})
+    for side in ("defense", "opposition"):
+        for point in points.get(side, []):
+            print(f"[{side.upper()}] {point}")
     print(result["justification"])
     print(f"Win Probability: {result['win_probability']}%\n")
 
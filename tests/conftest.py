@@ -0,0 +1,63 @@
+"""Test setup: a throwaway SQLite database and a local mock OpenRouter server.
+
+The environment is set here, before any ``app`` module is imported, because
+the LLM client and the database read their configuration at import time.
+Tests run from a temporary directory so uploads never land in ./uploads.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TMP = Path(tempfile.mkdtemp(prefix="courtroom-tests-"))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+MOCK_PORT = _free_port()
+
+os.environ.update({
+    "DB_URL": f"sqlite:///{TMP / 'test.db'}",
+    "OPENROUTER_API_KEY": "test",
+    "OPENROUTER_BASE_URL": f"http://127.0.0.1:{MOCK_PORT}/v1/chat/completions",
+    "LLM_FALLBACK_MODELS": "",
+    "LLM_CACHE_PATH": str(TMP / "llm_cache.sqlite"),
+    "RECOVER_ON_STARTUP": "0",
+})
+sys.path.insert(0, str(ROOT))
+os.chdir(TMP)
+
+
+@pytest.fixture(scope="session")
+def mock_openrouter():
+    """Base URL of app/scripts/mock_openrouter.py, running for the whole session."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.scripts.mock_openrouter", "--port", str(MOCK_PORT),
+         "--latency", "0", "--tokens-per-sec", "5000"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{MOCK_PORT}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(url + "/docs", timeout=0.5)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("mock OpenRouter server did not start")
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
@@ -0,0 +1,110 @@
+"""Content-addressed blobs: reference counting and garbage collection."""
+import hashlib
+import os
+import time
+import uuid
+
+import pytest
+from sqlmodel import Session
+
+from app import blobstore, migrations, models
+from app.db import get_engine
+
+
+@pytest.fixture(autouse=True)
+def blob_dir(tmp_path, monkeypatch):
+    migrations.upgrade(get_engine())
+    monkeypatch.setattr(blobstore, "BLOB_DIR", tmp_path / "blobs")
+    return tmp_path / "blobs"
+
+
+def upload(tmp_path, data: bytes):
+    tmp = tmp_path / f"{uuid.uuid4().hex}.part"
+    tmp.write_bytes(data)
+    sha = hashlib.sha256(data).hexdigest()
+    with Session(get_engine()) as sess:
+        blob, created = blobstore.adopt(sess, tmp, sha, len(data), ".TXT")
+        return sha, blob.stored_path, blob.refcount, created, tmp
+
+
+def refcount(sha: str):
+    with Session(get_engine()) as sess:
+        blob = sess.get(models.Blob, sha)
+        return None if blob is None else blob.refcount
+
+
+def release(sha: str):
+    with Session(get_engine()) as sess:
+        blobstore.release(sess, sha)
+        sess.commit()
+
+
+def age(path, seconds: float = 7200):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_adopt_dedups_and_counts_references(tmp_path):
+    data = uuid.uuid4().bytes
+    sha, stored, count, created, tmp = upload(tmp_path, data)
+    assert created and count == 1
+    assert stored.endswith(f"{sha}.txt") and open(stored, "rb").read() == data
+    assert not tmp.exists()
+
+    again_sha, again_stored, count, created, tmp = upload(tmp_path, data)
+    assert (again_sha, again_stored) == (sha, stored)
+    assert not created and count == 2
+    assert not tmp.exists()
+
+
+def test_gc_removes_unreferenced_blob_rows_and_file(tmp_path):
+    sha, stored, *_ = upload(tmp_path, uuid.uuid4().bytes)
+    with Session(get_engine()) as sess:
+        sess.add(models.BlobText(blob_sha256=sha, length=3, data=b"abc"))
+        sess.commit()
+    age(stored)
+    release(sha)
+
+    with Session(get_engine()) as sess:
+        assert blobstore.collect_garbage(sess)["blobs"] >= 1
+        assert sess.get(models.Blob, sha) is None
+        assert sess.get(models.BlobText, sha) is None
+    assert not os.path.exists(stored)
+
+
+def test_gc_keeps_blob_referenced_again_after_the_scan(tmp_path, monkeypatch):
+    data = uuid.uuid4().bytes
+    sha, stored, *_ = upload(tmp_path, data)
+    age(stored)
+    release(sha)
+
+    real_execute = Session.execute
+    raced = []
+
+    def upload_then_execute(self, statement, *args, **kwargs):
+        if not raced and getattr(statement, "is_delete", False) and statement.table.name == "blob":
+            # The orphan scan has run; an upload of the same content lands now
+            raced.append(upload(tmp_path, data))
+        return real_execute(self, statement, *args, **kwargs)
+
+    monkeypatch.setattr(Session, "execute", upload_then_execute)
+    with Session(get_engine()) as sess:
+        blobstore.collect_garbage(sess)
+    monkeypatch.undo()
+
+    assert raced and not raced[0][3]
+    assert refcount(sha) == 1
+    assert os.path.exists(stored)
+
+
+def test_gc_sweeps_only_old_stray_files(blob_dir):
+    old = blob_dir / "aa" / "aa-old.txt"
+    fresh = blob_dir / "bb" / "bb-fresh.txt"
+    for path in (old, fresh):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    age(old)
+
+    with Session(get_engine()) as sess:
+        assert blobstore.collect_garbage(sess)["stray_files"] == 1
+    assert not old.exists() and fresh.exists()
@@ -0,0 +1,255 @@
+"""Retries, backoff, circuit breaking and model fallback in app.dispatch."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import dispatch, llm
+from app.main import app
+
+
+def http_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def ok(model: str) -> llm.ChatResult:
+    return llm.ChatResult(content=f"reply from {model}", usage={}, model=model)
+
+
+class FakeLLM:
+    """Stands in for llm.achat / llm.astream_chat; ``script[model]`` is a list of
+    outcomes consumed per call: an exception to raise, "ok", or "hang"."""
+
+    def __init__(self, script):
+        self.script = {model: list(outcomes) for model, outcomes in script.items()}
+        self.calls = []
+
+    async def _outcome(self, model):
+        self.calls.append(model)
+        outcome = self.script[model].pop(0) if self.script.get(model) else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == "hang":
+            await asyncio.Event().wait()
+        return ok(model)
+
+    async def achat(self, messages, model, *args):
+        return await self._outcome(model)
+
+    def astream_chat(self, messages, model, *args):
+        fake = self
+
+        class Stream:
+            result = None
+
+            async def __aiter__(self):
+                self.result = await fake._outcome(model)
+                for word in self.result.content.split():
+                    yield word + " "
+
+        return Stream()
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    """Fresh breakers, no real sleeping or rate-limit pauses."""
+    monkeypatch.setattr(dispatch, "_breakers", {})
+    waits = []
+    monkeypatch.setattr(dispatch, "backoff", lambda attempt, floor=None: waits.append((attempt, floor)) or 0)
+    pauses = []
+    monkeypatch.setattr(llm, "pause", lambda seconds, model: pauses.append((seconds, model)))
+    return waits, pauses
+
+
+def use(monkeypatch, script) -> FakeLLM:
+    fake = FakeLLM(script)
+    monkeypatch.setattr(llm, "achat", fake.achat)
+    monkeypatch.setattr(llm, "astream_chat", fake.astream_chat)
+    return fake
+
+
+def chat(dispatcher):
+    return asyncio.run(dispatcher.achat([{"role": "user", "content": "hi"}]))
+
+
+async def drain(stream):
+    return "".join([delta async for delta in stream])
+
+
+# -------------------------------
+# Backoff
+# -------------------------------
+def test_backoff_is_capped_and_respects_the_server_floor(monkeypatch):
+    monkeypatch.undo()  # the real backoff
+    monkeypatch.setattr(dispatch.random, "uniform", lambda lo, hi: hi)
+    monkeypatch.setattr(dispatch, "BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(dispatch, "BACKOFF_MAX", 8.0)
+    assert dispatch.backoff(1) == 2.0
+    assert dispatch.backoff(10) == 8.0
+    monkeypatch.setattr(dispatch.random, "uniform", lambda lo, hi: lo)
+    assert dispatch.backoff(3) == 0.0
+    assert dispatch.backoff(3, 5.0) == 5.0
+
+
+def test_retry_after_header():
+    assert dispatch.retry_after(http_error(429, {"retry-after": "7"}).response) == 7.0
+    assert dispatch.retry_after(http_error(429).response) is None
+
+
+# -------------------------------
+# Retry and fallback
+# -------------------------------
+def test_transient_errors_are_retried_on_the_same_model(monkeypatch, isolated):
+    waits, _ = isolated
+    fake = use(monkeypatch, {"a": [http_error(503), httpx.ConnectError("reset"), "ok"]})
+    result = chat(dispatch.Dispatcher(["a", "b"], max_retries=3))
+    assert result.model == "a"
+    assert fake.calls == ["a", "a", "a"]
+    assert [attempt for attempt, _ in waits] == [0, 1]
+    assert dispatch.breaker("a").state == "closed" and dispatch.breaker("a").failures == 0
+
+
+def test_retry_after_sets_the_wait_and_pauses_the_rate_limiter(monkeypatch, isolated):
+    waits, pauses = isolated
+    use(monkeypatch, {"a": [http_error(429, {"retry-after": "3"}), "ok"]})
+    chat(dispatch.Dispatcher(["a"], max_retries=1))
+    assert waits == [(0, 3.0)]
+    assert pauses == [(3.0, "a")]
+
+
+def test_rate_limited_model_does_not_hold_up_the_fallback(monkeypatch):
+    monkeypatch.setattr(llm, "pause", llm._limiter.pause)
+    llm._limiter.reset()
+    use(monkeypatch, {"a": [http_error(429, {"retry-after": "5"})]})
+    assert chat(dispatch.Dispatcher(["a", "b"], max_retries=0)).model == "b"
+    assert llm._limiter.reserve("b") == 0
+    assert llm._limiter.reserve("a") > 4
+    llm._limiter.reset()
+
+
+def test_retries_exhausted_falls_back_to_the_next_model(monkeypatch):
+    fake = use(monkeypatch, {"a": [http_error(502)] * 3})
+    result = chat(dispatch.Dispatcher(["a", "b"], max_retries=2))
+    assert result.model == "b"
+    assert fake.calls == ["a", "a", "a", "b"]
+
+
+def test_missing_model_falls_back_without_retrying(monkeypatch):
+    fake = use(monkeypatch, {"a": [http_error(404)]})
+    assert chat(dispatch.Dispatcher(["a", "b"], max_retries=3)).model == "b"
+    assert fake.calls == ["a", "b"]
+
+
+def test_fatal_errors_are_raised(monkeypatch):
+    fake = use(monkeypatch, {"a": [http_error(400)]})
+    with pytest.raises(httpx.HTTPStatusError):
+        chat(dispatch.Dispatcher(["a", "b"], max_retries=3))
+    assert fake.calls == ["a"]
+
+
+def test_whole_chain_failing_raises_llm_unavailable(monkeypatch):
+    use(monkeypatch, {"a": [http_error(503)] * 2, "b": [http_error(503, {"retry-after": "4"})] * 2})
+    with pytest.raises(dispatch.LLMUnavailable) as exc:
+        chat(dispatch.Dispatcher(["a", "b"], max_retries=1))
+    assert exc.value.retry_after == 4.0
+
+
+# -------------------------------
+# Circuit breaker
+# -------------------------------
+def test_breaker_opens_and_skips_the_model(monkeypatch):
+    monkeypatch.setattr(dispatch, "_breakers", {"a": dispatch.CircuitBreaker("a", threshold=2, cooldown=60)})
+    fake = use(monkeypatch, {"a": [http_error(503)] * 2})
+    dispatcher = dispatch.Dispatcher(["a", "b"], max_retries=1)
+    assert chat(dispatcher).model == "b"
+    assert dispatch.breaker("a").state == "open"
+    assert chat(dispatcher).model == "b"
+    assert fake.calls == ["a", "a", "b", "b"]
+    assert dispatch.breaker_states() == {"a": "open", "b": "closed"}
+
+
+def test_half_open_allows_a_single_trial():
+    b = dispatch.CircuitBreaker("a", threshold=1, cooldown=0)
+    b.failure()
+    assert b.state == "half_open"
+    assert b.allow() == "trial"
+    assert b.allow() is None
+    b.failure()  # the trial failed: open again for another cooldown
+    assert b.allow() == "trial"
+    b.success()
+    assert b.state == "closed" and b.allow() == "closed"
+
+
+def test_half_open_trial_success_closes_the_breaker(monkeypatch):
+    monkeypatch.setattr(dispatch, "_breakers", {"a": dispatch.CircuitBreaker("a", threshold=1, cooldown=0)})
+    dispatch.breaker("a").failure()
+    use(monkeypatch, {})
+    assert chat(dispatch.Dispatcher(["a", "b"])).model == "a"
+    assert dispatch.breaker("a").state == "closed"
+
+
+def test_cancelled_trial_is_released(monkeypatch):
+    monkeypatch.setattr(dispatch, "_breakers", {"a": dispatch.CircuitBreaker("a", threshold=1, cooldown=0)})
+    dispatch.breaker("a").failure()
+    use(monkeypatch, {"a": ["hang"]})
+    dispatcher = dispatch.Dispatcher(["a"])
+
+    async def main():
+        task = asyncio.create_task(dispatcher.achat([{"role": "user", "content": "hi"}]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert dispatch.breaker("a").allow() == "trial"
+
+
+def test_abandoned_stream_trial_is_released(monkeypatch):
+    monkeypatch.setattr(dispatch, "_breakers", {"a": dispatch.CircuitBreaker("a", threshold=1, cooldown=0)})
+    dispatch.breaker("a").failure()
+    use(monkeypatch, {})
+
+    async def main():
+        stream = dispatch.Dispatcher(["a"]).astream_chat([{"role": "user", "content": "hi"}]).__aiter__()
+        assert await stream.__anext__()
+        await stream.aclose()  # consumer stops after the first delta
+
+    asyncio.run(main())
+    assert dispatch.breaker("a").allow() == "trial"
+
+
+# -------------------------------
+# Streams
+# -------------------------------
+def test_stream_retries_before_the_first_delta(monkeypatch):
+    fake = use(monkeypatch, {"a": [http_error(503)], "b": []})
+    stream = dispatch.Dispatcher(["a", "b"], max_retries=1).astream_chat([{"role": "user", "content": "hi"}])
+    assert asyncio.run(drain(stream)).strip() == "reply from a"
+    assert stream.result.model == "a"
+    assert fake.calls == ["a", "a"]
+
+
+def test_stream_failing_midway_raises_stream_interrupted(monkeypatch):
+    class Broken:
+        result = None
+
+        async def __aiter__(self):
+            yield "partial "
+            raise http_error(502)
+
+    monkeypatch.setattr(llm, "astream_chat", lambda *args: Broken())
+    stream = dispatch.Dispatcher(["a", "b"], max_retries=3).astream_chat([{"role": "user", "content": "hi"}])
+    with pytest.raises(dispatch.StreamInterrupted):
+        asyncio.run(drain(stream))
+    assert dispatch.breaker("a").failures == 1
+
+
+def test_health_reports_breaker_states(monkeypatch):
+    opened = dispatch.CircuitBreaker("a", threshold=1, cooldown=60)
+    opened.failure()
+    monkeypatch.setattr(dispatch, "_breakers", {"a": opened})
+    assert TestClient(app).get("/health").json()["llm_breakers"] == {"a": "open"}
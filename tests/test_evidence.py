@@ -0,0 +1,75 @@
+"""Stored evidence: served from the database, never re-parsed from disk."""
+import asyncio
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app import blobstore, evidence, jobs, migrations, models
+from app.db import get_engine
+
+
+def row(path, status="ready", text="", **fields):
+    return models.Evidence(case_id=1, filename=path, stored_path=path, party="Defense",
+                           status=status, extracted_text=text, **fields)
+
+
+def test_rows_without_text_are_excluded_not_parsed(tmp_path):
+    # A real file on disk: a re-parse would find this text
+    on_disk = tmp_path / "pending.txt"
+    on_disk.write_text("text that must not be read from disk")
+    provider = evidence.StoredEvidenceProvider([
+        row("ready.txt", text="The invoice was paid late."),
+        row(str(on_disk), status="extracting", blob_sha256="a" * 64),
+        row("broken.pdf", status="failed", blob_sha256="b" * 64),
+    ])
+
+    assert provider.get_text("ready.txt") == "The invoice was paid late."
+    assert provider.get_chunks("ready.txt")
+    assert provider.get_text(str(on_disk)) == ""
+    assert provider.get_chunks(str(on_disk)) == []
+    assert provider.pending == {"a" * 64}
+    assert set(provider.excluded) == {str(on_disk), "broken.pdf"}
+    assert "has not finished" in provider.excluded[str(on_disk)]
+    assert "failed" in provider.excluded["broken.pdf"]
+
+
+def test_load_case_waits_for_extraction(monkeypatch):
+    engine = get_engine()
+    migrations.upgrade(engine)
+    sha = "c" * 64
+    with Session(engine) as sess:
+        case = models.Case(title="Wait", description="Evidence still extracting")
+        sess.add(case)
+        sess.add(models.Blob(sha256=sha, size=1, stored_path="/nonexistent/c.txt", status="extracting"))
+        sess.commit()
+        sess.add(models.Evidence(case_id=case.id, filename="c.txt", stored_path="/nonexistent/c.txt",
+                                 party="Defense", status="extracting", blob_sha256=sha))
+        sess.commit()
+        case_id = case.id
+    monkeypatch.setattr(blobstore, "EXTRACTION_POLL", 0.01)
+
+    async def finish_extraction():
+        await asyncio.sleep(0.1)
+        with Session(engine) as sess:
+            blobstore.store_text(sess, sha, ["Extracted in the background."])
+            sess.execute(update(models.Blob).where(models.Blob.sha256 == sha).values(status="ready"))
+            sess.execute(update(models.Evidence).where(models.Evidence.blob_sha256 == sha).values(status="ready"))
+            sess.commit()
+
+    async def main():
+        loaded, _ = await asyncio.gather(jobs.load_case(case_id), finish_extraction())
+        return loaded
+
+    (payload,), provider = asyncio.run(main())
+    assert provider.get_text("/nonexistent/c.txt") == "Extracted in the background."
+    assert not provider.excluded
+
+
+def test_wait_for_extraction_times_out():
+    engine = get_engine()
+    migrations.upgrade(engine)
+    sha = "d" * 64
+    with Session(engine) as sess:
+        sess.add(models.Blob(sha256=sha, size=1, stored_path="/nonexistent/d.txt", status="extracting"))
+        sess.commit()
+    assert asyncio.run(blobstore.wait_for_extraction([sha], timeout=0.05)) is False
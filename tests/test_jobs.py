@@ -0,0 +1,42 @@
+"""Job claiming: each queued or abandoned job runs in exactly one worker."""
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app import jobs, migrations, models
+from app.db import get_engine
+
+
+def new_job(**fields) -> str:
+    migrations.upgrade(get_engine())
+    with Session(get_engine()) as sess:
+        case = models.Case(title="Jobs", description="claim test")
+        sess.add(case)
+        sess.commit()
+        job = models.SimulationJob(case_id=case.id, **fields)
+        sess.add(job)
+        sess.commit()
+        return job.id
+
+
+def test_queued_job_is_claimed_once():
+    job_id = new_job()
+    job = jobs._claim(job_id)
+    assert job.status == "running" and job.owner == jobs.OWNER and job.heartbeat_at
+    assert jobs._claim(job_id) is None
+
+
+def test_only_abandoned_running_jobs_are_taken_over():
+    now = datetime.utcnow()
+    live = new_job(status="running", owner="other", heartbeat_at=now)
+    dead = new_job(status="running", owner="other", heartbeat_at=now - timedelta(seconds=jobs.STALE_SECONDS + 1))
+    done = new_job(status="succeeded")
+    queued = new_job()
+
+    ids = jobs.recoverable()
+    assert dead in ids and queued in ids
+    assert live not in ids and done not in ids
+
+    assert jobs._claim(live) is None
+    assert jobs._claim(done) is None
+    assert jobs._claim(dead).owner == jobs.OWNER
@@ -0,0 +1,32 @@
+"""Response cache keys and read-through behaviour against the mock OpenRouter server."""
+import asyncio
+import json
+
+from app import llm, llm_cache, structured
+
+MESSAGES = [{"role": "system", "content": "You are the Judge."}, {"role": "user", "content": "Assess round 1."}]
+
+
+def test_key_depends_on_response_format():
+    plain = llm_cache.make_key("m", MESSAGES, 400, 0.2)
+    assert plain == llm_cache.make_key("m", MESSAGES, 400, 0.2, None)
+    assert plain != llm_cache.make_key("m", MESSAGES, 400, 0.2, structured.RESPONSE_FORMAT)
+
+
+def test_json_and_plain_calls_do_not_share_entries(mock_openrouter):
+    async def main():
+        with llm_cache.use_mode(llm_cache.READ_THROUGH):
+            plain = await llm.achat(MESSAGES, "cache-test", 400)
+            as_json = await llm.achat(MESSAGES, "cache-test", 400, response_format=structured.RESPONSE_FORMAT)
+            stream = llm.astream_chat(MESSAGES, "cache-test", 400, response_format=structured.RESPONSE_FORMAT)
+            async for _ in stream:
+                pass
+            again = await llm.achat(MESSAGES, "cache-test", 400)
+        await llm.aclose()
+        return plain, as_json, stream.result, again
+
+    plain, as_json, streamed, again = asyncio.run(main())
+    assert not as_json.cached
+    assert json.loads(as_json.content)["assessment"]
+    assert streamed.cached and streamed.content == as_json.content
+    assert again.cached and again.content == plain.content
@@ -0,0 +1,35 @@
+"""migrations.upgrade on the bundled data.db, which predates runs, blobs and indexes."""
+import shutil
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations
+
+BUNDLED_DB = Path(__file__).resolve().parent.parent / "data.db"
+
+
+def test_upgrade_brings_old_database_up_to_date(tmp_path):
+    db = tmp_path / "old.db"
+    shutil.copy(BUNDLED_DB, db)
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.connect() as conn:
+        before = {t: conn.execute(text(f'SELECT COUNT(*) FROM "{t}"')).scalar()
+                  for t in ("case", "evidence", "transcript", "judgeresult")}
+
+    applied = migrations.upgrade(engine)
+    assert any("ALTER TABLE transcript ADD COLUMN" in stmt for stmt in applied)
+
+    insp = inspect(engine)
+    assert {"run_id", "turn", "content_z", "round_no"} <= {c["name"] for c in insp.get_columns("transcript")}
+    assert {"blob_sha256", "status", "size"} <= {c["name"] for c in insp.get_columns("evidence")}
+    assert {"simulationrun", "blob", "blobtext", "simulationjob"} <= set(insp.get_table_names())
+    indexes = {ix["name"] for ix in insp.get_indexes("transcript")}
+    assert {"ix_transcript_case_id", "ix_transcript_run_id_turn"} <= indexes
+
+    with engine.connect() as conn:
+        after = {t: conn.execute(text(f'SELECT COUNT(*) FROM "{t}"')).scalar() for t in before}
+        # New NOT NULL columns are filled with their model default on existing rows
+        assert conn.execute(text("SELECT COUNT(*) FROM transcript WHERE turn IS NULL")).scalar() == 0
+    assert after == before
+    assert migrations.upgrade(engine) == []
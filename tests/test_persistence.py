@@ -0,0 +1,67 @@
+"""RunWriter: batched turns, per-run numbering and reopening failed runs."""
+import json
+
+from sqlmodel import Session
+
+from app import migrations, models, persistence
+from app.db import get_engine
+
+
+def new_case() -> int:
+    migrations.upgrade(get_engine())
+    with Session(get_engine()) as sess:
+        case = models.Case(title="Run", description="RunWriter test")
+        sess.add(case)
+        sess.commit()
+        return case.id
+
+
+def failed_run(case_id: int, turns: int = 2) -> str:
+    writer = persistence.RunWriter(case_id, flush_turns=1)
+    writer.start()
+    for n in range(turns):
+        writer.add_turn("defense", f"turn {n}", 1)
+    writer.fail("model chain down")
+    return writer.run_id
+
+
+def document(run_id: str) -> dict:
+    with Session(get_engine()) as sess:
+        return persistence.run_document(sess, sess.get(models.SimulationRun, run_id))
+
+
+def test_reopen_continues_numbering_and_serves_live_document():
+    run_id = failed_run(new_case())
+    assert document(run_id)["run"]["status"] == "failed"
+
+    writer = persistence.RunWriter.reopen(run_id)
+    assert writer._next_turn == 2
+    assert [t["content"] for t in writer.checkpoint()] == ["turn 0", "turn 1"]
+    doc = document(run_id)
+    assert doc["run"]["status"] == "running" and doc["run"]["error"] is None
+    assert len(doc["transcript"]) == 2
+
+
+def test_reopen_claims_a_run_once():
+    run_id = failed_run(new_case())
+    assert persistence.RunWriter.reopen(run_id) is not None
+    assert persistence.RunWriter.reopen(run_id) is None  # now running
+    assert persistence.RunWriter.reopen(run_id, statuses=("failed", "running")) is not None
+
+
+def test_succeeded_runs_are_not_reopened():
+    writer = persistence.RunWriter(new_case())
+    writer.start()
+    writer.finish({"win_probability": 50})
+    assert persistence.RunWriter.reopen(writer.run_id, statuses=("failed", "running")) is None
+
+
+def test_failed_run_keeps_usage_for_resume():
+    case_id = new_case()
+    writer = persistence.RunWriter(case_id)
+    writer.start()
+    writer.usage_calls.append({"agent": "defense", "round": 1})
+    writer.fail("down")
+    assert persistence.RunWriter.reopen(writer.run_id).usage_calls == [{"agent": "defense", "round": 1}]
+    with Session(get_engine()) as sess:
+        assert json.loads(sess.get(models.SimulationRun, writer.run_id).usage)["llm_calls"] == 1
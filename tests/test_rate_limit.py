@@ -0,0 +1,48 @@
+"""Process-wide request rate limiter (GCRA) and Retry-After pauses."""
+import pytest
+
+from app import llm
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setitem(llm.settings, "rate_limit", 2.0)
+    monkeypatch.setitem(llm.settings, "rate_burst", 4)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(llm.time, "monotonic", lambda: clock["now"])
+    return llm.RateLimiter(), clock
+
+
+def test_burst_then_spaced(limiter):
+    rl, _ = limiter
+    assert [rl.reserve() for _ in range(6)] == [0, 0, 0, 0, 0.5, 1.0]
+
+
+def test_pause_is_a_hard_minimum(limiter):
+    rl, _ = limiter
+    rl.pause(3.0, "a")
+    waits = [rl.reserve("a") for _ in range(6)]
+    assert min(waits) >= 3.0
+    assert waits == [3.0, 3.0, 3.0, 3.0, 3.0, 3.0]
+
+
+def test_pause_expires(limiter):
+    rl, clock = limiter
+    rl.pause(3.0, "a")
+    clock["now"] += 3.0
+    assert rl.reserve("a") == 0
+
+
+def test_unlimited_rate_still_honours_pause(limiter, monkeypatch):
+    rl, _ = limiter
+    monkeypatch.setitem(llm.settings, "rate_limit", 0)
+    rl.pause(2.0, "a")
+    assert rl.reserve("a") == 2.0
+
+
+def test_pause_only_holds_its_model(limiter):
+    rl, _ = limiter
+    rl.pause(5.0, "a")
+    assert rl.reserve("b") == 0
+    assert rl.reserve() == 0
+    assert rl.reserve("a") == 5.0
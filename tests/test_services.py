@@ -0,0 +1,69 @@
+"""Trial loop against the mock OpenRouter server: resume accounting and testimony."""
+import asyncio
+
+import pytest
+
+from app import dispatch, services, structured
+
+
+def payload(depth="quick"):
+    return {
+        "caseInfo": {"title": "Unpaid invoice", "caseType": "civil"},
+        "userClaim": {"mainClaim": "The final bill was not paid."},
+        "evidence": {"files": []},
+        "simulationSettings": {"trialDepth": depth},
+    }
+
+
+@pytest.fixture
+def flaky_chain(monkeypatch, mock_openrouter):
+    """The model chain goes down once, on the third call; returns the served call count."""
+    served = {"calls": 0, "failed": False}
+    stream_chat = services.dispatcher.astream_chat
+
+    def astream_chat(*args, **kwargs):
+        if served["calls"] == 2 and not served["failed"]:
+            served["failed"] = True
+            raise dispatch.LLMUnavailable("all models down", retry_after=0)
+        served["calls"] += 1
+        return stream_chat(*args, **kwargs)
+
+    monkeypatch.setattr(services.dispatcher, "astream_chat", astream_chat)
+    monkeypatch.setattr(dispatch, "backoff", lambda attempt, retry_after=None: 0)
+    return served
+
+
+def test_usage_counts_calls_of_every_attempt(flaky_chain):
+    transcript, judge = asyncio.run(services.run_resumable(payload(), attempts=1))
+    assert flaky_chain["failed"]
+    assert judge["usage"]["llm_calls"] == flaky_chain["calls"]
+    assert len(transcript) == flaky_chain["calls"] - 1  # every call but the final verdict is a turn
+
+
+def test_usage_includes_calls_from_an_earlier_run(mock_openrouter):
+    earlier = [{"agent": "defense", "round": 1, "model": "m", "estimated_prompt_tokens": 10,
+                "prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": None, "cached_response": False}]
+    calls = list(earlier)
+    _, judge = asyncio.run(services.run_resumable(payload(), usage_calls=calls))
+    assert judge["usage"]["calls"][0] == earlier[0]
+    assert judge["usage"]["llm_calls"] == len(calls)
+
+
+def test_judge_testimony_request_is_asked_first():
+    judge = structured.JudgeTurn(assessment="", decision="continue", confidence=0.5,
+                                 testimony_request="When was the bill certified?")
+    counsel = structured.CounselTurn(argument="", testimony_request="Who signed the contract?")
+    question = services._testimony_question([("", judge), ("", counsel)], 2)
+    assert question == "Round 2: When was the bill certified? "
+    assert services._testimony_question([("", counsel)], 2) == "Round 2: Who signed the contract? "
+
+
+def test_field_stream_decodes_one_field_across_split_deltas():
+    raw = '{"cited_evidence": ["a"], "argument": "He said \\"pay\\"\\n\\u00e9 \\ud83d\\ude00", "x": "y"}'
+    for step in (1, 2, 5):
+        stream = structured.FieldStream("argument")
+        text = "".join(stream.feed(raw[i:i + step]) for i in range(0, len(raw), step))
+        assert text == 'He said "pay"\n\u00e9 \U0001F600'
+
+    prose = structured.FieldStream("argument")
+    assert prose.feed("  Plain ") + prose.feed("prose") == "  Plain prose"
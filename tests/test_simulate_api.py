@@ -0,0 +1,117 @@
+"""End-to-end simulation through the API against the mock OpenRouter server."""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client(mock_openrouter):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def case_id(client):
+    resp = client.post("/cases", json={"title": "Unpaid invoice", "description": "The final bill was not paid."})
+    assert resp.status_code == 200
+    return resp.json()["id"]
+
+
+def sse_events(body: str):
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        yield lines["event"], json.loads(lines["data"])
+
+
+def test_simulate_records_run(client, case_id):
+    resp = client.post(f"/cases/{case_id}/simulate")
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["judge"]["win_probability"] == 62
+    assert body["judge"]["probability_source"] == "verdict"
+    assert {t["agent"] for t in body["transcript"]} >= {"defense", "opposition", "judge"}
+
+    run = client.get(f"/cases/{case_id}/runs/{body['run_id']}").json()
+    assert run["run"]["status"] == "succeeded"
+    assert [t["turn"] for t in run["transcript"]] == list(range(len(body["transcript"])))
+    assert [t["content"] for t in run["transcript"]] == [t["content"] for t in body["transcript"]]
+    assert client.get(f"/cases/{case_id}/transcript").json()["run"]["id"] == body["run_id"]
+
+
+def test_runs_of_one_case_number_turns_independently(client, case_id):
+    first = client.post(f"/cases/{case_id}/simulate").json()
+    second = client.post(f"/cases/{case_id}/simulate").json()
+    for body in (first, second):
+        run = client.get(f"/cases/{case_id}/runs/{body['run_id']}").json()
+        assert [t["turn"] for t in run["transcript"]] == list(range(len(body["transcript"])))
+
+
+def test_simulate_unknown_case(client):
+    assert client.post("/cases/999999/simulate").status_code == 404
+
+
+def test_stream_emits_turns_and_verdict(client, case_id):
+    resp = client.get(f"/cases/{case_id}/simulate/stream", params={"trialDepth": "quick"})
+    assert resp.status_code == 200
+    events = list(sse_events(resp.text))
+    kinds = [kind for kind, _ in events]
+    assert "delta" in kinds and "turn" in kinds
+    # Deltas stream the argument text, not the JSON reply around it
+    streamed = "".join(data["text"] for kind, data in events if kind == "delta" and data["agent"] == "defense"
+                       and data["round"] == 1)
+    first_defense = next(data for kind, data in events if kind == "turn" and data["agent"] == "defense")
+    assert streamed == first_defense["content"]
+    assert kinds[-1] == "verdict"
+    verdict = events[-1][1]
+    run = client.get(f"/cases/{case_id}/runs/{verdict['run_id']}").json()
+    assert run["run"]["status"] == "succeeded"
+    assert len(run["transcript"]) == kinds.count("turn")
+
+
+def test_only_failed_runs_can_be_resumed(client, case_id):
+    run_id = client.post(f"/cases/{case_id}/simulate").json()["run_id"]
+    resp = client.post(f"/cases/{case_id}/runs/{run_id}/resume")
+    assert resp.status_code == 409
+    assert "succeeded" in resp.json()["detail"]
+
+
+def test_batch_runs_variants(client, case_id):
+    resp = client.post(f"/cases/{case_id}/simulate/batch",
+                       json={"variants": [{"trialDepth": "quick"}, {"tone": "aggressive"}], "concurrency": 2})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["stats"]["succeeded"] == 2
+
+
+@pytest.mark.parametrize("body", [
+    {"variants": []},
+    {"variants": [{}] * 21},
+    {"variants": [{}], "concurrency": 0},
+    {"variants": [{}], "concurrency": 9},
+])
+def test_batch_limits(client, case_id, body):
+    assert client.post(f"/cases/{case_id}/simulate/batch", json=body).status_code == 400
+
+
+def test_batch_counts_against_pending_limit(client, case_id, monkeypatch):
+    from app import jobs
+
+    monkeypatch.setattr(jobs, "MAX_PENDING", 2)
+    resp = client.post(f"/cases/{case_id}/simulate/batch", json={"variants": [{}] * 3})
+    assert resp.status_code == 429
+    assert jobs._batch_trials == 0
+
+
+def test_upload_evidence_shares_blob_of_identical_content(client, case_id):
+    files = {"file": ("invoice.txt", b"Invoice 42: 1,200 EUR, unpaid.", "text/plain")}
+    first = client.post(f"/cases/{case_id}/evidence", files=files, data={"party": "Defense"})
+    second = client.post(f"/cases/{case_id}/evidence", files=files, data={"party": "Opposition"})
+    assert first.status_code == second.status_code == 200, first.text
+    assert first.json()["blob_sha256"] == second.json()["blob_sha256"]
+    assert first.json()["stored_path"] == second.json()["stored_path"]
+    assert first.json()["id"] != second.json()["id"]
+
+    missing = client.post("/cases/999999/evidence", files=files, data={"party": "Defense"})
+    assert missing.status_code == 404
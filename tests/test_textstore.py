@@ -0,0 +1,106 @@
+"""Packed text: frames, paged documents, slicing and the compaction script."""
+import uuid
+
+import pytest
+from sqlmodel import Session, select
+
+from app import blobstore, extraction, migrations, models, textstore
+from app.db import get_engine
+from app.scripts import compact_text
+
+SEP = extraction.PAGE_BREAK
+PAGES = [
+    "Invoice 42 was issued on 1 March. " * 20,
+    "",
+    "Zahlung überfällig — 1 200 € offen. " * 15,
+    "short page",
+]
+
+
+def test_frames_pick_codec_by_size(monkeypatch):
+    monkeypatch.setattr(textstore, "TEXT_CODEC", "zlib")
+    small, large = "tiny", "évidence " * 200
+    assert textstore.pack(small)[:1] == textstore.RAW
+    assert textstore.pack(large)[:1] == textstore.ZLIB
+    assert len(textstore.pack(large)) < len(large.encode("utf-8"))
+    assert textstore.unpack(textstore.pack(small)) == small
+    assert textstore.unpack(textstore.pack(large)) == large
+    assert textstore.unpack(None) == textstore.unpack(b"") == ""
+
+    monkeypatch.setattr(textstore, "TEXT_CODEC", "none")
+    assert textstore.pack(large)[:1] == textstore.RAW
+
+
+def test_zstd_frames_need_zstandard(monkeypatch):
+    monkeypatch.setattr(textstore, "zstandard", None)
+    monkeypatch.setattr(textstore, "TEXT_CODEC", "zstd")
+    assert textstore.codec() == "zlib"
+    with pytest.raises(RuntimeError, match="zstandard"):
+        textstore.unpack(textstore.ZSTD + b"\x28\xb5\x2f\xfd")
+    with pytest.raises(ValueError):
+        textstore.unpack(b"?payload")
+
+
+def test_pack_pages_index_points_at_pages_and_frames():
+    data, index, length = textstore.pack_pages(PAGES, SEP)
+    joined = SEP.join(PAGES)
+    assert length == len(joined)
+    for (char_start, byte_start, byte_stop), page in zip(index, PAGES):
+        assert joined[char_start:char_start + len(page)] == page
+        assert textstore.unpack(data[byte_start:byte_stop]) == page
+    # A run of consecutive frames decodes on its own
+    assert textstore.unpack_pages(data[index[1][1]:index[3][2]], index[1:]) == PAGES[1:]
+
+
+def test_pages_for_range():
+    index = [[0, 0, 0], [10, 0, 0], [20, 0, 0]]
+    assert textstore.pages_for_range(index, 0, 5) == (0, 1)
+    assert textstore.pages_for_range(index, 5, 15) == (0, 2)
+    assert textstore.pages_for_range(index, 10, 20) == (1, 2)
+    assert textstore.pages_for_range(index, 19, 21) == (1, 3)
+    assert textstore.pages_for_range(index, 25, 99) == (2, 3)
+
+
+def test_text_slice_matches_string_slicing():
+    migrations.upgrade(get_engine())
+    sha = uuid.uuid4().hex
+    joined = SEP.join(PAGES)
+    with Session(get_engine()) as sess:
+        blobstore.store_text(sess, sha, PAGES)
+        sess.commit()
+        row = models.Evidence(case_id=0, filename="x", stored_path="", party="Defense", blob_sha256=sha)
+        for offset in (0, 1, 500, len(PAGES[0]), len(PAGES[0]) + 1, len(joined) - 3, len(joined), len(joined) + 5):
+            for length in (1, 7, len(SEP) + 2, 800, 100000):
+                assert blobstore.text_slice(sess, row, offset, length) == (joined[offset:offset + length], len(joined))
+
+
+def test_compact_text_moves_legacy_text_into_frames():
+    migrations.upgrade(get_engine())
+    sha = uuid.uuid4().hex
+    joined = SEP.join(PAGES)
+    turn = "The defense maintains the invoice was paid in cash. " * 10
+    with Session(get_engine()) as sess:
+        case = models.Case(title="Legacy", description="compaction")
+        sess.add(case)
+        sess.commit()
+        run = models.SimulationRun(case_id=case.id, status="succeeded", document='{"transcript": []}')
+        sess.add(models.Blob(sha256=sha, size=1, stored_path="", refcount=1, status="ready", extracted_text=joined))
+        sess.add_all(models.BlobPage(blob_sha256=sha, page_no=n, text=page) for n, page in enumerate(PAGES))
+        sess.add(run)
+        sess.commit()
+        sess.add(models.Transcript(case_id=case.id, run_id=run.id, agent="defense", content=turn))
+        sess.commit()
+        run_id = run.id
+
+    compact_text.compact_text(batch=1)
+
+    with Session(get_engine()) as sess:
+        assert sess.get(models.Blob, sha).extracted_text == ""
+        assert sess.get(models.BlobText, sha) is not None
+        assert sess.get(models.BlobPage, (sha, 0)) is None
+        assert blobstore.texts_by_sha(sess, [sha]) == {sha: joined}
+
+        stored = sess.exec(select(models.Transcript).where(models.Transcript.run_id == run_id)).one()
+        assert stored.content == "" and textstore.unpack(stored.content_z) == turn
+        run = sess.get(models.SimulationRun, run_id)
+        assert run.document is None and textstore.unpack(run.document_z) == '{"transcript": []}'